@@ -0,0 +1,462 @@
+"""Core (non-UI) functions of the AI Sales Call Assistant.
+
+Kept separate from main.py so the Streamlit page, the async pipeline and any
+other tooling can share them without re-running the Streamlit script.
+
+Importing this module is cheap: Streamlit, NLTK and google.generativeai are
+imported on first use, and the sentiment analyzer, the Gemini configuration
+and the response cache are built once and cached (see lazy_resources.py).
+"""
+import contextvars
+import json
+import logging
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import os
+import time
+import threading
+from collections import deque
+from crm_store import get_store
+from customer_search import get_customer_search, record_customer_update, record_new_customer
+from llm_cache import ResponseCache
+from intent_matcher import get_matcher
+from lazy_resources import get_sentiment_analyzer
+from gemini_client import get_client
+from interaction_log import log_event, logged_stream
+from recommendation_index import get_index
+from telemetry import span, traced_stream, tracer
+
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# CRM location; a .db/.sqlite path switches to the SQLite backend (see crm_store.py)
+CRM_PATH = os.getenv("CRM_PATH", "crm.json")
+
+GEMINI_MODEL = "gemini-2.5-pro"
+
+_gemini_cache = None
+_gemini_cache_lock = threading.Lock()
+
+
+def get_gemini_cache():
+    """Persistent cache of Gemini responses, opened on first use; None when GEMINI_CACHE=off."""
+    global _gemini_cache
+    if os.getenv("GEMINI_CACHE", "on").lower() == "off":
+        return None
+    with _gemini_cache_lock:
+        if _gemini_cache is None:
+            _gemini_cache = ResponseCache(
+                os.getenv("GEMINI_CACHE_PATH", "gemini_cache.db"),
+                max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "10000")),
+                ttl=int(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+        return _gemini_cache
+
+class StreamMetrics:
+    """Rolling time-to-first-token and total-latency samples for streamed Gemini calls."""
+
+    def __init__(self, max_samples=1000):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self._captured = contextvars.ContextVar("stream_metrics_captured", default=None)
+
+    def record(self, time_to_first_token, total_latency):
+        """Record one completed stream (both values in seconds)."""
+        with self._lock:
+            self._samples.append((time_to_first_token, total_latency))
+        captured = self._captured.get()
+        if captured is not None:
+            captured.append((time_to_first_token, total_latency))
+
+    @contextmanager
+    def capture(self):
+        """Collect the (ttft, total) of streams completed inside the block, e.g. one Streamlit rerun.
+
+        Cached answers record nothing, and neither do other sessions' streams.
+        """
+        captured = []
+        token = self._captured.set(captured)
+        try:
+            yield captured
+        finally:
+            self._captured.reset(token)
+
+    def summary(self):
+        """Return count, last and p50/p95 TTFT and total latency in seconds."""
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"count": 0}
+
+        def percentile(values, q):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        ttft = [sample[0] for sample in samples]
+        total = [sample[1] for sample in samples]
+        return {
+            "count": len(samples),
+            "last_ttft": ttft[-1],
+            "last_total": total[-1],
+            "p50_ttft": percentile(ttft, 0.50),
+            "p95_ttft": percentile(ttft, 0.95),
+            "p50_total": percentile(total, 0.50),
+            "p95_total": percentile(total, 0.95),
+        }
+
+
+stream_metrics = StreamMetrics()
+
+class AI_Project_Functions:
+    @staticmethod
+    def get_crm_data(file_path=CRM_PATH):
+        """Load a cached, read-only snapshot of the CRM data from the configured CRM store."""
+        try:
+            # Only re-parsed when the file changes; the JSON backend creates an empty file if it doesn't exist
+            with span("crm.load"):
+                return get_store(file_path).snapshot()
+        except json.JSONDecodeError:
+            import streamlit as st
+            st.error("Error: Failed to decode JSON. The file might be corrupted.")
+            return {}
+        except Exception as e:
+            import streamlit as st
+            st.error(f"An unexpected error occurred: {e}")
+            return {}
+
+    @staticmethod
+    def get_all_users(crm_data):
+        """Get a list of all users in the CRM data."""
+        return list(crm_data.keys())
+
+    @staticmethod
+    def search_customers(query="", offset=0, limit=20, with_records=False, file_path=CRM_PATH):
+        """One page of customer names matching query (prefix first, then fuzzy); see customer_search.py.
+
+        with_records=True also returns each listed customer's record under "records".
+        """
+        page = get_customer_search(file_path).search(query, offset, limit)
+        result = {"total": page.total, "offset": page.offset, "customers": page.names}
+        if with_records:
+            store = get_store(file_path)
+            if store.backend == "json":
+                # The whole file is parsed anyway, so read the cached snapshot
+                snapshot = store.snapshot()
+                result["records"] = {name: snapshot.get(name, {}) for name in page.names}
+            else:
+                result["records"] = {name: store.get(name) or {} for name in page.names}
+        return result
+
+    @staticmethod
+    def find_customers(interests=(), purchases=(), match="all", file_path=CRM_PATH):
+        """Names of customers with all (match="any": any) of the given interests and past purchases."""
+        snapshot = get_store(file_path).snapshot()
+        if hasattr(snapshot, "customers_matching"):
+            # Compact snapshot: inverted lookups instead of a scan (see compact_crm.py)
+            return snapshot.customers_matching(interests, purchases, match)
+        wanted = [("interests", term) for term in interests] + [("past_purchases", term) for term in purchases]
+        if not wanted:
+            return []
+        test = any if match == "any" else all
+        return [name for name, record in snapshot.items()
+                if test(term in record.get(field, ()) for field, term in wanted)]
+
+    @staticmethod
+    def get_user_info(crm_data, name, file_path=CRM_PATH):
+        """Get user information from the CRM data, or straight from the store if crm_data is None."""
+        if crm_data is None:
+            return get_store(file_path).get(name) or {}
+        return crm_data.get(name, {})
+
+    @staticmethod
+    def add_entry_to_crm(name, part_purchase_list, interests_list, file_path=CRM_PATH):
+        """Add a new entry to the CRM data."""
+        try:
+            get_store(file_path).put(name, {
+                "past_purchases": part_purchase_list,
+                "interests": interests_list,
+                "recommendations": []  # Initialize recommendations as empty
+            })
+        except Exception as e:
+            return f"Error in adding {name}'s information: {e}"
+        record_new_customer(name, file_path)
+        AI_Project_Functions._reindex_customer(name, file_path)
+        return f"Successfully added {name}'s information to the database."
+
+    @staticmethod
+    def update_interests(name, new_interests, file_path=CRM_PATH):
+        """Update a user's interests in the CRM data."""
+        if not isinstance(new_interests, (str, list)):
+            return "Error: new_interests must be a string or a list."
+
+        def apply(record):
+            if isinstance(new_interests, str):
+                if "interests" not in record:
+                    record["interests"] = []
+                if new_interests not in record["interests"]:
+                    record["interests"].append(new_interests)
+            else:
+                record["interests"] = new_interests
+            return record
+
+        try:
+            # Only this customer's record is read and written back
+            if get_store(file_path).update(name, apply) is None:
+                return f"Error: {name} not found in the database."
+        except Exception as e:
+            return f"Error in updating {name}'s interests: {e}"
+        record_customer_update(file_path)
+        AI_Project_Functions._reindex_customer(name, file_path)
+        return f"Successfully updated {name}'s interests."
+
+    @staticmethod
+    def _reindex_customer(name, file_path):
+        """Keep the customer vector index in step with a CRM write (see vector_index.py).
+
+        The CRM write has already succeeded, so an index failure is logged
+        rather than raised; `python vector_index.py build` repairs the index.
+        """
+        if file_path != CRM_PATH:
+            return
+        try:
+            from vector_index import index_customer
+            index_customer(name, get_store(file_path).get(name) or {})
+        except Exception:
+            logger.exception("Could not re-index customer %s in the vector index", name)
+
+    @staticmethod
+    def candidate_products(customer_name, interests, k=5):
+        """Catalog products that best match the customer's interests and past purchases."""
+        from vector_index import get_similarity_index
+        index = get_similarity_index()
+        if index is None:
+            return []
+        record = get_store(CRM_PATH).get(customer_name) if customer_name else None
+        return index.shortlist(interests, (record or {}).get("past_purchases", []), k)
+        
+    @staticmethod
+    def analyze_sentiment(user_input):
+        """Analyze user sentiment using VADER and convert the compound score into a range of 1-10."""
+        with span("sentiment.vader"):
+            sentiment_score = get_sentiment_analyzer().polarity_scores(user_input)['compound']  # VADER's compound score
+
+        # Convert VADER score (-1 to +1) to 1-10 scale
+        emotional_state = int((sentiment_score + 1) * 4.5 + 1)  # Normalize to 1-10 range
+
+        return max(1, min(10, emotional_state))
+
+    @staticmethod
+    def emotion_from_score(state_of_mind):
+        """Bucket a 1-10 sentiment score into an emotion category."""
+        return "happy" if state_of_mind > 5 else "neutral" if state_of_mind == 5 else "disappointed"
+
+    @staticmethod
+    def query_gemini(prompt, use_cache=True):
+        """Queries Google Gemini API for AI-generated responses, reusing cached answers for repeated prompts.
+
+        Raises gemini_client.LLMError when Gemini can't answer (after retries, or while the circuit is open).
+        """
+        cache = get_gemini_cache() if use_cache else None
+        if cache is not None:
+            cached = AI_Project_Functions._cached_answer(cache, prompt)
+            if cached is not None:
+                return cached
+        # Only real Gemini calls land in the gemini.generate histogram
+        with span("gemini.generate", model=GEMINI_MODEL):
+            text = get_client().generate(GEMINI_MODEL, prompt)  # Errors are never cached
+        if cache is not None:
+            cache.put(GEMINI_MODEL, prompt, text)
+        return text
+
+    @staticmethod
+    def _cached_answer(cache, prompt):
+        """The cached answer to prompt, or None; hits are timed as gemini.cache_hit."""
+        start = time.perf_counter()
+        cached = cache.get(GEMINI_MODEL, prompt)
+        if cached is not None:
+            tracer.observe("gemini.cache_hit", time.perf_counter() - start)
+        return cached
+
+    @staticmethod
+    def query_gemini_stream(prompt, use_cache=True):
+        """Stream a Gemini response as text chunks, recording time-to-first-token and total latency.
+
+        A cached answer comes back as a single chunk without touching the gemini.stream/ttft histograms.
+        """
+        cache = get_gemini_cache() if use_cache else None
+        if cache is not None:
+            cached = AI_Project_Functions._cached_answer(cache, prompt)
+            if cached is not None:
+                return iter([cached])
+        return traced_stream("gemini.stream", AI_Project_Functions._stream_gemini(prompt, cache),
+                             first_chunk_name="gemini.ttft", model=GEMINI_MODEL)
+
+    @staticmethod
+    def _stream_gemini(prompt, cache=None):
+        start = time.perf_counter()
+        first_token = None
+        chunks = []
+        # Errors (and partial answers) are never cached; LLMError propagates to the caller
+        for text in get_client().stream(GEMINI_MODEL, prompt):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            chunks.append(text)
+            yield text
+
+        stream_metrics.record(first_token if first_token is not None else time.perf_counter() - start,
+                              time.perf_counter() - start)
+        if cache is not None:
+            cache.put(GEMINI_MODEL, prompt, "".join(chunks).strip())
+
+    @staticmethod
+    def _ask_gemini(prompt, stream, use_cache=True):
+        """Return the full answer, or a chunk generator when stream is True."""
+        if stream:
+            return AI_Project_Functions.query_gemini_stream(prompt, use_cache)
+        return AI_Project_Functions.query_gemini(prompt, use_cache)
+
+    @staticmethod
+    def _logged_ask(prompt, stream, kind, customer_name=None, score=None, use_cache=True, **data):
+        """_ask_gemini, recording the answer and its latency in the interaction log (see interaction_log.py)."""
+        if stream:
+            return logged_stream(AI_Project_Functions._ask_gemini(prompt, True, use_cache), kind, customer_name,
+                                 score=score, **data)
+        start = time.perf_counter()
+        answer = AI_Project_Functions._ask_gemini(prompt, False, use_cache)
+        log_event(kind, customer_name, answer, score, time.perf_counter() - start, **data)
+        return answer
+
+    @staticmethod
+    def recommend_product(customer_name, interests, emotion_score, stream=False, refresh=False):
+        """Recommend products based on user interests and emotional state using Gemini API.
+
+        Answers come from the precomputed recommendation index when it has this
+        interest combination; refresh=True skips the index and the response cache.
+        """
+        index = get_index() if not refresh else None
+        if index is not None:
+            recommendations = index.lookup(interests, emotion_score)
+            if recommendations is not None:
+                log_event("suggestion", customer_name, recommendations, emotion_score, source="index")
+                return iter([recommendations]) if stream else recommendations
+        interest_list = ", ".join(interests)
+        prompt = f"Suggest 3 personalized products for someone interested in {interest_list}. The customer has an emotional satisfaction score of {emotion_score}/10."
+        candidates = AI_Project_Functions.candidate_products(customer_name, interests)
+        if candidates:
+            # Gemini picks from a locally ranked shortlist instead of the whole product space
+            prompt += " Choose from these products in our catalog: " + ", ".join(product["name"] for product in candidates) + "."
+        return AI_Project_Functions._logged_ask(prompt, stream, "suggestion", customer_name, emotion_score,
+                                                use_cache=not refresh)
+
+    @staticmethod
+    def generate_prompt(objection, stream=False):
+        """Generate an AI-based response to customer objections.
+
+        Objections close to one in the objection library get its stored response
+        without a Gemini call; new ones are answered by Gemini and learned (see objection_library.py).
+        """
+        from objection_library import get_objection_library, learning_stream  # Imports NumPy
+        library = get_objection_library()
+        if library is not None:
+            match = library.lookup(objection)
+            if match is not None:
+                log_event("objection_response", None, match.cluster.response, objection=objection,
+                          source="library", cluster=match.cluster.id, similarity=round(match.similarity, 3))
+                return iter([match.cluster.response]) if stream else match.cluster.response
+        prompt = f"A customer has an objection: {objection}. How should a salesperson respond professionally?"
+        answer = AI_Project_Functions._logged_ask(prompt, stream, "objection_response", objection=objection)
+        if library is None:
+            return answer
+        if stream:
+            return learning_stream(answer, library, objection)
+        library.learn(objection, answer)
+        return answer
+
+    @staticmethod
+    def generate_summary(customer_name, speech_transcript, emotion_score, stream=False):
+        """Generate a professional sales call summary.
+
+        Long transcripts are summarized in concurrent chunks and merged (see call_summary.py).
+        """
+        from call_summary import SUMMARY_CHUNK_WORDS, summarize_transcript
+        if len(speech_transcript.split()) > SUMMARY_CHUNK_WORDS:
+            return summarize_transcript(customer_name, speech_transcript, emotion_score, stream=stream)
+        prompt = f"A customer named {customer_name} said: '{speech_transcript}'. The customer's emotional satisfaction score is {emotion_score}/10. Generate a professional sales call summary, highlighting concerns and providing a persuasive response."
+        return AI_Project_Functions._logged_ask(prompt, stream, "summary", customer_name, emotion_score)
+
+    @staticmethod
+    def summarize_chunk(customer_name, transcript_chunk):
+        """Summarize one part of a call transcript (map step of call_summary.CallSummarizer)."""
+        prompt = f"Summarize this part of a sales call with a customer named {customer_name} in a few bullet points, keeping every concern, objection, request and commitment: '{transcript_chunk}'"
+        return AI_Project_Functions.query_gemini(prompt)
+
+    @staticmethod
+    def merge_summaries(customer_name, summaries):
+        """Combine consecutive partial call summaries into one (reduce step)."""
+        parts = "\n".join(f"{index}. {summary}" for index, summary in enumerate(summaries, start=1))
+        prompt = f"These are summaries of consecutive parts of a sales call with a customer named {customer_name}:\n{parts}\nCombine them into one summary in a few bullet points, keeping every concern, objection, request and commitment."
+        return AI_Project_Functions.query_gemini(prompt)
+
+    @staticmethod
+    def summarize_call(customer_name, summaries, recent_transcript, emotion_score, stream=False):
+        """Final call summary from partial summaries plus the most recent, not yet summarized, transcript."""
+        parts = "\n".join(f"{index}. {summary}" for index, summary in enumerate(summaries, start=1))
+        prompt = f"A sales call with a customer named {customer_name} is summarized in order below:\n{parts}\n"
+        if recent_transcript:
+            prompt += f"Most recently the customer said: '{recent_transcript}'.\n"
+        prompt += f"The customer's emotional satisfaction score is {emotion_score}/10. Generate a professional sales call summary, highlighting concerns and providing a persuasive response."
+        return AI_Project_Functions._logged_ask(prompt, stream, "summary", customer_name, emotion_score)
+
+    @staticmethod
+    def queryToSentiment(name, query):
+        """Analyze the query and generate sentiment-based response."""
+        # Per-customer read instead of loading the whole CRM for every query
+        user_Data = AI_Project_Functions.get_user_info(name=str(name), crm_data=None)
+        
+        interests = user_Data["interests"]
+        past_purchases = user_Data["past_purchases"]
+        
+        # Analyze sentiment
+        state_of_mind = AI_Project_Functions.analyze_sentiment(query)
+        emotion = AI_Project_Functions.emotion_from_score(state_of_mind)
+        log_event("segment", str(name), query)
+        log_event("sentiment", str(name), emotion, state_of_mind)
+        
+        # Generate recommendations
+        recommendations = AI_Project_Functions.recommend_product(name, interests, state_of_mind)
+        
+        # Prepare data to return
+        data_to_return = {
+            "state_of_mind": state_of_mind,
+            "emotion": emotion,
+            "suggestions": recommendations,
+        }
+        
+        return data_to_return
+
+    @staticmethod
+    def visual_state_of_mind(state_of_mind):
+        """Create a progress bar that visually represents the state_of_mind (0 to 10)."""
+        import streamlit as st
+        progress = state_of_mind / 10  # Normalize it to be between 0 and 1 (for the progress bar)
+        st.write(f"State of Mind: {state_of_mind}")
+        st.progress(progress)
+
+    @staticmethod
+    def match_intents(query):
+        """Return every intent keyword matched in the query (with spans), highest priority first."""
+        return get_matcher().match(query)
+
+    @staticmethod
+    def process_query(query):
+        """Return the canned response of the highest-priority intent found in the query."""
+        # Intents and keywords live in intents.json (INTENTS_PATH) and are compiled once
+        best_match = get_matcher().best(query)
+        if best_match is not None:
+            return best_match.response
+
+        # Default response if no keywords are found
+        return "I'm sorry, I didn't understand your query. How can I assist you further?"
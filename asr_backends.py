@@ -0,0 +1,169 @@
+"""Speech recognition backends for speech_to_text and streaming_stt.
+
+Every backend turns a speech_recognition.AudioData into text and raises
+sr.UnknownValueError when nothing intelligible was said, or sr.RequestError
+when the engine itself fails, just like recognizer.recognize_google.
+
+    google - Google Web Speech API (network, the original behaviour)
+    vosk   - local Kaldi/Vosk model on the CPU (pip install vosk, then point
+             VOSK_MODEL_PATH at an unpacked model directory)
+    sphinx - local CMU PocketSphinx (pip install pocketsphinx)
+    stub   - offline stand-in with configurable latency (ASR_STUB_LATENCY
+             seconds plus ASR_STUB_RTF * audio seconds), for benchmarks
+
+Pick one with ASR_BACKEND, or give a comma-separated fallback chain such as
+ASR_BACKEND=google,vosk to use the local engine when Google is unreachable.
+
+speech_recognition and the engines are imported when a backend is first
+built, not when this module is imported.
+"""
+import json
+import os
+import threading
+import time
+
+
+class ASRBackend:
+    """Base class for speech recognition backends."""
+
+    name = "base"
+
+    def transcribe(self, audio):
+        """Return the text spoken in audio (an sr.AudioData)."""
+        raise NotImplementedError
+
+
+class GoogleASR(ASRBackend):
+    """Google Web Speech API through speech_recognition."""
+
+    name = "google"
+
+    def __init__(self, language="en-US"):
+        import speech_recognition as sr
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self._recognizer.recognize_google(audio, language=self.language)
+
+
+class SphinxASR(ASRBackend):
+    """Offline CMU PocketSphinx through speech_recognition."""
+
+    name = "sphinx"
+
+    def __init__(self, language="en-US"):
+        import speech_recognition as sr
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self._recognizer.recognize_sphinx(audio, language=self.language)
+
+
+_vosk_models = {}
+_vosk_lock = threading.Lock()
+
+
+def load_vosk_model(model_path):
+    """Load a Vosk model once per process; later calls reuse it."""
+    import speech_recognition as sr
+    with _vosk_lock:
+        model = _vosk_models.get(model_path)
+        if model is None:
+            try:
+                import vosk
+            except ImportError:
+                raise sr.RequestError("The vosk backend needs the vosk package: pip install vosk")
+            if not os.path.isdir(model_path):
+                raise sr.RequestError(f"Vosk model not found at {model_path}; set VOSK_MODEL_PATH.")
+            vosk.SetLogLevel(-1)
+            model = vosk.Model(model_path)
+            _vosk_models[model_path] = model
+        return model
+
+
+class VoskASR(ASRBackend):
+    """Offline Vosk (Kaldi) recognizer running on the CPU."""
+
+    name = "vosk"
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+
+    def transcribe(self, audio):
+        import speech_recognition as sr
+        import vosk
+        model = load_vosk_model(self.model_path)
+        # Vosk wants 16-bit mono PCM; the recognizer itself is cheap to create per utterance
+        sample_rate = audio.sample_rate if audio.sample_rate in (8000, 16000) else 16000
+        recognizer = vosk.KaldiRecognizer(model, sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=sample_rate, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class StubASR(ASRBackend):
+    """Offline stand-in: sleeps like a recognizer would and returns a canned transcript.
+
+    Audio objects with a text attribute (synthetic audio in the benchmarks)
+    transcribe to that text.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency=None, realtime_factor=None):
+        self.latency = float(os.getenv("ASR_STUB_LATENCY", "0.2")) if latency is None else latency
+        self.realtime_factor = float(os.getenv("ASR_STUB_RTF", "0")) if realtime_factor is None else realtime_factor
+
+    def transcribe(self, audio):
+        seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        time.sleep(self.latency + self.realtime_factor * seconds)
+        return getattr(audio, "text", None) or "I would like to hear more about your products"
+
+
+class FallbackASR(ASRBackend):
+    """Try several backends in order, moving on when one raises sr.RequestError."""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.name = ",".join(backend.name for backend in backends)
+
+    def transcribe(self, audio):
+        import speech_recognition as sr
+        error = None
+        for backend in self.backends:
+            try:
+                return backend.transcribe(audio)
+            except sr.RequestError as e:
+                error = e
+        raise error
+
+
+BACKENDS = {
+    "google": GoogleASR,
+    "vosk": VoskASR,
+    "sphinx": SphinxASR,
+    "stub": StubASR,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """Return the shared backend (or fallback chain) for name, defaulting to ASR_BACKEND."""
+    name = (name or os.getenv("ASR_BACKEND", "google")).lower()
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            names = [part.strip() for part in name.split(",") if part.strip()]
+            unknown = [part for part in names if part not in BACKENDS]
+            if unknown:
+                raise ValueError(f"Unknown ASR backend(s): {', '.join(unknown)}")
+            backends = [BACKENDS[part]() for part in names]
+            backend = backends[0] if len(backends) == 1 else FallbackASR(backends)
+            _backends[name] = backend
+        return backend
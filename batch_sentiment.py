@@ -0,0 +1,132 @@
+"""Batch sentiment scoring for transcripts and call archives.
+
+Scores utterances with VADER across a process pool, in chunks, and maps the
+compound scores to the assistant's 1-10 scale and emotion buckets with NumPy
+(the same mapping as AI_Project_Functions.analyze_sentiment and
+emotion_from_score). Results come back as pandas DataFrames with the columns
+text, compound, state_of_mind and emotion.
+
+    python batch_sentiment.py utterances.txt -o scores.parquet --workers 8
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["text", "compound", "state_of_mind", "emotion"]
+
+_sia = None
+
+
+def _init_worker():
+    """Build one VADER analyzer per worker process."""
+    global _sia
+    from lazy_resources import get_sentiment_analyzer
+    _sia = get_sentiment_analyzer()
+
+
+def _score_chunk(texts):
+    """Return the VADER compound scores for one chunk (runs inside a worker)."""
+    if _sia is None:
+        _init_worker()
+    return texts, np.fromiter((_sia.polarity_scores(text)['compound'] for text in texts),
+                              dtype=np.float64, count=len(texts))
+
+
+def compound_to_state(compound):
+    """Vectorized VADER compound (-1..1) -> 1-10 score, as in analyze_sentiment."""
+    return np.clip(((np.asarray(compound) + 1) * 4.5 + 1).astype(np.int64), 1, 10)
+
+
+def state_to_emotion(state_of_mind):
+    """Vectorized 1-10 score -> emotion bucket, as in emotion_from_score."""
+    state_of_mind = np.asarray(state_of_mind)
+    return np.select([state_of_mind > 5, state_of_mind == 5], ["happy", "neutral"], "disappointed")
+
+
+def _to_frame(texts, compound):
+    state_of_mind = compound_to_state(compound)
+    return pd.DataFrame({
+        "text": texts,
+        "compound": compound,
+        "state_of_mind": state_of_mind,
+        "emotion": state_to_emotion(state_of_mind),
+    }, columns=COLUMNS)
+
+
+def _chunks(utterances, chunk_size):
+    iterator = iter(utterances)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_utterances(file_path, column="text"):
+    """Yield utterances from a text file (one per line), a .jsonl file or a .csv file."""
+    if file_path.endswith(".jsonl"):
+        for reader in pd.read_json(file_path, lines=True, chunksize=100000):
+            yield from reader[column].astype(str)
+    elif file_path.endswith(".csv"):
+        for reader in pd.read_csv(file_path, usecols=[column], chunksize=100000):
+            yield from reader[column].astype(str)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.rstrip("\n")
+                if line:
+                    yield line
+
+
+def iter_scores(utterances, workers=None, chunk_size=5000):
+    """Score utterances chunk by chunk, yielding one DataFrame per chunk in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded no
+    matter how large the input is. workers=1 scores in this process.
+    """
+    if isinstance(utterances, str):
+        utterances = read_utterances(utterances)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for chunk in _chunks(utterances, chunk_size):
+            yield _to_frame(*_score_chunk(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for chunk in _chunks(utterances, chunk_size):
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield _to_frame(*pending.popleft().result())
+        while pending:
+            yield _to_frame(*pending.popleft().result())
+
+
+def score_batch(utterances, workers=None, chunk_size=5000):
+    """Score an iterable of utterances (or a file path) and return a single DataFrame."""
+    frames = list(iter_scores(utterances, workers=workers, chunk_size=chunk_size))
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch sentiment scoring")
+    parser.add_argument("input", help="Text (one utterance per line), .jsonl or .csv file")
+    parser.add_argument("-o", "--output", required=True, help="Output .parquet or .csv file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    result = score_batch(args.input, workers=args.workers, chunk_size=args.chunk_size)
+    if args.output.endswith(".parquet"):
+        result.to_parquet(args.output, index=False)
+    else:
+        result.to_csv(args.output, index=False)
+    print(f"Scored {len(result)} utterances into {args.output}.")
@@ -0,0 +1,107 @@
+"""Latency and real-time-factor benchmark for the ASR backends.
+
+Transcribes every WAV file in the fixtures directory with each backend and
+reports the first-call time (includes model loading), median latency and
+real-time factor (processing time / audio duration; below 1.0 is faster than
+real time). Backends that are not installed or can't be reached are skipped.
+
+If the fixtures directory is empty, synthetic WAV files are generated so the
+benchmark always has input; put real call recordings (16 kHz mono WAV) there
+for meaningful transcripts.
+
+    python benchmarks/bench_asr.py --backends google vosk sphinx
+"""
+import argparse
+import glob
+import math
+import os
+import statistics
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr  # noqa: E402
+
+from asr_backends import BACKENDS, get_backend  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "audio")
+
+
+def write_synthetic_fixtures(directory, durations=(1.0, 3.0, 8.0), sample_rate=16000):
+    """Write voiced-like WAV files (harmonic tones with pauses) of the given durations."""
+    os.makedirs(directory, exist_ok=True)
+    for duration in durations:
+        samples = []
+        for i in range(int(duration * sample_rate)):
+            t = i / sample_rate
+            # 0.4s "words" separated by 0.1s pauses
+            voiced = (t % 0.5) < 0.4
+            value = 0.0
+            if voiced:
+                value = sum(math.sin(2 * math.pi * 140 * k * t) / k for k in range(1, 6))
+            samples.append(int(6000 * value))
+        path = os.path.join(directory, f"synthetic_{duration:g}s.wav")
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        fixtures.append((os.path.basename(path), audio, len(audio.frame_data) / (audio.sample_rate * audio.sample_width)))
+    return fixtures
+
+
+def bench_backend(name, fixtures, repeat):
+    backend = get_backend(name)
+    latencies = []
+    audio_seconds = 0.0
+    first_call = None
+    for _ in range(repeat):
+        for _, audio, duration in fixtures:
+            start = time.perf_counter()
+            try:
+                backend.transcribe(audio)
+            except sr.UnknownValueError:
+                pass  # Synthetic audio has no words; the timing still counts
+            elapsed = time.perf_counter() - start
+            if first_call is None:
+                first_call = elapsed
+                continue
+            latencies.append(elapsed)
+            audio_seconds += duration
+    return {
+        "first_call": first_call,
+        "median_latency": statistics.median(latencies) if latencies else first_call,
+        "rtf": sum(latencies) / audio_seconds if audio_seconds else float("nan"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS))
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not glob.glob(os.path.join(args.fixtures, "*.wav")):
+        write_synthetic_fixtures(args.fixtures)
+    fixtures = load_fixtures(args.fixtures)
+    print(f"{len(fixtures)} fixtures, {sum(f[2] for f in fixtures):.1f}s of audio")
+
+    print(f"{'backend':>8} {'first call':>11} {'median':>9} {'RTF':>7}")
+    for name in args.backends:
+        try:
+            result = bench_backend(name, fixtures, args.repeat)
+        except (sr.RequestError, ImportError) as e:
+            print(f"{name:>8} skipped: {e}")
+            continue
+        print(f"{name:>8} {result['first_call']:>10.3f}s {result['median_latency']:>8.3f}s {result['rtf']:>7.3f}")
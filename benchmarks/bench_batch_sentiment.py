@@ -0,0 +1,65 @@
+"""Throughput benchmark for batch_sentiment.
+
+Compares the original one-utterance-at-a-time loop with score_batch at
+different worker counts on a synthetic corpus.
+
+    python benchmarks/bench_batch_sentiment.py --count 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_sentiment import compound_to_state, score_batch  # noqa: E402
+
+PHRASES = [
+    "I love this product, it works great",
+    "this is way too expensive for what it does",
+    "can you tell me more about the pricing",
+    "I'm not sure, I need to think about it",
+    "the support team was terrible and slow",
+    "thanks, that sounds perfect",
+    "my order arrived broken again",
+    "hello, I'd like a demo please",
+]
+
+
+def synthetic_utterances(count, seed=0):
+    """Deterministic synthetic utterances built from a few sales-call phrases."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(PHRASES)} {rng.choice(PHRASES)}" for _ in range(count)]
+
+
+def bench_loop(utterances):
+    """Baseline: score one utterance at a time in this process, like analyze_sentiment."""
+    from lazy_resources import get_sentiment_analyzer
+    sia = get_sentiment_analyzer()
+    start = time.perf_counter()
+    for text in utterances:
+        compound_to_state(sia.polarity_scores(text)['compound'])
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="*", default=None,
+                        help="Worker counts to try (default: 1, 2, 4, ... up to the CPU count)")
+    args = parser.parse_args()
+
+    utterances = synthetic_utterances(args.count)
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i <= cpus], cpus})
+
+    elapsed = bench_loop(utterances)
+    print(f"{'loop':>10}: {args.count / elapsed:12,.0f} utterances/s")
+    for workers in worker_counts:
+        start = time.perf_counter()
+        result = score_batch(utterances, workers=workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        assert len(result) == args.count
+        print(f"{f'{workers} workers':>10}: {args.count / elapsed:12,.0f} utterances/s")
@@ -0,0 +1,78 @@
+"""Hang-up latency of map-reduce call summaries versus one big prompt.
+
+Simulates calls of increasing length with a stand-in LLM whose latency grows
+with the prompt (base latency plus a per-word cost, like prompt processing).
+Segments arrive in (compressed) real time while CallSummarizer summarizes
+chunks in the background; the number reported is the time from hang-up to
+the final summary, compared with sending the whole transcript at hang-up.
+
+    python benchmarks/bench_call_summary.py --words 1000 5000 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from call_summary import CallSummarizer  # noqa: E402
+
+WORDS = "price discount contract renewal support team delivery broken refund upgrade demo budget".split()
+
+
+class ProportionalLLM:
+    """Functions stand-in whose answers take base + per_word * prompt words seconds."""
+
+    def __init__(self, base=0.3, per_word=0.0005):
+        self.base = base
+        self.per_word = per_word
+        self.calls = 0
+
+    def _answer(self, text):
+        self.calls += 1
+        time.sleep(self.base + self.per_word * len(text.split()))
+        return "- " + " ".join(text.split()[:20])
+
+    def generate_summary(self, customer_name, speech_transcript, emotion_score, stream=False):
+        return self._answer(speech_transcript)
+
+    def summarize_chunk(self, customer_name, transcript_chunk):
+        return self._answer(transcript_chunk)
+
+    def merge_summaries(self, customer_name, summaries):
+        return self._answer(" ".join(summaries))
+
+    def summarize_call(self, customer_name, summaries, recent_transcript, emotion_score, stream=False):
+        return self._answer(" ".join(summaries) + " " + recent_transcript)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="*", default=[1000, 5000, 20000])
+    parser.add_argument("--segment-words", type=int, default=25)
+    parser.add_argument("--segment-gap", type=float, default=0.01, help="Seconds between segments")
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    parser.add_argument("--per-word", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for total in args.words:
+        transcript = [" ".join(rng.choice(WORDS) for _ in range(args.segment_words))
+                      for _ in range(total // args.segment_words)]
+
+        llm = ProportionalLLM(args.base_latency, args.per_word)
+        summarizer = CallSummarizer("Benchmark Customer", functions=llm)
+        for segment in transcript:
+            summarizer.add_segment(segment)
+            time.sleep(args.segment_gap)
+        start = time.perf_counter()
+        summarizer.finish(6)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        llm.generate_summary("Benchmark Customer", " ".join(transcript), 6)
+        single = time.perf_counter() - start
+
+        print(f"{total:>6} words: hang-up to summary {incremental:5.2f} s with {llm.calls - 1} LLM calls"
+              f" ({summarizer.chunks} chunks) | single prompt {single:5.2f} s")
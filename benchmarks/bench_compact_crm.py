@@ -0,0 +1,97 @@
+"""Memory and lookup speed of the CRM snapshot forms at 1M customers.
+
+Parses the same synthetic crm.json text into each form and measures the
+memory it retains (tracemalloc, after the parse intermediates are freed):
+
+    dict     - json.load output, what get_crm_data returned originally
+    frozen   - read-only mapping proxies and tuples (CRM_SNAPSHOT=dict)
+    compact  - CompactCRM with interned vocabularies and CSR columns
+
+It then times random record reads and "customers with interest X and
+purchase Y" as a scan over the dict form versus CompactCRM's inverted index.
+
+    python benchmarks/bench_compact_crm.py --count 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_crm_bulk import INTERESTS, PURCHASES, synthetic_rows  # noqa: E402
+from compact_crm import CompactCRM, freeze  # noqa: E402
+
+
+def crm_json_text(count):
+    return json.dumps({row.pop("name"): row for row in synthetic_rows(count)})
+
+
+def measure(build):
+    """Return (object, retained bytes, peak bytes, seconds) for build()."""
+    gc.collect()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    return value, current - before, peak - before, elapsed
+
+
+def scan(data, interest, purchase):
+    return [name for name, record in data.items()
+            if interest in record.get("interests", ()) and purchase in record.get("past_purchases", ())]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    text = crm_json_text(args.count)
+    print(f"{args.count} customers, {len(text) / 1e6:.0f} MB of JSON")
+    tracemalloc.start()
+    forms = {
+        "dict": lambda: json.loads(text),
+        "frozen": lambda: freeze(json.loads(text)),
+        "compact": lambda: CompactCRM.from_items(json.loads(text).items()),
+    }
+    built = {}
+    for label, build in forms.items():
+        value, retained, peak, elapsed = measure(build)
+        print(f"  {label:8} retained {retained / 1e6:7.1f} MB  (peak {peak / 1e6:7.1f} MB, built in {elapsed:5.2f} s)")
+        built[label] = value
+        if label == "frozen":
+            del built[label], value  # Only its size is interesting
+    tracemalloc.stop()
+
+    data, compact = built["dict"], built["compact"]
+    rng = random.Random(0)
+    names = [rng.choice(compact.names) for _ in range(args.reads)]
+    for label, snapshot in (("dict", data), ("compact", compact)):
+        start = time.perf_counter()
+        for name in names:
+            snapshot[name].get("interests", ())
+        print(f"  {label:8} record read   {(time.perf_counter() - start) / args.reads * 1e6:6.2f} us")
+
+    queries = [(rng.choice(INTERESTS), rng.choice(PURCHASES)) for _ in range(args.queries)]
+    start = time.perf_counter()
+    expected = [scan(data, interest, purchase) for interest, purchase in queries]
+    scan_ms = (time.perf_counter() - start) / args.queries * 1000
+    start = time.perf_counter()
+    compact.customers_matching(["Fitness"], ["Yoga Mat"])  # Builds both inverted indexes
+    index_build = time.perf_counter() - start
+    start = time.perf_counter()
+    found = [compact.customers_matching([interest], [purchase]) for interest, purchase in queries]
+    index_ms = (time.perf_counter() - start) / args.queries * 1000
+    assert found == expected
+    print(f"  interest+purchase lookup: scan {scan_ms:8.2f} ms | inverted {index_ms:6.2f} ms "
+          f"(index built once in {index_build:.2f} s)")
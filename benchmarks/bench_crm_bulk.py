@@ -0,0 +1,99 @@
+"""Benchmark for crm_bulk at 1M customers.
+
+Writes a synthetic export in each format, then times a fresh import into an
+SQLite CRM, a dry run of the same file (every row unchanged), an import where
+a tenth of the rows changed, and an export back out. Peak memory is reported
+so bounded-memory streaming can be checked.
+
+    python benchmarks/bench_crm_bulk.py --count 1000000 --formats csv jsonl parquet
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_bulk import export_file, import_file  # noqa: E402
+from crm_store import get_store  # noqa: E402
+
+INTERESTS = ["Electronics", "Gaming", "Fitness", "Sports", "Photography", "DIY", "Automobiles", "Movies",
+             "Outdoors", "Fashion", "Cycling", "Books", "Music", "Investing", "Travel", "Health", "Cooking"]
+PURCHASES = ["Smartphone", "Smartwatch", "Headphones", "Fitness Tracker", "Wireless Earbuds", "Yoga Mat",
+             "Electric Scooter", "Running Shoes", "Dumbbells", "Backpack", "Coffee Maker", "Tablet", "Laptop"]
+
+
+def synthetic_rows(count, seed=0, changed_every=0):
+    """Deterministic customer rows; with changed_every=N every Nth customer gets an extra interest."""
+    rng = random.Random(seed)
+    for index in range(count):
+        interests = rng.sample(INTERESTS, rng.randint(1, 3))
+        if changed_every and index % changed_every == 0:
+            interests.append("Chess")
+        yield {"name": f"Customer {index:07d}", "interests": interests,
+               "past_purchases": rng.sample(PURCHASES, rng.randint(0, 3))}
+
+
+def write_rows(rows, file_path, file_format):
+    """Write rows in the layout crm_bulk reads."""
+    if file_format == "jsonl":
+        with open(file_path, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row) + "\n")
+    elif file_format == "csv":
+        import csv
+        with open(file_path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["name", "interests", "past_purchases"])
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, interests=";".join(row["interests"]),
+                                     past_purchases=";".join(row["past_purchases"])))
+    elif file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([("name", pa.string()), ("interests", pa.list_(pa.string())),
+                            ("past_purchases", pa.list_(pa.string()))])
+        with pq.ParquetWriter(file_path, schema) as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == 100000:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--formats", nargs="*", default=["csv", "jsonl", "parquet"])
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format in args.formats:
+            source = os.path.join(directory, f"customers.{file_format}")
+            changed = os.path.join(directory, f"changed.{file_format}")
+            write_rows(synthetic_rows(args.count), source, file_format)
+            write_rows(synthetic_rows(args.count, changed_every=10), changed, file_format)
+            crm_path = os.path.join(directory, f"crm_{file_format}.db")
+
+            print(f"{file_format} ({os.path.getsize(source) / 1e6:.0f} MB):")
+            report = import_file(source, crm_path, chunk_size=args.chunk_size)
+            print(f"  initial import  {report.summary()}")
+            report = import_file(source, crm_path, chunk_size=args.chunk_size, dry_run=True)
+            print(f"  dry run         {report.summary()}")
+            report = import_file(changed, crm_path, chunk_size=args.chunk_size)
+            print(f"  10% changed     {report.summary()}")
+            exported = os.path.join(directory, f"export.{file_format}")
+            report = export_file(exported, crm_path, chunk_size=args.chunk_size)
+            print(f"  export          {report.rows} rows in {report.elapsed:.2f}s ({report.rows_per_sec:,.0f} rows/sec)")
+            print(f"  peak RSS so far {peak_rss_mb():.0f} MB, {len(get_store(crm_path).names())} customers stored")
@@ -0,0 +1,72 @@
+"""Benchmark for customer_search on large synthetic CRMs.
+
+Measures index build time, type-ahead prefix queries, misspelled (fuzzy)
+queries and paging through every customer, against the original approach of
+listing every name and filtering the list in Python.
+
+    python benchmarks/bench_customer_search.py --sizes 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from customer_search import CustomerSearch  # noqa: E402
+
+FIRST = ["John", "Jane", "Evelyn", "Logan", "Liam", "Olivia", "Noah", "Emma", "Ava", "Lucas", "Sophia", "Mia",
+         "Henry", "Amelia", "James", "Harper", "Ethan", "Ella", "Mason", "Aria", "Suhaib", "Pratheek", "Zoe"]
+LAST = ["Doe", "Smith", "Martin", "Anderson", "Thomas", "Jackson", "White", "Harris", "Thompson", "Garcia",
+        "Martinez", "Robinson", "Clark", "Rodriguez", "Lewis", "Lee", "Walker", "Hall", "Allen", "Young"]
+
+
+def synthetic_names(count, seed=0):
+    """Unique "First Last ####" names."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(FIRST)} {rng.choice(LAST)} {index}" for index in range(count)]
+
+
+def misspell(text, rng):
+    """Swap two neighbouring letters."""
+    if len(text) < 3:
+        return text
+    position = rng.randrange(len(text) - 1)
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    for size in args.sizes:
+        names = synthetic_names(size)
+
+        start = time.perf_counter()
+        search = CustomerSearch(names)
+        build = time.perf_counter() - start
+
+        prefixes = [rng.choice(names)[:rng.randint(2, 6)] for _ in range(args.queries)]
+        typos = [misspell(rng.choice(FIRST) + " " + rng.choice(LAST), rng) for _ in range(args.queries)]
+        offsets = [rng.randrange(size) for _ in range(args.queries)]
+
+        prefix_time = timed(lambda query: search.search(query, 0, 50), prefixes)
+        fuzzy_time = timed(lambda query: search.search(query, 0, 50), typos)
+        page_time = timed(lambda offset: search.search("", offset, 25), offsets)
+        naive_time = timed(lambda query: [name for name in names if name.casefold().startswith(query.casefold())][:50],
+                           prefixes[:20])
+
+        print(f"{size:>8} customers: build {build:6.2f} s | prefix {prefix_time * 1000:7.2f} ms"
+              f" | fuzzy {fuzzy_time * 1000:7.2f} ms | page {page_time * 1e6:6.1f} us"
+              f" | list scan {naive_time * 1000:7.2f} ms")
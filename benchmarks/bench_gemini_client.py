@@ -0,0 +1,64 @@
+"""Throughput and tail-latency benchmark for gemini_client against the offline stub.
+
+Many threads call GeminiClient.generate at once while the stub backend adds
+latency, jitter and random failures, so the effect of the rate limiter,
+concurrency bound, retries and circuit breaker can be measured without a
+network.
+
+    python benchmarks/bench_gemini_client.py --threads 64 --requests 1000 --failure-rate 0.05
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gemini_client import GeminiClient, LLMError, StubBackend  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=200.0, help="Token bucket rate (requests/s)")
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--retries", type=int, default=2)
+    args = parser.parse_args()
+
+    client = GeminiClient(
+        StubBackend(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate, seed=0),
+        rate=args.rate, burst=args.burst, max_concurrency=args.max_concurrency,
+        timeout=args.timeout, retries=args.retries, backoff=0.05, queue_timeout=30.0,
+    )
+
+    def one_request(index):
+        start = time.perf_counter()
+        try:
+            client.generate("stub-model", f"prompt {index}")
+            ok = True
+        except LLMError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(one_request, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for ok, latency in results if ok]
+    print(f"{len(latencies)}/{args.requests} succeeded in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"client stats: {client.snapshot()}")
@@ -0,0 +1,81 @@
+"""Benchmark for intent_matcher at 1k and 10k keywords.
+
+Compares the compiled Aho-Corasick matcher with the original approach (a
+substring test per keyword) on synthetic intents and queries.
+
+    python benchmarks/bench_intent_matcher.py --sizes 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_matcher import IntentMatcher  # noqa: E402
+
+SYLLABLES = ["pro", "ka", "li", "ver", "son", "tri", "mo", "dex", "fa", "run", "zen", "quo", "bel", "nix"]
+FILLER = "hello I was wondering whether you could tell me a little more about the plan and the".split()
+
+
+def synthetic_config(keyword_count, keywords_per_intent=5, seed=0):
+    """Intents whose keywords are made-up one- to three-word phrases."""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+    config = []
+    for index in range(keyword_count // keywords_per_intent):
+        keywords = [" ".join(word() for _ in range(rng.randint(1, 3))) for _ in range(keywords_per_intent)]
+        config.append({"name": f"intent_{index}", "priority": rng.randint(0, 100),
+                       "keywords": keywords, "response": f"response {index}"})
+    return config
+
+
+def synthetic_queries(config, count, seed=1):
+    """Queries of ~30 filler words with a couple of keywords mixed in."""
+    rng = random.Random(seed)
+    keywords = [keyword for intent in config for keyword in intent["keywords"]]
+    queries = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(30)]
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        queries.append(" ".join(words))
+    return queries
+
+
+def naive_match(config, query):
+    """The original process_query approach: a substring test for every keyword."""
+    query = query.lower()
+    return [intent["name"] for intent in config for keyword in intent["keywords"] if keyword in query]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        config = synthetic_config(size)
+        queries = synthetic_queries(config, args.queries)
+
+        start = time.perf_counter()
+        matcher = IntentMatcher.from_config(config)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            matcher.match(query)
+        compiled = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        for query in queries:
+            naive_match(config, query)
+        naive = (time.perf_counter() - start) / len(queries)
+
+        print(f"{size:>6} keywords: build {build * 1000:7.1f} ms | compiled {compiled * 1e6:8.1f} us/query"
+              f" | substring loop {naive * 1e6:9.1f} us/query ({naive / compiled:5.1f}x)")
@@ -0,0 +1,133 @@
+"""Hit rate, accuracy and latency of the objection library.
+
+Replays a synthetic stream of objections: paraphrases of the vetted seed
+objections (filler words, casing, dropped punctuation and the odd typo added)
+drawn with a Zipf-like skew, mixed with --novel-share objections the library
+has never seen. Unknown objections go to a stand-in LLM (fixed latency) and
+are learned, so repeats of them become hits later in the stream.
+
+Reports the hit rate, how many hits matched the wrong cluster, lookup latency
+and the LLM time saved compared with sending every objection to Gemini. It
+first checks that negated or opposite paraphrases of seed objections ("we can
+afford it", "now is a good time") are not answered from the library, and
+exits with status 1 if one is.
+
+    python benchmarks/bench_objection_library.py --objections 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from objection_library import ObjectionLibrary  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREFIXES = ["", "Honestly, ", "Well, ", "Um, ", "Look, ", "To be fair, ", "I mean, "]
+SUFFIXES = ["", ".", "!", " right now.", ", sorry.", " to be honest."]
+NOVEL_TOPICS = ["the warranty on refurbished units", "compatibility with Linux", "your data retention policy",
+                "the setup fee", "support in Spanish", "bulk discounts for schools", "the return window",
+                "integration with our ERP", "the battery life", "on-site installation"]
+# Opposites of seed objections that must not reuse that objection's response
+NEGATED_CASES = [
+    ("We can afford it", "It's too expensive"),
+    ("The price is not too high", "It's too expensive"),
+    ("Now is a good time", "Now is not a good time"),
+    ("The timing is not bad right now", "Now is not a good time"),
+    ("I don't need to think about it", "I need to think about it"),
+    ("I do see the value", "I don't see the value"),
+    ("We're not using a competitor", "We're already using a competitor"),
+    ("I don't need to talk to my manager", "I need to talk to my manager"),
+    ("It's not too complicated", "It's too complicated"),
+    ("I'm interested", "I'm not interested"),
+    ("Delivery doesn't take too long", "Delivery takes too long"),
+    ("I never had a bad experience before", "I had a bad experience before"),
+]
+NOVEL_FORMS = ["What about {}?", "I'm worried about {}.", "Nobody explained {} to me.", "Tell me about {} first."]
+
+
+def add_typo(text, rng):
+    letters = [index for index, char in enumerate(text) if char.isalpha()]
+    if len(letters) < 8:
+        return text
+    index = rng.choice(letters)
+    return text[:index] + text[index + 1:]
+
+
+def paraphrase(text, rng):
+    text = rng.choice(PREFIXES) + (text[0].lower() + text[1:] if rng.random() < 0.5 else text)
+    text = text.rstrip(".!?") + rng.choice(SUFFIXES)
+    return add_typo(text, rng) if rng.random() < 0.2 else text
+
+
+def negated_matches(library):
+    """The NEGATED_CASES the library would wrongly answer, as (text, matched objection, similarity)."""
+    wrong = []
+    for text, opposite in NEGATED_CASES:
+        match = library.nearest(text)
+        if match is not None and match.cluster.objection == opposite and match.similarity >= library.threshold:
+            wrong.append((text, opposite, match.similarity))
+    return wrong
+
+
+def objection_stream(seed_items, count, novel_share, seed=0):
+    """Yield (objection text, seed cluster index or None for novel objections)."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(seed_items))]
+    novel = [form.format(topic) for topic in NOVEL_TOPICS for form in NOVEL_FORMS]
+    for _ in range(count):
+        if rng.random() < novel_share:
+            yield paraphrase(rng.choice(novel), rng), None
+        else:
+            cluster = rng.choices(range(len(seed_items)), weights)[0]
+            item = seed_items[cluster]
+            yield paraphrase(rng.choice([item["objection"]] + item["examples"]), rng), cluster
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objections", type=int, default=5000)
+    parser.add_argument("--novel-share", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Seconds per Gemini answer (not slept)")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--learned-threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    seed_path = os.path.join(ROOT, "objections.json")
+    with open(seed_path, "r", encoding="utf-8") as file:
+        seed_items = json.load(file)
+    with tempfile.TemporaryDirectory() as directory:
+        library = ObjectionLibrary(os.path.join(directory, "library.db"), seed_path,
+                                   args.threshold, args.learned_threshold)
+        negated = negated_matches(library)
+        latencies, wrong, llm_calls = [], 0, 0
+        for text, cluster in objection_stream(seed_items, args.objections, args.novel_share):
+            start = time.perf_counter()
+            match = library.lookup(text)
+            latencies.append(time.perf_counter() - start)
+            if match is None:
+                llm_calls += 1
+                library.learn(text, f"Answer to: {text}")
+            elif match.cluster.vetted and (cluster is None
+                                           or match.cluster.objection != seed_items[cluster]["objection"]):
+                wrong += 1
+        stats = library.stats()
+
+    latencies.sort()
+    hits = stats["vetted_hits"] + stats["learned_hits"]
+    print(f"{args.objections} objections ({args.novel_share:.0%} novel): hit rate {stats['hit_rate']:.1%} "
+          f"({stats['vetted_hits']} vetted, {stats['learned_hits']} learned), "
+          f"{wrong} vetted hits on the wrong cluster ({wrong / max(1, hits):.1%} of hits)")
+    print(f"lookup p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms; {stats['clusters']} clusters at the end")
+    print(f"Gemini calls {llm_calls} instead of {args.objections}: "
+          f"{(args.objections - llm_calls) * args.llm_latency / 60:.0f} min of LLM latency saved")
+    print(f"negated paraphrases answered from the library: {len(negated)} of {len(NEGATED_CASES)}")
+    for text, opposite, similarity in negated:
+        print(f"  {text!r} matched {opposite!r} at {similarity:.2f}")
+    if negated:
+        sys.exit(1)
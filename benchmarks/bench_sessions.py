@@ -0,0 +1,150 @@
+"""Isolation of concurrent calls: one slow call versus everyone else.
+
+One "slow" call floods the llm lane with long Gemini-like tasks while the
+other calls each submit a steady stream of short ones. With a plain shared
+thread pool (what asyncio.to_thread gave every call) the short tasks queue
+behind the slow call's backlog; with SessionManager the slow call is capped
+at its per-session share and the lanes take turns, so the others' latency
+stays close to their own task time.
+
+Before timing anything it checks the scheduler's guarantees on a tiny lane
+(round-robin order, the per-session cap, backpressure and cancel) and exits
+with status 1 if one does not hold; --checks-only stops after that.
+
+    python benchmarks/bench_sessions.py --calls 20 --workers 16 --slow-tasks 200
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_manager import SessionBusy, SessionManager  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def check_scheduler():
+    """Return the scheduler guarantees that do not hold (empty when all is well)."""
+    failures = []
+    manager = SessionManager(llm_workers=1, per_session={"llm": 1}, max_queue=3)
+    first, second = manager.open("first"), manager.open("second")
+    gate = threading.Event()
+    order = []
+    blocker = first.submit("llm", gate.wait)
+    for index in range(3):
+        first.submit("llm", order.append, f"first-{index}")
+    for index in range(3):
+        second.submit("llm", order.append, f"second-{index}")
+    gate.set()
+    blocker.result()
+    deadline = time.perf_counter() + 5
+    while len(order) < 6 and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    if order != ["first-0", "second-0", "first-1", "second-1", "first-2", "second-2"]:
+        failures.append(f"round-robin: sessions ran in the order {order}")
+    manager.shutdown()
+
+    manager = SessionManager(llm_workers=4, per_session={"llm": 2}, max_queue=5)
+    greedy, other = manager.open("greedy"), manager.open("other")
+    gate = threading.Event()
+    running = [greedy.submit("llm", gate.wait) for _ in range(2)]
+    queued = [greedy.submit("llm", gate.wait) for _ in range(5)]
+    time.sleep(0.05)
+    if greedy.stats()["llm"] != {"queued": 5, "running": 2}:
+        failures.append(f"per-session cap: greedy session has {greedy.stats()['llm']} with a cap of 2")
+    try:
+        greedy.submit("llm", gate.wait)
+        failures.append("backpressure: a sixth queued task was accepted with max_queue=5")
+    except SessionBusy:
+        pass
+    if other.submit("llm", lambda: "served").result(timeout=1) != "served":
+        failures.append("isolation: another session was not served while greedy was at its cap")
+    if greedy.cancel() != 7:
+        failures.append("cancel: did not report 2 running + 5 queued tasks")
+    for future in running + queued:
+        try:
+            future.result(timeout=1)
+            failures.append("cancel: a cancelled task still returned a result")
+        except CancelledError:
+            pass
+    gate.set()
+    if other.submit("llm", lambda: "still served").result(timeout=1) != "still served":
+        failures.append("cancel: the other session stopped being served")
+    manager.shutdown()
+    return failures
+
+
+def run(submit_slow, submit_fast, args):
+    """Flood with slow tasks, then time the fast calls' tasks; returns their latencies."""
+    slow = [submit_slow(time.sleep, args.slow_seconds) for _ in range(args.slow_tasks)]
+    latencies = []
+    lock = threading.Lock()
+
+    def call(index):
+        for _ in range(args.tasks):
+            start = time.perf_counter()
+            submit_fast(index, time.sleep, args.fast_seconds).result()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(args.calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, slow
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20, help="Well-behaved concurrent calls")
+    parser.add_argument("--tasks", type=int, default=5, help="Short tasks per well-behaved call, one at a time")
+    parser.add_argument("--workers", type=int, default=16, help="Threads in the shared pool / llm lane")
+    parser.add_argument("--slow-tasks", type=int, default=200, help="Tasks queued by the slow call")
+    parser.add_argument("--slow-seconds", type=float, default=0.5)
+    parser.add_argument("--fast-seconds", type=float, default=0.05)
+    parser.add_argument("--checks-only", action="store_true", help="Only check the scheduler's guarantees")
+    args = parser.parse_args()
+
+    failures = check_scheduler()
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if failures:
+        sys.exit(1)
+    print("scheduler checks passed: round-robin, per-session cap, backpressure, cancel")
+    if args.checks_only:
+        sys.exit(0)
+
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    start = time.perf_counter()
+    shared, backlog = run(lambda fn, *a: pool.submit(fn, *a), lambda index, fn, *a: pool.submit(fn, *a), args)
+    shared_elapsed = time.perf_counter() - start
+    for future in backlog:
+        future.cancel()
+    pool.shutdown(wait=True)
+
+    manager = SessionManager(llm_workers=args.workers, per_session={"llm": max(1, args.workers // 4)},
+                             max_queue=args.slow_tasks)
+    slow_session = manager.open("slow")
+    sessions = [manager.open(f"call-{index}") for index in range(args.calls)]
+    start = time.perf_counter()
+    isolated, _ = run(lambda fn, *a: slow_session.submit("llm", fn, *a),
+                      lambda index, fn, *a: sessions[index].submit("llm", fn, *a), args)
+    isolated_elapsed = time.perf_counter() - start
+    cancelled = slow_session.cancel()  # The agent on the slow call moved on
+    manager.shutdown()
+
+    print(f"{args.calls} calls x {args.tasks} tasks of {args.fast_seconds * 1000:.0f} ms next to one call with "
+          f"{args.slow_tasks} tasks of {args.slow_seconds * 1000:.0f} ms, {args.workers} workers")
+    for label, latencies, elapsed in (("shared pool", shared, shared_elapsed),
+                                      ("session lanes", isolated, isolated_elapsed)):
+        print(f"  {label:13} p50 {percentile(latencies, 0.5) * 1000:7.0f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.0f} ms  (calls finished in {elapsed:.2f} s)")
+    print(f"  cancelling the slow call dropped {cancelled} of its tasks")
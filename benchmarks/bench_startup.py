@@ -0,0 +1,94 @@
+"""Import-time / cold-start benchmark.
+
+Imports each module in a fresh interpreter several times and reports the
+median wall time, the slowest imports from `python -X importtime`, and the
+cost of the first sentiment call (which loads NLTK and the VADER lexicon).
+Use --budget-ms in CI to fail when a cold import gets slower than allowed.
+
+    python benchmarks/bench_startup.py --budget-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+FIRST_CALL_SNIPPET = """
+import time
+from ai_functions import AI_Project_Functions
+start = time.perf_counter()
+AI_Project_Functions.analyze_sentiment("I really like this product")
+first = time.perf_counter() - start
+start = time.perf_counter()
+AI_Project_Functions.analyze_sentiment("I really like this product")
+print(first, time.perf_counter() - start)
+"""
+
+
+def run_python(code, *flags):
+    result = subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return result
+
+
+def cold_import_times(module, repeat):
+    return [float(run_python(IMPORT_SNIPPET.format(module=module)).stdout.strip()) for _ in range(repeat)]
+
+
+def slowest_imports(module, top):
+    """Parse `python -X importtime` output into the top (cumulative us, package) entries."""
+    stderr = run_python(f"import {module}", "-X", "importtime").stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self_us | cumulative_us | package"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="*", default=["ai_functions", "pipeline"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if a median cold import exceeds this")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    over_budget = False
+    for module in args.modules:
+        median_ms = statistics.median(cold_import_times(module, args.repeat)) * 1000
+        results[module] = {"median_import_ms": median_ms}
+        print(f"import {module}: {median_ms:.1f} ms (median of {args.repeat} cold starts)")
+        for cumulative_us, name in slowest_imports(module, args.top):
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+        if args.budget_ms is not None and median_ms > args.budget_ms:
+            over_budget = True
+            print(f"    over budget ({args.budget_ms:.0f} ms)")
+
+    try:
+        first, second = map(float, run_python(FIRST_CALL_SNIPPET).stdout.split())
+        results["first_sentiment_call_ms"] = first * 1000
+        results["warm_sentiment_call_ms"] = second * 1000
+        print(f"first analyze_sentiment call: {first * 1000:.1f} ms, warm call: {second * 1000:.3f} ms")
+    except RuntimeError as e:
+        print(f"first analyze_sentiment call: skipped ({e})")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,177 @@
+"""Local load generator for the headless assistant service.
+
+Simulates many concurrent calls. Each call opens a WebSocket session on
+/ws/calls/{customer}, sends a series of transcript segments and waits for all
+pipeline stages of each one. By default the ASGI app is driven in-process (no
+network, no ASGI server needed) with Gemini replaced by a stub of configurable
+latency; --url sends POST /analyze requests to a running server instead.
+In-process runs first check that malformed request bodies get a 400, and exit
+with status 1 if one doesn't.
+
+    python benchmarks/load_service.py --calls 50 --utterances 10 --stub-latency 0.8
+    python benchmarks/load_service.py --url http://localhost:8000 --calls 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+UTTERANCES = [
+    "Hello, I wanted to ask about the pricing of the pro plan",
+    "Honestly this is too expensive for us right now",
+    "Can you schedule a demo for next week?",
+    "The last purchase broke after two days, I'm really disappointed",
+    "That sounds great, I'm interested in the new tablet",
+    "I need support with my account, nothing works",
+    "Thanks, that was helpful. Bye!",
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+async def in_process_call(app, customer, utterances, latencies, first_stage):
+    inbox = asyncio.Queue()
+    outbox = asyncio.Queue()
+    scope = {"type": "websocket", "path": f"/ws/calls/{quote(customer, safe='')}", "query_string": b""}
+    task = asyncio.create_task(app(scope, inbox.get, outbox.put))
+    await inbox.put({"type": "websocket.connect"})
+    assert (await outbox.get())["type"] == "websocket.accept"
+
+    for text in utterances:
+        start = time.perf_counter()
+        await inbox.put({"type": "websocket.receive", "text": json.dumps({"type": "transcript", "text": text})})
+        first = None
+        while True:
+            message = json.loads((await outbox.get())["text"])
+            if first is None and message["type"] == "stage":
+                first = time.perf_counter() - start
+            if message["type"] == "done":
+                break
+        latencies.append(time.perf_counter() - start)
+        first_stage.append(first)
+
+    await inbox.put({"type": "websocket.disconnect", "code": 1000})
+    await task
+
+
+async def in_process_post(app, path, body):
+    """POST a JSON body to the ASGI app; returns (status, decoded JSON response)."""
+    sent = []
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(b"".join(message.get("body", b"") for message in sent[1:]))
+
+
+MALFORMED_BODIES = [
+    ("/recommendations", {"customer": "Alice", "emotion_score": 1}),
+    ("/recommendations", {"customer": "Alice", "interests": "Hiking", "emotion_score": 1}),
+    ("/recommendations", {"customer": "Alice", "interests": ["Hiking"], "emotion_score": "high"}),
+    ("/objection-response", {}),
+    ("/summary", {"customer": 7, "transcript": "Hello", "emotion_score": 0}),
+    ("/summary/merge", {"customer": "Alice", "summaries": [1, 2]}),
+    ("/summary/call", {"customer": "Alice", "summaries": [], "emotion_score": 0}),
+]
+
+
+async def check_bodies(app):
+    """Malformed Gemini endpoint bodies must be rejected with a 400, not fail with a 500."""
+    failures = []
+    for path, body in MALFORMED_BODIES:
+        status, response = await in_process_post(app, path, body)
+        if status != 400:
+            failures.append(f"POST {path} {json.dumps(body)}: {status} {response.get('error')}")
+    status, response = await in_process_post(app, "/recommendations",
+                                              {"customer": "Alice", "interests": ["Hiking"], "emotion_score": 1})
+    if status != 200:
+        failures.append(f"POST /recommendations with a valid body: {status} {response.get('error')}")
+    return failures
+
+
+async def run_in_process(args, customers):
+    import service
+    service.install_stub_llm(args.stub_latency)
+    service.configure_executor()
+    failures = await check_bodies(service.app)
+    if failures:
+        print("FAILED " + "\nFAILED ".join(failures))
+        sys.exit(1)
+    latencies, first_stage = [], []
+    rng = random.Random(0)
+    calls = [
+        in_process_call(service.app, rng.choice(customers),
+                        [rng.choice(UTTERANCES) for _ in range(args.utterances)], latencies, first_stage)
+        for _ in range(args.calls)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*calls)
+    return time.perf_counter() - start, latencies, first_stage
+
+
+def run_against_url(args, customers):
+    rng = random.Random(0)
+
+    def one_call(customer):
+        call_latencies = []
+        for _ in range(args.utterances):
+            body = json.dumps({"customer": customer, "query": rng.choice(UTTERANCES)}).encode("utf-8")
+            request = urllib.request.Request(args.url.rstrip("/") + "/analyze", data=body, method="POST",
+                                             headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+            call_latencies.append(time.perf_counter() - start)
+        return call_latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.calls) as pool:
+        results = list(pool.map(one_call, [rng.choice(customers) for _ in range(args.calls)]))
+    return time.perf_counter() - start, [latency for call in results for latency in call], []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20, help="Concurrent calls")
+    parser.add_argument("--utterances", type=int, default=5, help="Transcript segments per call")
+    parser.add_argument("--stub-latency", type=float, default=0.5, help="Stub Gemini latency in seconds")
+    parser.add_argument("--url", help="Load test a running service instead of the in-process app")
+    parser.add_argument("--crm", default="crm.json")
+    parser.add_argument("--use-cache", action="store_true", help="Keep the Gemini response cache enabled")
+    args = parser.parse_args()
+
+    if not args.use_cache:
+        # Cached stub answers would hide the LLM latency being tested
+        os.environ["GEMINI_CACHE"] = "off"
+
+    with open(args.crm) as file:
+        customers = list(json.load(file))
+
+    if args.url:
+        elapsed, latencies, first_stage = run_against_url(args, customers)
+    else:
+        elapsed, latencies, first_stage = asyncio.run(run_in_process(args, customers))
+
+    print(f"{len(latencies)} utterances over {args.calls} concurrent calls in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.1f} utterances/s)")
+    print(f"all stages: p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    if first_stage:
+        print(f"first stage: p50 {statistics.median(first_stage) * 1000:.1f} ms, "
+              f"p99 {percentile(first_stage, 0.99) * 1000:.1f} ms")
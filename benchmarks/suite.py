@@ -0,0 +1,374 @@
+"""Deterministic end-to-end benchmark suite with baseline regression checks.
+
+Builds a synthetic CRM (--customers) and a synthetic transcript corpus from a
+fixed seed, replaces Gemini and speech recognition with the offline stub
+backends (fixed latency, no jitter), and then measures every entry point the
+assistant exposes plus the full voice -> suggestion flow (stub ASR, then the
+AssistPipeline until the recommendations stage is done):
+
+    crm.*        get_crm_data, get_user_info, search_customers, find_customers
+    intent.*     process_query
+    sentiment.*  analyze_sentiment, queryToSentiment
+    gemini.*     recommend_product, generate_prompt, generate_summary
+    asr.*        transcribe
+    flow.*       voice_to_suggestion
+
+Each entry point gets warm-up calls, then timed calls spread over
+--concurrency threads; reported are throughput (calls/sec), mean, p50 and p99
+latency and the error count. Entry points whose dependencies are missing
+(e.g. NLTK for VADER) are reported as skipped.
+
+Before timing anything it checks that a failing vector index doesn't turn a
+CRM write into an error, and exits with status 1 if it does.
+
+Results are written as JSON (--output). With --baseline, every entry point is
+compared with the stored baseline: a p50/p99 more than --tolerance slower, or
+a throughput that much lower, is flagged as a regression and the exit status
+is 1, so the suite can gate CI. --save-baseline stores this run as the new
+baseline. Baselines are machine specific; record one on the machine that
+checks against it.
+
+    python benchmarks/suite.py --save-baseline
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --only crm intent --iterations 5000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_crm_bulk import INTERESTS, synthetic_rows  # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+# Building blocks of the transcript corpus: sentiment, intents and objections
+OPENERS = ["Hi,", "Well,", "Honestly,", "Okay so", "Look,", "Thanks for calling back,"]
+MOODS = [
+    "I love how the last order worked out and",
+    "I'm really disappointed with the delivery and",
+    "this is too expensive for us and",
+    "the product broke after two days and",
+    "your team was super helpful and",
+    "I'm not sure about this yet and",
+]
+ASKS = [
+    "I'd like a demo of the new tablet.",
+    "what does the pro plan cost?",
+    "I need support with my account.",
+    "I'm interested in something for {interest}.",
+    "I already purchased a smartwatch last month.",
+    "can you match the price of a competitor?",
+    "I want to cancel my subscription.",
+    "send me the pricing for the enterprise plan.",
+]
+
+
+def synthetic_transcripts(count, seed=0):
+    """Deterministic customer utterances mixing sentiment, intents and objections."""
+    rng = random.Random(seed)
+    return [" ".join([rng.choice(OPENERS), rng.choice(MOODS),
+                      rng.choice(ASKS).format(interest=rng.choice(INTERESTS).lower())])
+            for _ in range(count)]
+
+
+def write_synthetic_crm(file_path, count, seed=0):
+    """Write count synthetic customers to a crm.json file; returns their names."""
+    data = {}
+    for row in synthetic_rows(count, seed):
+        data[row.pop("name")] = row
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    return list(data)
+
+
+class SyntheticAudio:
+    """Silent 16 kHz audio that the stub ASR backend transcribes to a known text."""
+
+    sample_rate = 16000
+    sample_width = 2
+
+    def __init__(self, text, words_per_second=2.5):
+        self.text = text
+        self.frame_data = bytes(int(len(text.split()) / words_per_second * self.sample_rate) * self.sample_width)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def run_entry_point(fn, calls, warmup, concurrency):
+    """Time fn(i) for i in range(calls); returns the result dict for the JSON report."""
+    try:
+        for index in range(warmup):
+            fn(index)
+    except ImportError as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    def timed(index):
+        start = time.perf_counter()
+        try:
+            fn(index)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, range(warmup, warmup + calls)))
+    else:
+        outcomes = [timed(index) for index in range(warmup, warmup + calls)]
+    wall = time.perf_counter() - start
+    latencies = [elapsed for elapsed, _ in outcomes]
+    errors = [error for _, error in outcomes if error]
+    return {
+        "calls": calls,
+        "concurrency": concurrency,
+        "throughput": calls / wall if wall else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def entry_points(names, transcripts, seed):
+    """{name: (fn(index), slow)}; slow entry points wait on a stubbed LLM or ASR."""
+    import asyncio
+    from ai_functions import AI_Project_Functions as functions
+    from asr_backends import get_backend
+    from lazy_resources import get_sentiment_analyzer
+    from pipeline import AssistPipeline
+
+    rng = random.Random(seed)
+    customers = [rng.choice(names) for _ in range(len(transcripts))]
+    records = {}
+
+    def customer(index):
+        return customers[index % len(customers)]
+
+    def transcript(index):
+        return transcripts[index % len(transcripts)]
+
+    def interests(index):
+        name = customer(index)
+        if name not in records:
+            records[name] = functions.get_user_info(None, name)
+        return list(records[name].get("interests", []))
+
+    def voice_to_suggestion(index):
+        if index == 0:
+            get_sentiment_analyzer()  # A missing NLTK should skip the flow, not show up as stage errors
+        text = get_backend("stub").transcribe(SyntheticAudio(transcript(index)))
+
+        async def until_recommendations():
+            async for result in AssistPipeline().stream(customer(index), text):
+                if result.stage == "recommendations":
+                    if result.error:
+                        raise RuntimeError(result.error)
+                    return result.value
+        return asyncio.run(until_recommendations())
+
+    return {
+        "crm.get_crm_data": (lambda i: functions.get_crm_data(), False),
+        "crm.get_user_info": (lambda i: functions.get_user_info(None, customer(i)), False),
+        "crm.search_customers": (lambda i: functions.search_customers(customer(i)[:10 + i % 4], limit=20), False),
+        "crm.find_customers": (lambda i: functions.find_customers(interests(i)[:1], match="all"), False),
+        "intent.process_query": (lambda i: functions.process_query(transcript(i)), False),
+        "sentiment.analyze_sentiment": (lambda i: functions.analyze_sentiment(transcript(i)), False),
+        "sentiment.queryToSentiment": (lambda i: functions.queryToSentiment(customer(i), transcript(i)), True),
+        "gemini.recommend_product": (
+            lambda i: functions.recommend_product(customer(i), interests(i), 1 + i % 10), True),
+        "gemini.generate_prompt": (lambda i: functions.generate_prompt(transcript(i)), True),
+        "gemini.generate_summary": (lambda i: functions.generate_summary(customer(i), transcript(i), 5), True),
+        "asr.transcribe": (lambda i: get_backend("stub").transcribe(SyntheticAudio(transcript(i))), True),
+        "flow.voice_to_suggestion": (voice_to_suggestion, True),
+    }
+
+
+def check_failures(names):
+    """Return the failure-handling guarantees that do not hold (empty when all is well)."""
+    from ai_functions import AI_Project_Functions as functions
+    import vector_index
+
+    failures = []
+    index_customer = vector_index.index_customer
+    logger = logging.getLogger("ai_functions")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)  # The expected tracebacks would only clutter the report
+
+    def broken_index(name, record):
+        raise OSError("vector index unavailable")
+
+    # A failing vector index must not turn a CRM write that succeeded into an error
+    vector_index.index_customer = broken_index
+    try:
+        for label, call in (("update_interests", lambda: functions.update_interests(names[0], "Hiking")),
+                            ("add_entry_to_crm", lambda: functions.add_entry_to_crm(
+                                "Index Failure Check", ["Laptop"], ["Hiking"]))):
+            try:
+                message = call()
+            except Exception as e:
+                failures.append(f"{label} raised {type(e).__name__}: {e} when the vector index failed")
+                continue
+            if not message.startswith("Successfully"):
+                failures.append(f"{label} answered {message!r} when the vector index failed")
+    finally:
+        vector_index.index_customer = index_customer
+        logger.setLevel(level)
+    if "Hiking" not in (functions.get_user_info(None, names[0]) or {}).get("interests", []):
+        failures.append("update_interests did not keep the CRM write when the vector index failed")
+    return failures
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return {name: status} and a list of human-readable regression lines."""
+    statuses, regressions = {}, []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if "skipped" in result:
+            statuses[name] = "skipped"
+            continue
+        if not old or "skipped" in old:
+            statuses[name] = "new"
+            continue
+        problems, improved = [], False
+        for metric in ("p50_ms", "p99_ms"):
+            delta = result[metric] - old[metric]
+            if delta > min_delta_ms and result[metric] > old[metric] * (1 + tolerance):
+                problems.append(f"{metric} {old[metric]:.3f} -> {result[metric]:.3f}")
+            elif -delta > min_delta_ms and result[metric] < old[metric] * (1 - tolerance):
+                improved = True
+        if result["throughput"] < old["throughput"] * (1 - tolerance):
+            problems.append(f"throughput {old['throughput']:.1f} -> {result['throughput']:.1f}/s")
+        if result["errors"] > old.get("errors", 0):
+            problems.append(f"errors {old.get('errors', 0)} -> {result['errors']}")
+        statuses[name] = "REGRESSION" if problems else "improved" if improved else "ok"
+        if problems:
+            regressions.append(f"{name}: " + ", ".join(problems))
+    return statuses, regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCHMARKS_DIR, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=10000, help="Synthetic CRM size")
+    parser.add_argument("--transcripts", type=int, default=1000, help="Synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed calls per CPU-bound entry point")
+    parser.add_argument("--slow-iterations", type=int, default=200, help="Timed calls per LLM/ASR entry point")
+    parser.add_argument("--concurrency", type=int, default=8, help="Threads for the LLM/ASR entry points")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub Gemini latency (seconds)")
+    parser.add_argument("--asr-latency", type=float, default=0.02, help="Stub ASR latency (seconds)")
+    parser.add_argument("--only", nargs="*", help="Entry point name prefixes to run (e.g. crm flow)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help=f"Baseline to compare with (e.g. {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="assistant-bench-")
+    crm_path = os.path.join(workdir, "crm.json")
+    names = write_synthetic_crm(crm_path, args.customers, args.seed)
+    transcripts = synthetic_transcripts(args.transcripts, args.seed)
+    # Configure everything before ai_functions is imported: stubs, no caches, no logging, private index files
+    os.environ.update({
+        "CRM_PATH": crm_path,
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_LATENCY": str(args.llm_latency),
+        "LLM_STUB_JITTER": "0",
+        "LLM_STUB_FAILURE_RATE": "0",
+        "GEMINI_RATE_LIMIT": "1000000",
+        "GEMINI_BURST": "1000000",
+        "GEMINI_MAX_CONCURRENCY": str(max(16, args.concurrency * 2)),
+        "GEMINI_CACHE": "off",
+        "ASR_STUB_LATENCY": str(args.asr_latency),
+        "ASR_STUB_RTF": "0",
+        "INTERACTION_LOG": "off",
+        "RECOMMENDATION_INDEX_PATH": os.path.join(workdir, "recommendations.idx"),
+        "VECTOR_INDEX_PATH": os.path.join(workdir, "vector_index.npz"),
+        # A fresh library per run, or clusters learned by earlier runs would turn misses into hits
+        "OBJECTION_LIBRARY_PATH": os.path.join(workdir, "objection_library.db"),
+        "OBJECTION_SEED_PATH": os.path.join(os.path.dirname(BENCHMARKS_DIR), "objections.json"),
+        "INTENTS_PATH": os.path.join(os.path.dirname(BENCHMARKS_DIR), "intents.json"),
+        "CATALOG_PATH": os.path.join(os.path.dirname(BENCHMARKS_DIR), "catalog.json"),
+    })
+
+    failures = check_failures(names)
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if failures:
+        sys.exit(1)
+
+    results = {}
+    for name, (fn, slow) in entry_points(names, transcripts, args.seed).items():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        if slow:
+            result = run_entry_point(fn, args.slow_iterations, warmup=args.concurrency, concurrency=args.concurrency)
+        else:
+            result = run_entry_point(fn, args.iterations, warmup=min(50, args.iterations), concurrency=1)
+        results[name] = result
+        if "skipped" in result:
+            print(f"{name:30} skipped ({result['skipped']})")
+        else:
+            print(f"{name:30} {result['throughput']:10.1f}/s  p50 {result['p50_ms']:9.3f} ms  "
+                  f"p99 {result['p99_ms']:9.3f} ms  errors {result['errors']}")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items()
+                         if key not in ("output", "baseline", "save_baseline")},
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline["meta"].get("settings") != report["meta"]["settings"]:
+            print("Warning: baseline was recorded with different settings; comparisons may not be meaningful.")
+        statuses, regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms)
+        report["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "status": statuses,
+                                "regressions": regressions}
+        print(f"\nAgainst {args.baseline} (commit {baseline['meta'].get('commit')}):")
+        for name, status in statuses.items():
+            print(f"  {name:30} {status}")
+        for line in regressions:
+            print(f"  regression: {line}")
+        exit_code = 1 if regressions else 0
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    sys.exit(exit_code)
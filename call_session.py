@@ -0,0 +1,146 @@
+"""Rolling per-call sentiment timeline.
+
+A CallSession keeps the last N utterance scores of a call in a fixed-size ring
+buffer and updates its aggregates in O(1) per utterance: exponential moving
+average, min/max, a least-squares trend slope over the buffered window and
+drop alerts. Nothing is re-scored when a new utterance arrives, so the cost of
+an update does not grow with the length of the call.
+"""
+import time
+from array import array
+from dataclasses import dataclass
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+@dataclass
+class SentimentAlert:
+    """A mood drop detected during the call."""
+    kind: str  # "drop" (already fell) or "forecast" (trend will reach the low threshold soon)
+    at: float  # seconds since the call started
+    message: str
+
+
+class CallSession:
+    """Utterance-level sentiment for one call, with incrementally maintained aggregates."""
+
+    def __init__(self, customer_name, capacity=512, ema_alpha=0.3, drop_points=2.0,
+                 low_threshold=4.0, forecast_horizon=120.0, clock=time.monotonic):
+        self.customer_name = customer_name
+        self.capacity = capacity
+        self.ema_alpha = ema_alpha
+        self.drop_points = drop_points
+        self.low_threshold = low_threshold
+        self.forecast_horizon = forecast_horizon
+        self._clock = clock
+        self.started_at = clock()
+
+        # Ring buffer of (seconds since start, score)
+        self._times = array('d', [0.0] * capacity)
+        self._scores = array('d', [0.0] * capacity)
+        self._head = 0  # next slot to write
+        self.size = 0
+        self.count = 0  # utterances seen over the whole call
+
+        # Running sums over the buffered window for the trend slope
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+
+        self.ema = None
+        self.min = None
+        self.max = None
+        self._peak_ema = None
+        self._peak_at = 0.0
+        self._forecast_active = False
+        self.alerts = []
+
+    def add(self, score, at=None):
+        """Record one utterance score (1-10) and update every aggregate. Returns new alerts."""
+        at = self._clock() - self.started_at if at is None else at
+        score = float(score)
+
+        if self.size == self.capacity:
+            # Evict the oldest sample from the window sums
+            old_t, old_y = self._times[self._head], self._scores[self._head]
+            self._sum_t -= old_t
+            self._sum_y -= old_y
+            self._sum_tt -= old_t * old_t
+            self._sum_ty -= old_t * old_y
+        else:
+            self.size += 1
+        self._times[self._head] = at
+        self._scores[self._head] = score
+        self._head = (self._head + 1) % self.capacity
+        self._sum_t += at
+        self._sum_y += score
+        self._sum_tt += at * at
+        self._sum_ty += at * score
+        self.count += 1
+
+        self.ema = score if self.ema is None else self.ema_alpha * score + (1 - self.ema_alpha) * self.ema
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        return self._check_alerts(at)
+
+    @property
+    def slope(self):
+        """Least-squares trend of the buffered scores, in points per minute."""
+        n = self.size
+        if n < 2:
+            return 0.0
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        if denominator <= 1e-9:
+            return 0.0
+        return (n * self._sum_ty - self._sum_t * self._sum_y) / denominator * 60
+
+    def _check_alerts(self, at):
+        new_alerts = []
+        if self._peak_ema is None or self.ema >= self._peak_ema:
+            self._peak_ema, self._peak_at = self.ema, at
+        elif self._peak_ema - self.ema >= self.drop_points:
+            new_alerts.append(SentimentAlert(
+                "drop", at,
+                f"Mood fell {self._peak_ema - self.ema:.1f} points in {at - self._peak_at:.0f}s "
+                f"(now {self.ema:.1f}/10)."
+            ))
+            # Start watching for the next drop from here
+            self._peak_ema, self._peak_at = self.ema, at
+
+        slope = self.slope
+        seconds_to_low = None
+        if slope < 0 and self.ema > self.low_threshold:
+            seconds_to_low = (self.ema - self.low_threshold) / -slope * 60
+        if seconds_to_low is not None and seconds_to_low <= self.forecast_horizon:
+            if not self._forecast_active:
+                new_alerts.append(SentimentAlert(
+                    "forecast", at,
+                    f"At the current trend mood reaches {self.low_threshold:g}/10 in about {seconds_to_low:.0f}s."
+                ))
+            self._forecast_active = True
+        else:
+            self._forecast_active = False
+
+        self.alerts.extend(new_alerts)
+        return new_alerts
+
+    def scores(self):
+        """Buffered scores, oldest first."""
+        if self.size < self.capacity:
+            return list(self._scores[:self.size])
+        return list(self._scores[self._head:]) + list(self._scores[:self._head])
+
+    def sparkline(self, width=60):
+        """Unicode sparkline of the most recent scores on the fixed 1-10 scale."""
+        values = self.scores()[-width:]
+        last = len(SPARK_CHARS) - 1
+        return "".join(SPARK_CHARS[max(0, min(last, round((value - 1) / 9 * last)))] for value in values)
+
+    def summary(self):
+        """Current aggregates as a plain dict."""
+        return {
+            "utterances": self.count,
+            "ema": self.ema,
+            "min": self.min,
+            "max": self.max,
+            "slope_per_min": self.slope,
+            "alerts": len(self.alerts),
+        }
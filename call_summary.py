@@ -0,0 +1,160 @@
+"""Map-reduce call summaries, built while the call is still going.
+
+generate_summary used to send the whole transcript in one prompt, which fails
+for long calls and can't start until the call has ended. CallSummarizer
+collects transcript segments as they arrive and:
+
+* map    - seals every SUMMARY_CHUNK_WORDS words into a chunk and summarizes
+           it on a worker thread right away,
+* reduce - merges every `fan_in` consecutive summaries into one, level by
+           level, so the number of partial summaries stays logarithmic in the
+           length of the call.
+
+Chunk and merge prompts go through query_gemini, so they are also kept in the
+Gemini response cache. At hang-up (finish) only the words since the last
+sealed chunk are new: they go verbatim into a single final prompt together
+with the few partial summaries, so the final summary costs one Gemini call
+(streamed) however long the call was.
+
+A chunk or merge that still fails after SUMMARY_RETRIES retries is replaced
+by its input text (the chunk's words, or the summaries being merged), so one
+transient Gemini error costs a longer final prompt instead of the summary.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+SUMMARY_CHUNK_WORDS = int(os.getenv("SUMMARY_CHUNK_WORDS", "300"))
+SUMMARY_FAN_IN = int(os.getenv("SUMMARY_FAN_IN", "4"))
+SUMMARY_RETRIES = int(os.getenv("SUMMARY_RETRIES", "1"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_summary_executor():
+    """Shared worker pool for chunk summaries (SUMMARY_WORKERS threads, default 8)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.getenv("SUMMARY_WORKERS", "8")),
+                                           thread_name_prefix="call-summary")
+        return _executor
+
+
+class CallSummarizer:
+    """Incremental, hierarchical summary of one call's transcript."""
+
+    def __init__(self, customer_name, functions=None, chunk_words=SUMMARY_CHUNK_WORDS,
+                 fan_in=SUMMARY_FAN_IN, executor=None, retries=SUMMARY_RETRIES):
+        if functions is None:
+            from ai_functions import AI_Project_Functions
+            functions = AI_Project_Functions
+        self.customer_name = customer_name
+        self.functions = functions
+        self.chunk_words = chunk_words
+        self.fan_in = fan_in
+        self.retries = retries
+        self.executor = executor or get_summary_executor()
+        self._tail = []      # words not yet sealed into a chunk
+        self._levels = [[]]  # futures: level 0 = chunk summaries, level n = merges of level n - 1
+        self._merged = [0]   # items of each level already handed to a merge
+        self._inputs = {}    # merge future -> the futures it merges
+        # Re-entrant: a future that is already done runs its callback inside _submit
+        self._lock = threading.RLock()
+        self.chunks = 0
+        self.errors = []  # Chunks and merges that fell back to their input text
+
+    def add_segment(self, text):
+        """Add one transcript segment; full chunks are summarized in the background."""
+        words = text.split()
+        with self._lock:
+            self._tail.extend(words)
+            while len(self._tail) >= self.chunk_words:
+                chunk = " ".join(self._tail[:self.chunk_words])
+                del self._tail[:self.chunk_words]
+                self.chunks += 1
+                self._submit(0, self._attempt, self.functions.summarize_chunk, chunk, chunk)
+
+    def _attempt(self, fn, argument, fallback):
+        """fn(customer, argument), retried; fallback text once every attempt has failed."""
+        for attempt in range(self.retries + 1):
+            try:
+                return fn(self.customer_name, argument)
+            except Exception as e:
+                error = e
+        self.errors.append(error)
+        return fallback
+
+    def _submit(self, level, fn, *args, inputs=None):
+        # Called with self._lock held
+        if level == len(self._levels):
+            self._levels.append([])
+            self._merged.append(0)
+        future = self.executor.submit(fn, *args)
+        self._levels[level].append(future)
+        if inputs is not None:
+            self._inputs[future] = inputs
+        future.add_done_callback(lambda _: self._merge_ready())
+
+    def _merge_ready(self):
+        """Merge every complete group of fan_in finished summaries into the next level."""
+        with self._lock:
+            for level in range(len(self._levels)):
+                while True:
+                    group = self._levels[level][self._merged[level]:self._merged[level] + self.fan_in]
+                    if len(group) < self.fan_in or not all(future.done() for future in group):
+                        break
+                    self._merged[level] += self.fan_in
+                    summaries = [future.result() for future in group]
+                    self._submit(level + 1, self._attempt, self.functions.merge_summaries, summaries,
+                                 "\n\n".join(summaries), inputs=group)
+
+    def partial_summaries(self):
+        """Return the unmerged summaries (oldest first) and the raw tail, waiting only for chunks in flight.
+
+        A merge still running is replaced by the summaries it was merging, so
+        hang-up never waits on a chain of merges.
+        """
+        with self._lock:
+            # Higher levels cover earlier parts of the call
+            frontier = [future for level in reversed(range(len(self._levels)))
+                        for future in self._levels[level][self._merged[level]:]]
+            tail = " ".join(self._tail)
+        futures = []
+        while frontier:
+            future = frontier.pop(0)
+            inputs = self._inputs.get(future)
+            if inputs is not None and (not future.done() or future.exception() is not None):
+                frontier[:0] = inputs
+            else:
+                futures.append(future)
+        wait(futures)
+        return [future.result() for future in futures], tail
+
+    def finish(self, emotion_score, stream=False):
+        """Final summary of the call so far (a chunk generator when stream is True).
+
+        The summarizer keeps its state, so segments can still be added afterwards.
+        Raises gemini_client.LLMError when Gemini can't answer.
+        """
+        summaries, tail = self.partial_summaries()
+        if not summaries:
+            # Short call: same single prompt as before
+            return self.functions.generate_summary(self.customer_name, tail, emotion_score, stream=stream)
+        # Merge concurrently until the final prompt stays small
+        while len(summaries) > 2 * self.fan_in:
+            groups = [summaries[start:start + self.fan_in] for start in range(0, len(summaries), self.fan_in)]
+            summaries = list(self.executor.map(
+                lambda group: (self._attempt(self.functions.merge_summaries, group, "\n\n".join(group))
+                               if len(group) > 1 else group[0]),
+                groups,
+            ))
+        return self.functions.summarize_call(self.customer_name, summaries, tail, emotion_score, stream=stream)
+
+
+def summarize_transcript(customer_name, transcript, emotion_score, stream=False, functions=None):
+    """Summarize a finished transcript with concurrent chunk summaries (for long transcripts)."""
+    summarizer = CallSummarizer(customer_name, functions)
+    summarizer.add_segment(transcript)
+    return summarizer.finish(emotion_score, stream=stream)
@@ -0,0 +1,263 @@
+"""Compact, read-only in-memory form of the CRM.
+
+The dict form of the CRM holds a list of strings per field per customer, so
+"Electronics" or "Fitness Tracker" is referenced millions of times and every
+record costs several dicts and lists. CompactCRM interns each vocabulary
+(interests, products, recommendations) once and stores the per-customer lists
+as CSR columns: one array of vocabulary ids plus one array of row offsets.
+A customer costs a few array slots plus its entry in the name index.
+
+CompactCRM is a read-only Mapping of name -> CustomerRecord (itself a Mapping
+of the usual fields, list fields as tuples), so it is a drop-in replacement
+for the frozen dict snapshot that crm_store hands out. It also answers
+inverted lookups, built on first use:
+
+    crm.customers_with_interest("Fitness")
+    crm.customers_with_purchase("Yoga Mat")
+    crm.customers_matching(interests=["Fitness", "Outdoors"], purchases=["Bicycle"])
+
+crm_store snapshots use this form unless CRM_SNAPSHOT=dict.
+"""
+import sys
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# Field -> vocabulary; purchases and recommendations are both product names
+LIST_FIELDS = {"interests": "interests", "past_purchases": "products", "recommendations": "recommendations"}
+_FIELD_BITS = {field: 1 << bit for bit, field in enumerate(LIST_FIELDS)}
+
+
+def freeze(data):
+    """Return a read-only view of CRM data: mappings become proxies, lists become tuples."""
+    if isinstance(data, dict):
+        return MappingProxyType({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(value) for value in data)
+    return data
+
+
+def thaw(data):
+    """Return a plain, mutable copy of frozen CRM data: mappings become dicts, tuples become lists."""
+    if isinstance(data, Mapping):
+        return {key: thaw(value) for key, value in data.items()}
+    if isinstance(data, tuple):
+        return [thaw(value) for value in data]
+    return data
+
+
+class Vocabulary:
+    """Interned strings <-> dense integer ids."""
+
+    __slots__ = ("ids", "terms")
+
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+
+    def add(self, term):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            term = sys.intern(term)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def id_of(self, term):
+        return self.ids.get(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class CSRColumn:
+    """Variable-length integer lists in two flat arrays: row i is ids[offsets[i]:offsets[i + 1]]."""
+
+    __slots__ = ("offsets", "ids")
+
+    def __init__(self):
+        self.offsets = array("I", [0])
+        self.ids = array("I")
+
+    def append(self, row_ids):
+        self.ids.extend(row_ids)
+        self.offsets.append(len(self.ids))
+
+    def row(self, index):
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def inverted(self, vocabulary_size):
+        """Transpose into a CSRColumn of term id -> sorted row numbers (counting sort, two passes)."""
+        counts = array("I", bytes(4 * (vocabulary_size + 1)))
+        for term_id in self.ids:
+            counts[term_id + 1] += 1
+        for term_id in range(vocabulary_size):
+            counts[term_id + 1] += counts[term_id]
+        result = CSRColumn()
+        result.offsets = array("I", counts)
+        result.ids = array("I", bytes(4 * len(self.ids)))
+        cursor = array("I", counts[:-1])
+        offsets, ids = self.offsets, self.ids
+        for row in range(len(offsets) - 1):
+            for position in range(offsets[row], offsets[row + 1]):
+                term_id = ids[position]
+                result.ids[cursor[term_id]] = row
+                cursor[term_id] += 1
+        return result
+
+    def nbytes(self):
+        return self.offsets.itemsize * len(self.offsets) + self.ids.itemsize * len(self.ids)
+
+
+class CustomerRecord(Mapping):
+    """Read-only view of one customer in a CompactCRM; list fields come back as tuples."""
+
+    __slots__ = ("_crm", "_row")
+
+    def __init__(self, crm, row):
+        self._crm = crm
+        self._row = row
+
+    def _keys(self):
+        crm, row = self._crm, self._row
+        present = crm._present[row]
+        keys = [field for field, bit in _FIELD_BITS.items() if present & bit]
+        extra = crm._extra.get(row)
+        return keys + list(extra) if extra else keys
+
+    def __getitem__(self, key):
+        crm, row = self._crm, self._row
+        bit = _FIELD_BITS.get(key)
+        if bit is not None and crm._present[row] & bit:
+            terms = crm.vocabularies[LIST_FIELDS[key]].terms
+            return tuple(terms[term_id] for term_id in crm.columns[key].row(row))
+        extra = crm._extra.get(row)
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return f"CustomerRecord({dict(self)!r})"
+
+
+class CompactCRM(Mapping):
+    """Read-only CRM: name -> CustomerRecord, backed by interned vocabularies and CSR columns."""
+
+    def __init__(self):
+        self.names = []
+        self._rows = {}
+        self.vocabularies = {name: Vocabulary() for name in set(LIST_FIELDS.values())}
+        self.columns = {field: CSRColumn() for field in LIST_FIELDS}
+        self._present = array("B")  # Bit per list field that the record actually has
+        self._extra = {}            # row -> frozen dict of any other fields (rare)
+        self._inverted = {}
+
+    @classmethod
+    def from_items(cls, items):
+        """Build from (name, record dict) pairs, e.g. store.iter_items()."""
+        crm = cls()
+        for name, record in items:
+            crm._append(name, record)
+        return crm
+
+    def _append(self, name, record):
+        if name in self._rows:
+            raise ValueError(f"Duplicate customer name: {name!r}")
+        row = len(self.names)
+        present = 0
+        extra = {}
+        for key, value in record.items():
+            if key in LIST_FIELDS and isinstance(value, list) and all(type(item) is str for item in value):
+                present |= _FIELD_BITS[key]
+            else:
+                extra[key] = value  # Unknown fields, and list fields that aren't lists of strings, stay as-is
+        for field, vocabulary_name in LIST_FIELDS.items():
+            vocabulary = self.vocabularies[vocabulary_name]
+            values = record[field] if present & _FIELD_BITS[field] else ()
+            self.columns[field].append([vocabulary.add(value) for value in values])
+        if extra:
+            self._extra[row] = freeze(extra)
+        self._present.append(present)
+        self._rows[name] = row
+        self.names.append(name)
+
+    # Mapping
+
+    def __getitem__(self, name):
+        return CustomerRecord(self, self._rows[name])
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"CompactCRM({len(self)} customers)"
+
+    # Inverted lookups
+
+    def _postings(self, field, term):
+        vocabulary = self.vocabularies[LIST_FIELDS[field]]
+        term_id = vocabulary.id_of(term)
+        if term_id is None:
+            return array("I")
+        inverted = self._inverted.get(field)
+        if inverted is None:
+            # Snapshots are shared across threads; building twice is harmless
+            inverted = self._inverted[field] = self.columns[field].inverted(len(vocabulary))
+        return inverted.row(term_id)
+
+    def customers_with_interest(self, interest):
+        """Names of customers with this interest, in CRM order."""
+        return [self.names[row] for row in self._postings("interests", interest)]
+
+    def customers_with_purchase(self, product):
+        """Names of customers who bought this product, in CRM order."""
+        return [self.names[row] for row in self._postings("past_purchases", product)]
+
+    def customers_matching(self, interests=(), purchases=(), match="all"):
+        """Names of customers having all (or, with match="any", any) of the given interests and purchases."""
+        postings = [self._postings("interests", term) for term in interests]
+        postings += [self._postings("past_purchases", term) for term in purchases]
+        if not postings:
+            return []
+        if match == "any":
+            rows = set().union(*postings)
+        else:
+            # Intersect starting from the rarest term
+            postings.sort(key=len)
+            rows = set(postings[0])
+            for posting in postings[1:]:
+                if not rows:
+                    break
+                rows.intersection_update(posting)
+        return [self.names[row] for row in sorted(rows)]
+
+    def term_counts(self, field):
+        """{term: number of customers} for interests, past_purchases or recommendations."""
+        terms = self.vocabularies[LIST_FIELDS[field]].terms
+        counts = [0] * len(terms)
+        for term_id in self.columns[field].ids:
+            counts[term_id] += 1
+        return {terms[term_id]: count for term_id, count in enumerate(counts) if count}
+
+    def nbytes(self):
+        """Approximate memory held by the columns and vocabularies (excludes names and the name index)."""
+        size = sum(column.nbytes() for column in self.columns.values()) + len(self._present)
+        for vocabulary in self.vocabularies.values():
+            size += sys.getsizeof(vocabulary.ids) + sum(sys.getsizeof(term) for term in vocabulary.terms)
+        return size
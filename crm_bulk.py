@@ -0,0 +1,311 @@
+"""Bulk CRM import and export (CSV, JSONL, Parquet).
+
+For nightly syncs from the main CRM. Files are streamed in chunks, so memory
+stays bounded by the chunk size (with an SQLite CRM; a crm.json file is held
+in memory and rewritten once at the end anyway). Every row is validated,
+unchanged customers are skipped, and changed ones are upserted with one
+put_many transaction per chunk.
+
+Record layout:
+    name                                        required, non-empty
+    interests, past_purchases, recommendations  lists of strings; in CSV a
+                                                single cell separated by ";"
+                                                (empty recommendations keep the
+                                                customer's current ones)
+    extra                                       any other fields, as a JSON object
+
+    python crm_bulk.py import customers.csv --crm crm.db --dry-run
+    python crm_bulk.py import customers.parquet --crm crm.db
+    python crm_bulk.py export backup.jsonl --crm crm.db
+
+After a large import, rebuild the derived indexes with
+python vector_index.py build and python recommendation_index.py build.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from crm_store import get_store
+
+LIST_FIELDS = ("interests", "past_purchases", "recommendations")
+CSV_COLUMNS = ("name",) + LIST_FIELDS + ("extra",)
+LIST_SEPARATOR = ";"
+MAX_NAME_LENGTH = 200
+
+
+class ValidationError(ValueError):
+    """A row that can't be imported."""
+
+
+@dataclass
+class BulkReport:
+    """What an import or export did (or, for a dry run, would do)."""
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+    changes: list = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.rows} rows in {self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/sec): "
+                f"{self.inserted} new, {self.updated} changed, {self.unchanged} unchanged, {self.invalid} invalid")
+
+
+def detect_format(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    formats = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+    if extension not in formats:
+        raise ValueError(f"Can't tell the format of {file_path}; pass --format csv, jsonl or parquet")
+    return formats[extension]
+
+
+def _as_list(value, field_name):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    if not isinstance(value, (list, tuple)) and not hasattr(value, "tolist"):
+        raise ValidationError(f"{field_name} must be a list of strings")
+    items = []
+    for item in (value.tolist() if hasattr(value, "tolist") else value):
+        if not isinstance(item, str):
+            raise ValidationError(f"{field_name} must be a list of strings")
+        if item.strip():
+            items.append(item.strip())
+    return items
+
+
+def normalize_record(row):
+    """Validate one input row and return (name, CRM record)."""
+    name = row.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValidationError("name is required")
+    name = name.strip()
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValidationError(f"name is longer than {MAX_NAME_LENGTH} characters")
+
+    extra = row.get("extra") or {}
+    if isinstance(extra, str):
+        try:
+            extra = json.loads(extra)
+        except json.JSONDecodeError:
+            raise ValidationError("extra is not valid JSON")
+    if not isinstance(extra, dict):
+        raise ValidationError("extra must be a JSON object")
+
+    record = dict(extra)
+    record["past_purchases"] = _as_list(row.get("past_purchases"), "past_purchases")
+    record["interests"] = _as_list(row.get("interests"), "interests")
+    recommendations = _as_list(row.get("recommendations"), "recommendations")
+    if recommendations:
+        record["recommendations"] = recommendations
+    return name, record
+
+
+def _chunked(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_chunks(file_path, file_format=None, chunk_size=10000):
+    """Yield lists of (line number, raw row dict) from a CSV, JSONL or Parquet file."""
+    file_format = file_format or detect_format(file_path)
+    if file_format == "csv":
+        with open(file_path, "r", encoding="utf-8", newline="") as file:
+            # Line numbers count the header as line 1
+            yield from _chunked(enumerate(csv.DictReader(file), start=2), chunk_size)
+    elif file_format == "jsonl":
+        with open(file_path, "r", encoding="utf-8") as file:
+            def rows():
+                for number, line in enumerate(file, start=1):
+                    if line.strip():
+                        try:
+                            yield number, json.loads(line)
+                        except json.JSONDecodeError as e:
+                            yield number, e
+            yield from _chunked(rows(), chunk_size)
+    elif file_format == "parquet":
+        import pyarrow.parquet as pq
+        number = 0
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+            rows = batch.to_pylist()
+            yield [(number + offset + 1, row) for offset, row in enumerate(rows)]
+            number += len(rows)
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+def describe_change(name, old, new):
+    """One-line diff of a customer record for --dry-run."""
+    if old is None:
+        return f"+ {name}: {json.dumps(new)}"
+    changed = [f"{key}: {json.dumps(old.get(key))} -> {json.dumps(new.get(key))}"
+               for key in sorted(set(old) | set(new)) if old.get(key) != new.get(key)]
+    return f"~ {name}: " + "; ".join(changed)
+
+
+def import_file(file_path, crm_path="crm.json", file_format=None, chunk_size=10000, dry_run=False,
+                max_errors=20, max_changes=20):
+    """Validate and upsert every row of file_path into the CRM. Returns a BulkReport.
+
+    With dry_run=True nothing is written; the report lists the first
+    max_changes differences instead.
+    """
+    store = get_store(crm_path)
+    # crm.json is rewritten as a whole, so write it once instead of once per chunk
+    write_once = store.backend == "json"
+    current = store.load_all() if write_once else None
+    pending = []
+    report = BulkReport()
+    start = time.perf_counter()
+
+    for chunk in read_chunks(file_path, file_format, chunk_size):
+        records = {}
+        for number, row in chunk:
+            report.rows += 1
+            try:
+                if isinstance(row, Exception):
+                    raise ValidationError(f"invalid JSON ({row})")
+                if not isinstance(row, dict):
+                    raise ValidationError("row must be a JSON object")
+                name, record = normalize_record(row)
+            except ValidationError as e:
+                report.invalid += 1
+                if len(report.errors) < max_errors:
+                    report.errors.append(f"line {number}: {e}")
+                continue
+            records[name] = record  # A later row for the same customer wins
+
+        if current is not None:
+            existing = {name: current[name] for name in records if name in current}
+        else:
+            existing = store.get_many(records)
+        changed = []
+        for name, record in records.items():
+            old = existing.get(name)
+            if old is not None and "recommendations" not in record and "recommendations" in old:
+                # Recommendations are the assistant's own data; a row without any keeps them
+                record["recommendations"] = old["recommendations"]
+            if old == record:
+                report.unchanged += 1
+                continue
+            if old is None:
+                report.inserted += 1
+            else:
+                report.updated += 1
+            if dry_run:
+                if len(report.changes) < max_changes:
+                    report.changes.append(describe_change(name, old, record))
+            else:
+                changed.append((name, record))
+
+        if write_once:
+            pending.extend(changed)
+        elif changed:
+            store.put_many(changed)
+
+    if pending:
+        store.put_many(pending)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _csv_row(name, record):
+    row = {"name": name}
+    for key in LIST_FIELDS:
+        row[key] = LIST_SEPARATOR.join(record.get(key, []))
+    extra = {key: value for key, value in record.items() if key not in LIST_FIELDS}
+    row["extra"] = json.dumps(extra) if extra else ""
+    return row
+
+
+def _jsonl_row(name, record):
+    row = {"name": name}
+    row.update({key: list(record.get(key, [])) for key in LIST_FIELDS})
+    extra = {key: value for key, value in record.items() if key not in LIST_FIELDS}
+    if extra:
+        row["extra"] = extra
+    return row
+
+
+def export_file(file_path, crm_path="crm.json", file_format=None, chunk_size=10000):
+    """Stream every customer into a CSV, JSONL or Parquet file. Returns a BulkReport."""
+    file_format = file_format or detect_format(file_path)
+    store = get_store(crm_path)
+    report = BulkReport()
+    start = time.perf_counter()
+    items = store.iter_items(chunk_size)
+
+    if file_format == "csv":
+        with open(file_path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            for name, record in items:
+                writer.writerow(_csv_row(name, record))
+                report.rows += 1
+    elif file_format == "jsonl":
+        with open(file_path, "w", encoding="utf-8") as file:
+            for name, record in items:
+                file.write(json.dumps(_jsonl_row(name, record)) + "\n")
+                report.rows += 1
+    elif file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([("name", pa.string())] + [(key, pa.list_(pa.string())) for key in LIST_FIELDS]
+                           + [("extra", pa.string())])
+        with pq.ParquetWriter(file_path, schema, compression="zstd") as writer:
+            for chunk in _chunked(items, chunk_size):
+                rows = [dict(_jsonl_row(name, record), extra=_csv_row(name, record)["extra"] or None)
+                        for name, record in chunk]
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                report.rows += len(rows)
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk CRM import and export")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    importer = subparsers.add_parser("import", help="Upsert customers from a CSV, JSONL or Parquet file")
+    importer.add_argument("file_path")
+    importer.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    importer.add_argument("--show", type=int, default=20, help="Changes to list in a dry run")
+    exporter = subparsers.add_parser("export", help="Write every customer to a CSV, JSONL or Parquet file")
+    exporter.add_argument("file_path")
+    for subparser in (importer, exporter):
+        subparser.add_argument("--crm", default=os.getenv("CRM_PATH", "crm.json"))
+        subparser.add_argument("--format", choices=["csv", "jsonl", "parquet"])
+        subparser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        report = import_file(args.file_path, args.crm, args.format, args.chunk_size,
+                             dry_run=args.dry_run, max_changes=args.show)
+        print(("Dry run, nothing written. " if args.dry_run else "") + report.summary())
+        for change in report.changes:
+            print(change)
+        for error in report.errors:
+            print(f"invalid {error}")
+    elif args.command == "export":
+        report = export_file(args.file_path, args.crm, args.format, args.chunk_size)
+        print(f"Exported {report.rows} customers to {args.file_path} in {report.elapsed:.2f}s "
+              f"({report.rows_per_sec:,.0f} rows/sec).")
@@ -0,0 +1,357 @@
+"""Storage backends for the CRM data used by the AI Sales Call Assistant.
+
+Two backends share the same small API
+(load_all/snapshot/names/get/get_many/iter_items/put/put_many/update):
+
+* JSONCRMStore   - the original crm.json file, rewritten on every change.
+* SQLiteCRMStore - one row per customer in an SQLite database running in WAL
+                   mode, so a single customer can be read or written without
+                   touching the rest of the CRM and concurrent writers do not
+                   lose each other's changes.
+
+The backend is picked from the file extension (.db/.sqlite/.sqlite3 -> SQLite)
+or forced with the CRM_BACKEND environment variable ("json" or "sqlite").
+
+snapshot() goes through the process-wide crm_cache, so repeated reads (every
+Streamlit rerun) only parse the CRM again after it has changed. Snapshots are
+CompactCRM objects (interned vocabularies, see compact_crm.py); set
+CRM_SNAPSHOT=dict for the older frozen-dict form.
+
+Migrate an existing crm.json once with:
+
+    python crm_store.py migrate crm.json crm.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from types import MappingProxyType
+
+from compact_crm import CompactCRM, freeze, thaw
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+
+def _file_signature(file_path):
+    """(mtime, size) of the CRM file and its SQLite WAL file, or None if it doesn't exist."""
+    signature = []
+    for path in (file_path, file_path + '-wal'):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if path == file_path:
+                return None
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _build_snapshot(items):
+    """Read-only snapshot of (name, record) pairs in the form CRM_SNAPSHOT asks for."""
+    if os.getenv("CRM_SNAPSHOT", "compact").lower() == "dict":
+        return MappingProxyType({name: freeze(record) for name, record in items})
+    return CompactCRM.from_items(items)
+
+
+class CRMCache:
+    """Process-wide cache of parsed CRM snapshots.
+
+    A snapshot is reused until the file's mtime/size changes or a store in
+    this process writes to it. Snapshots are read-only so one caller can't
+    corrupt the copy every other Streamlit session is using.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, file_path, loader):
+        """Return the cached snapshot for file_path, calling loader() for (name, record) pairs if it is missing or stale."""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            signature = _file_signature(file_path)
+            entry = self._entries.get(key)
+            if entry is not None and signature is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            snapshot = _build_snapshot(loader())
+            if signature is not None:
+                self._entries[key] = (signature, snapshot)
+            return snapshot
+
+    def invalidate(self, file_path):
+        """Drop the snapshot for file_path so the next read reloads it."""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Keep the entry so the next load counts as a reload, not a miss
+                self._entries[key] = (None, entry[1])
+
+    def stats(self):
+        """Return hit/miss/reload counters."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "reloads": self.reloads}
+
+
+crm_cache = CRMCache()
+
+
+class JSONCRMStore:
+    """CRM stored as a single JSON object in a file (the original crm.json format)."""
+
+    backend = "json"
+
+    def __init__(self, file_path='crm.json'):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        """Load every customer. Creates an empty file if it doesn't exist."""
+        try:
+            with open(self.file_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            self._write({})
+            return {}
+
+    def snapshot(self):
+        """Return a cached, read-only view of every customer."""
+        return crm_cache.get(self.file_path, self.iter_items)
+
+    def names(self):
+        """Return all customer names in insertion order."""
+        # From the cached snapshot; the file is parsed at most once per change
+        return list(self.snapshot())
+
+    def get(self, name):
+        """Return one customer's record, or None if the customer is unknown."""
+        # Served from the cached snapshot; parsing the whole file per lookup cost ~20ms at 10k customers
+        record = self.snapshot().get(name)
+        return thaw(record) if record is not None else None
+
+    def get_many(self, names):
+        """Return {name: record} for the given names that exist."""
+        data = self.snapshot()
+        return {name: thaw(data[name]) for name in names if name in data}
+
+    def iter_items(self, batch_size=10000):
+        """Yield (name, record) pairs in insertion order."""
+        yield from self.load_all().items()
+
+    def put(self, name, record):
+        """Insert or replace one customer's record."""
+        with self._lock:
+            data = self.load_all()
+            data[name] = record
+            self._write(data)
+
+    def put_many(self, records):
+        """Insert or replace several (name, record) pairs with a single rewrite."""
+        with self._lock:
+            data = self.load_all()
+            count = 0
+            for name, record in records:
+                data[name] = record
+                count += 1
+            self._write(data)
+            return count
+
+    def update(self, name, fn):
+        """Apply fn to a customer's record and save the result.
+
+        Returns the updated record, or None if the customer does not exist.
+        """
+        with self._lock:
+            data = self.load_all()
+            if name not in data:
+                return None
+            data[name] = fn(data[name])
+            self._write(data)
+            return data[name]
+
+    def _write(self, data):
+        # Write to a temporary file first so readers never see a half-written crm.json
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(data, file, indent=4)
+            os.replace(tmp_path, self.file_path)
+            crm_cache.invalidate(self.file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class SQLiteCRMStore:
+    """CRM stored as one JSON-encoded row per customer in an SQLite database (WAL mode)."""
+
+    backend = "sqlite"
+
+    def __init__(self, file_path='crm.db'):
+        self.file_path = file_path
+        # sqlite3 connections can't be shared across threads, and Streamlit runs
+        # every session in its own thread, so keep one connection per thread.
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.file_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS customers ("
+                "name TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def load_all(self):
+        """Load every customer in insertion order."""
+        rows = self._connect().execute("SELECT name, data FROM customers ORDER BY rowid")
+        return {name: json.loads(data) for name, data in rows}
+
+    def snapshot(self):
+        """Return a cached, read-only view of every customer."""
+        return crm_cache.get(self.file_path, self.iter_items)
+
+    def names(self):
+        """Return all customer names in insertion order."""
+        rows = self._connect().execute("SELECT name FROM customers ORDER BY rowid")
+        return [name for (name,) in rows]
+
+    def get(self, name):
+        """Return one customer's record, or None if the customer is unknown."""
+        row = self._connect().execute(
+            "SELECT data FROM customers WHERE name = ?", (name,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, names):
+        """Return {name: record} for the given names that exist."""
+        conn = self._connect()
+        names = list(names)
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(names), 900):
+            batch = names[start:start + 900]
+            rows = conn.execute(
+                f"SELECT name, data FROM customers WHERE name IN ({','.join('?' * len(batch))})", batch
+            )
+            found.update((name, json.loads(data)) for name, data in rows)
+        return found
+
+    def iter_items(self, batch_size=10000):
+        """Yield (name, record) pairs in insertion order without loading the whole table."""
+        cursor = self._connect().cursor()
+        cursor.execute("SELECT name, data FROM customers ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for name, data in rows:
+                yield name, json.loads(data)
+
+    def put(self, name, record):
+        """Insert or replace one customer's record."""
+        self._connect().execute(
+            "INSERT INTO customers (name, data) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+            (name, json.dumps(record)),
+        )
+        crm_cache.invalidate(self.file_path)
+
+    def put_many(self, records):
+        """Insert or replace several (name, record) pairs in one transaction."""
+        conn = self._connect()
+        rows = [(name, json.dumps(record)) for name, record in records]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO customers (name, data) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        crm_cache.invalidate(self.file_path)
+        return len(rows)
+
+    def update(self, name, fn):
+        """Apply fn to a customer's record inside a write transaction.
+
+        BEGIN IMMEDIATE takes the write lock before reading, so two agents
+        editing the same customer are serialized instead of overwriting
+        each other. Returns the updated record, or None if the customer
+        does not exist.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM customers WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            record = fn(json.loads(row[0]))
+            conn.execute("UPDATE customers SET data = ? WHERE name = ?", (json.dumps(record), name))
+            conn.execute("COMMIT")
+            crm_cache.invalidate(self.file_path)
+            return record
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(file_path='crm.json'):
+    """Return the (shared) CRM store for file_path, picking the backend automatically."""
+    key = os.path.abspath(file_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            backend = os.getenv("CRM_BACKEND", "").lower()
+            if backend == "sqlite" or (not backend and file_path.lower().endswith(SQLITE_EXTENSIONS)):
+                store = SQLiteCRMStore(file_path)
+            else:
+                store = JSONCRMStore(file_path)
+            _stores[key] = store
+        return store
+
+
+def migrate_json_to_sqlite(json_path='crm.json', db_path='crm.db'):
+    """Copy every customer from a crm.json file into an SQLite store. Returns the row count."""
+    with open(json_path, 'r') as file:
+        data = json.load(file)
+    return SQLiteCRMStore(db_path).put_many(data.items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CRM storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Migrate crm.json into an SQLite database")
+    migrate.add_argument("json_path", nargs="?", default="crm.json")
+    migrate.add_argument("db_path", nargs="?", default="crm.db")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        count = migrate_json_to_sqlite(args.json_path, args.db_path)
+        print(f"Migrated {count} customers from {args.json_path} to {args.db_path}.")
@@ -0,0 +1,251 @@
+"""Prefix and fuzzy customer search with paging.
+
+The customer pickers used to receive every CRM name, and the Admin Panel
+rendered them all in one table on every rerun. CustomerSearch keeps the
+names in sorted arrays (bisect gives every name, or any word of a name,
+starting with what has been typed so far) and in a trigram index for
+misspellings, so a page of matches comes back without touching the rest of
+the CRM.
+
+The index is built once per CRM file and kept up to date: add_entry_to_crm
+adds the new name directly, update_interests only notes the new file
+signature, and a change made by another process is picked up by diffing the
+cached snapshot's names against the index when the file changes
+(get_customer_search).
+"""
+import bisect
+import math
+import threading
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+from crm_store import _file_signature, get_store
+from intent_matcher import WORD_RE
+
+
+@dataclass
+class SearchPage:
+    """One page of search results."""
+    total: int
+    offset: int
+    names: list
+
+
+def _words(name):
+    return WORD_RE.findall(name.casefold())
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _name_trigrams(name):
+    return set().union(*(_trigrams(word) for word in _words(name)))
+
+
+class _SortedKeys:
+    """Parallel sorted arrays of (key, id) for bisect prefix ranges."""
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [id_ for _, id_ in pairs]
+
+    def add(self, key, id_):
+        position = bisect.bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.ids.insert(position, id_)
+
+    def remove(self, key, id_):
+        position = bisect.bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.ids[position] == id_:
+                del self.keys[position]
+                del self.ids[position]
+                return
+            position += 1
+
+    def prefix_range(self, prefix):
+        start = bisect.bisect_left(self.keys, prefix)
+        return start, bisect.bisect_left(self.keys, prefix + "\U0010ffff", start)
+
+
+class CustomerSearch:
+    """Sorted-array prefix search plus trigram fuzzy search over customer names."""
+
+    def __init__(self, names=()):
+        self._names = list(names)  # id -> name, None once removed
+        self._ids = {name: id_ for id_, name in enumerate(self._names)}
+        self._lock = threading.Lock()
+        full, words, postings = [], [], {}
+        for id_, name in enumerate(self._names):
+            name_words = _words(name)
+            full.append((name.casefold(), id_))
+            words.extend((word, id_) for word in name_words[1:])
+            for trigram in _name_trigrams(name):
+                postings.setdefault(trigram, []).append(id_)
+        self._full = _SortedKeys(full)
+        self._words = _SortedKeys(words)
+        # trigram -> array of ids (may include removed ids)
+        self._trigram_ids = {trigram: array("I", ids) for trigram, ids in postings.items()}
+        self._removed = set()  # ids still in the postings whose name was removed
+        self._rank = None      # id -> position in casefold order, rebuilt after changes
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def _register(self, name):
+        id_ = len(self._names)
+        self._names.append(name)
+        self._ids[name] = id_
+        for trigram in _name_trigrams(name):
+            self._trigram_ids.setdefault(trigram, array("I")).append(id_)
+        return id_
+
+    def add(self, name):
+        """Index a new customer name (no-op if it is already indexed)."""
+        with self._lock:
+            if name in self._ids:
+                return
+            id_ = self._register(name)
+            self._rank = None
+            self._full.add(name.casefold(), id_)
+            for word in _words(name)[1:]:
+                self._words.add(word, id_)
+
+    def remove(self, name):
+        """Drop a customer name from the index."""
+        with self._lock:
+            id_ = self._ids.pop(name, None)
+            if id_ is None:
+                return
+            # Trigram postings keep the id; it is skipped once its name is None
+            self._names[id_] = None
+            self._removed.add(id_)
+            self._rank = None
+            self._full.remove(name.casefold(), id_)
+            for word in _words(name)[1:]:
+                self._words.remove(word, id_)
+
+    def names(self):
+        """Indexed names as a live, set-like view."""
+        return self._ids.keys()
+
+    def _prefix_ids(self, query):
+        query = query.casefold().strip()
+        start, end = self._full.prefix_range(query)
+        ids = self._full.ids[start:end]
+        if " " not in query:
+            start, end = self._words.prefix_range(query)
+            ids = list(dict.fromkeys(ids + self._words.ids[start:end]))
+        return ids
+
+    def prefix(self, query):
+        """Names whose full name or any word starts with query, alphabetically by the matched text."""
+        return [self._names[id_] for id_ in self._prefix_ids(query)]
+
+    def _fuzzy_ids(self, query, min_similarity):
+        """Ids of every name sharing enough trigrams with query, best first (numpy array)."""
+        query_trigrams = _name_trigrams(query)
+        postings = [np.frombuffer(self._trigram_ids[trigram], dtype=np.uintc)
+                    for trigram in query_trigrams if trigram in self._trigram_ids]
+        if not postings:
+            return np.empty(0, dtype=np.intp)
+        needed = max(1, math.ceil(min_similarity * len(query_trigrams)))
+        # Each name appears once per posting list, so counting ids gives the shared trigrams of every name
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._names))
+        ids = np.flatnonzero(shared >= needed)
+        if self._removed:
+            ids = ids[~np.isin(ids, list(self._removed))]
+        if self._rank is None:
+            # Position of each live id in casefold order, to break ties alphabetically
+            self._rank = np.zeros(len(self._names), dtype=np.intp)
+            self._rank[self._full.ids] = np.arange(len(self._full.ids))
+        return ids[np.lexsort((self._rank[ids], -shared[ids]))]
+
+    def fuzzy(self, query, limit=20, min_similarity=0.34):
+        """Names sharing enough trigrams with query, best first."""
+        with self._lock:
+            return [self._names[id_] for id_ in self._fuzzy_ids(query, min_similarity)[:limit].tolist()]
+
+    def search(self, query="", offset=0, limit=20, min_similarity=0.34):
+        """Return one page of matches: prefix matches first, then fuzzy ones.
+
+        An empty query pages through every customer alphabetically. total
+        counts every match, not just those up to this page.
+        """
+        with self._lock:
+            if not query.strip():
+                ids = self._full.ids[offset:offset + limit]
+                return SearchPage(len(self._full.ids), offset, [self._names[id_] for id_ in ids])
+            ids = self._prefix_ids(query)
+            fuzzy = self._fuzzy_ids(query, min_similarity)
+            if ids:
+                fuzzy = fuzzy[~np.isin(fuzzy, ids)]
+            page = ids[offset:offset + limit]
+            if len(page) < limit:
+                page += fuzzy[max(0, offset - len(ids)):offset + limit - len(ids)].tolist()
+            return SearchPage(len(ids) + len(fuzzy), offset, [self._names[id_] for id_ in page])
+
+
+_searches = {}
+_searches_lock = threading.Lock()
+
+
+def _current_names(store):
+    """The CRM's names as a set-like view: the cached snapshot's keys for JSON, one query for SQLite."""
+    if store.backend == "json":
+        return store.snapshot().keys()
+    return set(store.names())
+
+
+def get_customer_search(file_path="crm.json"):
+    """Return the shared CustomerSearch for a CRM file, syncing it if the file changed."""
+    store = get_store(file_path)
+    signature = _file_signature(file_path)
+    with _searches_lock:
+        entry = _searches.get(store.file_path)
+        if entry is None:
+            search = CustomerSearch(store.names())
+        else:
+            search, indexed_signature = entry
+            if indexed_signature != signature:
+                # Another process changed the CRM: apply just the difference in names,
+                # if there is one (most writes only change records)
+                current = _current_names(store)
+                indexed = search.names()
+                if len(current) != len(indexed) or current != indexed:
+                    for name in current - indexed:
+                        search.add(name)
+                    for name in indexed - current:
+                        search.remove(name)
+        _searches[store.file_path] = (search, signature)
+        return search
+
+
+def _record_write(file_path, name=None):
+    key = get_store(file_path).file_path
+    with _searches_lock:
+        entry = _searches.get(key)
+        if entry is None:
+            return  # Not built yet; the first search reads the names from the file
+        search = entry[0]
+        if name is not None:
+            search.add(name)
+        _searches[key] = (search, _file_signature(file_path))
+
+
+def record_new_customer(name, file_path="crm.json"):
+    """Add a customer this process just wrote, without re-reading the CRM."""
+    _record_write(file_path, name)
+
+
+def record_customer_update(file_path="crm.json"):
+    """Note that this process rewrote an existing customer's record: the names are unchanged."""
+    _record_write(file_path)
@@ -0,0 +1,318 @@
+"""Shared, rate-limited and fault-tolerant client for Gemini.
+
+query_gemini used to build a new GenerativeModel for every call, with no
+timeout, retry or limit on how many calls run at once. GeminiClient wraps a
+backend with:
+
+* reused model objects (one per model name per process),
+* a token-bucket rate limiter,
+* bounded concurrency (callers wait at most `queue_timeout` for a slot and
+  are then rejected instead of piling up blocked threads),
+* per-request timeouts,
+* retries with exponential backoff and full jitter for transient errors,
+* a circuit breaker that fails fast while Gemini keeps failing.
+
+Backends:
+    GeminiBackend - google.generativeai (the real API)
+    StubBackend   - offline canned answers with configurable latency, jitter
+                    and failure rate, for throughput and tail-latency tests
+
+The process-wide client is configured from the environment (see get_client):
+LLM_BACKEND=stub, LLM_STUB_LATENCY, GEMINI_RATE_LIMIT, GEMINI_BURST,
+GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT, GEMINI_RETRIES.
+"""
+import os
+import random
+import threading
+import time
+
+from lazy_resources import get_genai
+
+
+class LLMError(Exception):
+    """Gemini could not produce an answer."""
+
+
+class LLMUnavailable(LLMError):
+    """Rejected without calling Gemini: circuit open, rate limited or too many calls in flight."""
+
+
+# Exception class names (from google.api_core and the HTTP stack) worth retrying
+RETRYABLE_ERRORS = {
+    "DeadlineExceeded", "ServiceUnavailable", "ResourceExhausted", "TooManyRequests",
+    "InternalServerError", "GatewayTimeout", "Aborted", "RetryError",
+}
+
+
+def is_retryable(error):
+    """True for timeouts, connection problems and transient server errors."""
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+class GeminiBackend:
+    """google.generativeai backend that reuses one GenerativeModel per model name."""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model_name):
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = get_genai().GenerativeModel(model_name)
+                self._models[model_name] = model
+            return model
+
+    def generate(self, model_name, prompt, timeout):
+        response = self._model(model_name).generate_content(prompt, request_options={"timeout": timeout})
+        return response.text.strip()
+
+    def stream(self, model_name, prompt, timeout):
+        response = self._model(model_name).generate_content(
+            prompt, stream=True, request_options={"timeout": timeout}
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend:
+    """Offline stand-in for Gemini with configurable latency, jitter and failure rate."""
+
+    def __init__(self, latency=0.5, jitter=0.0, failure_rate=0.0, chunks=8, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.chunks = chunks
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.failure_rate
+        return delay, fail
+
+    def generate(self, model_name, prompt, timeout):
+        delay, fail = self._delay()
+        time.sleep(min(delay, timeout))
+        if delay > timeout:
+            raise TimeoutError(f"stub call exceeded {timeout}s")
+        if fail:
+            raise ConnectionError("stub failure")
+        return f"[stub {model_name}] answer to: {prompt[:60]}"
+
+    def stream(self, model_name, prompt, timeout):
+        delay, fail = self._delay()
+        if fail:
+            time.sleep(delay / self.chunks)
+            raise ConnectionError("stub failure")
+        for index in range(self.chunks):
+            time.sleep(delay / self.chunks)
+            yield f"[stub chunk {index}] "
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Take one token, waiting up to timeout seconds. Returns False if none became available."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one trial call through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            # One trial call per reset_timeout while not closed
+            if self.state != "closed" and now - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                self.opened_at = now
+                return True
+            return self.state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """Rate-limited, concurrency-bounded, retrying client around a Gemini backend."""
+
+    def __init__(self, backend=None, rate=5.0, burst=10, max_concurrency=16, timeout=30.0,
+                 retries=2, backoff=0.5, max_backoff=8.0, queue_timeout=10.0, breaker=None):
+        self.backend = backend or GeminiBackend()
+        self.limiter = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "rejected": 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _admit(self):
+        """Check the breaker, rate limit and concurrency; returns once a slot is held."""
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise LLMUnavailable("Gemini is temporarily unavailable (circuit open).")
+        if not self.limiter.acquire(self.queue_timeout):
+            self._count("rejected")
+            raise LLMUnavailable("Gemini rate limit reached, try again shortly.")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("rejected")
+            raise LLMUnavailable("Too many Gemini calls in flight, try again shortly.")
+
+    def _record_error(self, error):
+        # Only outages count against the breaker; a rejected prompt means Gemini is up
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _sleep_before_retry(self, attempt):
+        self._count("retries")
+        # Full jitter keeps many callers from retrying in lockstep
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def generate(self, model_name, prompt):
+        """Return the full answer, retrying transient errors. Raises LLMError on failure."""
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self._admit()
+            try:
+                text = self.backend.generate(model_name, prompt, self.timeout)
+            except Exception as e:
+                self._record_error(e)
+                if attempt < self.retries and is_retryable(e):
+                    self._slots.release()
+                    self._sleep_before_retry(attempt)
+                    continue
+                self._slots.release()
+                self._count("failures")
+                raise LLMError(f"Gemini request failed: {e}") from e
+            self._slots.release()
+            self.breaker.record_success()
+            self._count("successes")
+            return text
+
+    def stream(self, model_name, prompt):
+        """Yield answer chunks. Transient errors are retried only until the first chunk arrives."""
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self._admit()
+            started = False
+            try:
+                for chunk in self.backend.stream(model_name, prompt, self.timeout):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                self._slots.release()
+                self._record_error(e)
+                if not started and attempt < self.retries and is_retryable(e):
+                    self._sleep_before_retry(attempt)
+                    continue
+                self._count("failures")
+                raise LLMError(f"Gemini request failed: {e}") from e
+            except BaseException:
+                # Consumer stopped early (GeneratorExit); just free the slot
+                self._slots.release()
+                raise
+            self._slots.release()
+            self.breaker.record_success()
+            self._count("successes")
+            return
+
+    def snapshot(self):
+        """Counters plus the breaker state, for dashboards."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["breaker"] = self.breaker.state
+        stats["breaker_opened"] = self.breaker.times_opened
+        return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client_from_env():
+    """Build a GeminiClient from the LLM_* / GEMINI_* environment variables."""
+    if os.getenv("LLM_BACKEND", "gemini").lower() == "stub":
+        backend = StubBackend(latency=float(os.getenv("LLM_STUB_LATENCY", "0.5")),
+                              jitter=float(os.getenv("LLM_STUB_JITTER", "0")),
+                              failure_rate=float(os.getenv("LLM_STUB_FAILURE_RATE", "0")))
+    else:
+        backend = GeminiBackend()
+    return GeminiClient(
+        backend,
+        rate=float(os.getenv("GEMINI_RATE_LIMIT", "5")),
+        burst=int(os.getenv("GEMINI_BURST", "10")),
+        max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+        timeout=float(os.getenv("GEMINI_TIMEOUT", "30")),
+        retries=int(os.getenv("GEMINI_RETRIES", "2")),
+    )
+
+
+def get_client():
+    """Return the process-wide GeminiClient, building it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = client_from_env()
+        return _client
+
+
+def set_client(client):
+    """Replace the process-wide client (e.g. with a StubBackend for load tests)."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,161 @@
+"""Compiled multi-keyword intent matcher.
+
+Intents (name, keywords, priority, response) are loaded from a JSON config and
+compiled once into an Aho-Corasick automaton over words. Matching tokenizes the
+query once and walks the automaton a single time, reporting every keyword
+occurrence (including overlapping ones) with its character span, so the cost
+per query does not grow with the number of keywords. Because the automaton
+works on whole words, "bye" does not match "byelaws".
+
+intents.json format:
+
+    [
+        {"name": "demo", "priority": 70, "keywords": ["demo", "product demo"],
+         "response": "Sure! Let me schedule a product demo for you."},
+        ...
+    ]
+"""
+import json
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+WORD_RE = re.compile(r"\w+(?:'\w+)?")
+
+
+@dataclass(frozen=True)
+class Intent:
+    """One configured intent."""
+    name: str
+    response: str
+    priority: int
+    keywords: tuple
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    """One keyword occurrence in a query."""
+    intent: str
+    keyword: str
+    start: int
+    end: int
+    priority: int
+    response: str
+
+
+def tokenize(text):
+    """Return (casefolded word, start, end) tuples for every word in text."""
+    return [(match.group().casefold(), match.start(), match.end()) for match in WORD_RE.finditer(text)]
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over word tokens for a set of intents."""
+
+    def __init__(self, intents):
+        self.intents = list(intents)
+        # Node 0 is the root; each node has word transitions, a failure link and outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]  # (intent, keyword, keyword length in words)
+        for intent in self.intents:
+            for keyword in intent.keywords:
+                words = [word for word, _, _ in tokenize(keyword)]
+                if words:
+                    self._add(words, (intent, keyword, len(words)))
+        self._build_failure_links()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a matcher from a list of intent dicts (the intents.json format)."""
+        return cls(
+            Intent(
+                name=item["name"],
+                response=item.get("response", ""),
+                priority=int(item.get("priority", 0)),
+                keywords=tuple(item.get("keywords", [item["name"]])),
+            )
+            for item in config
+        )
+
+    @classmethod
+    def from_file(cls, file_path):
+        """Build a matcher from an intents.json file."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return cls.from_config(json.load(file))
+
+    def _add(self, words, output):
+        node = 0
+        for word in words:
+            next_node = self._goto[node].get(word)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._goto[node][word] = next_node
+            node = next_node
+        self._outputs[node].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                # Inherit the outputs of the longest proper suffix
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def match(self, text):
+        """Return every keyword occurrence in text, highest priority first, then by position."""
+        tokens = tokenize(text)
+        matches = []
+        node = 0
+        for index, (word, _, end) in enumerate(tokens):
+            while node and word not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(word, 0)
+            for intent, keyword, length in self._outputs[node]:
+                matches.append(IntentMatch(intent.name, keyword, tokens[index - length + 1][1], end,
+                                           intent.priority, intent.response))
+        matches.sort(key=lambda match: (-match.priority, match.start))
+        return matches
+
+    def matched_intents(self, text):
+        """Return the distinct matched intent names, highest priority first."""
+        names = []
+        for match in self.match(text):
+            if match.intent not in names:
+                names.append(match.intent)
+        return names
+
+    def best(self, text):
+        """Return the highest-priority match, or None."""
+        matches = self.match(text)
+        return matches[0] if matches else None
+
+
+DEFAULT_INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.json")
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(file_path=None):
+    """Return the shared matcher for an intents file, recompiling it only when the file changes.
+
+    Defaults to INTENTS_PATH, else the intents.json next to this module (not the working directory).
+    """
+    file_path = file_path or os.getenv("INTENTS_PATH", DEFAULT_INTENTS_PATH)
+    mtime = os.stat(file_path).st_mtime_ns
+    with _matchers_lock:
+        entry = _matchers.get(file_path)
+        if entry is None or entry[0] != mtime:
+            entry = (mtime, IntentMatcher.from_file(file_path))
+            _matchers[file_path] = entry
+        return entry[1]
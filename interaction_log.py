@@ -0,0 +1,346 @@
+"""Append-only, time-partitioned log of call interactions.
+
+Every transcript segment, sentiment score, intent, suggestion, summary and
+stage timing can be recorded for later analysis and model improvement.
+record() only appends to an in-memory buffer; a background thread flushes
+the buffer in batches, so logging never adds disk I/O to a request.
+
+Layout (one partition per UTC day):
+
+    interaction_logs/2026-10-17/events-<pid>.jsonl   hot, append-only
+    interaction_logs/2026-10-16/events.parquet       compacted
+
+compact() rewrites partitions older than a day into one file sorted by
+customer and time: Parquet (zstd, row-group statistics let readers skip to
+one customer) when pyarrow is installed, otherwise gzip with one member per
+customer plus an index.json of byte offsets. query() only opens partitions in
+the requested date range and, in compacted ones, only the customer's rows.
+
+If the log can't be written (disk full, directory gone), the writer keeps
+retrying and holds at most INTERACTION_LOG_MAX_PENDING events (default
+100000) in memory; beyond that the oldest events are dropped and counted in
+`dropped`.
+
+Set INTERACTION_LOG_DIR to move the log, or INTERACTION_LOG=off to disable it.
+
+    python interaction_log.py compact --older-than 1
+    python interaction_log.py query --customer "John Doe" --start 2026-10-01 --end 2026-10-17
+"""
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+def partition_of(ts):
+    """UTC day (YYYY-MM-DD) of a timestamp."""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _to_timestamp(value, end_of_day=False):
+    """Accept epoch seconds, a date, a datetime or an ISO date string."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if "T" in value or " " in value else date.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        if end_of_day:
+            value += timedelta(days=1)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class InteractionLog:
+    """Buffered writer and partition-pruned reader for the interaction log."""
+
+    def __init__(self, directory="interaction_logs", flush_interval=1.0, max_buffer=1000, max_pending=100000):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_pending = max_pending
+        self._buffer = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.written = 0
+        self.dropped = 0  # Oldest events discarded while the writer couldn't keep up
+        self._failing = False
+        self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, kind, customer=None, text=None, score=None, elapsed=None, **data):
+        """Queue one event; returns immediately."""
+        data = {key: value for key, value in data.items() if value is not None}
+        event = {"ts": time.time(), "customer": customer, "kind": kind, "text": text,
+                 "score": score, "elapsed": elapsed, "data": data or None}
+        with self._lock:
+            if len(self._buffer) == self.max_pending:
+                self.dropped += 1  # The deque drops the oldest event
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.max_buffer
+        if full and not self._failing:  # While writes fail, retry on the flush interval only
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the writer alive; the events stay buffered (up to max_pending) for the next attempt
+                if not self._failing:
+                    logger.exception("Writing the interaction log to %s failed", self.directory)
+                self._failing = True
+            else:
+                if self._failing:
+                    logger.info("Writing the interaction log to %s works again", self.directory)
+                self._failing = False
+
+    def flush(self):
+        """Write every buffered event to its day's hot file.
+
+        On a write error the unwritten events go back to the front of the
+        buffer and the error is raised.
+        """
+        with self._lock:
+            events, self._buffer = self._buffer, deque(maxlen=self.max_pending)
+        if not events:
+            return
+        by_partition = defaultdict(list)
+        for event in events:
+            by_partition[partition_of(event["ts"])].append(event)
+        with self._write_lock:
+            for partition in sorted(by_partition):
+                batch = by_partition[partition]
+                try:
+                    path = os.path.join(self.directory, partition)
+                    os.makedirs(path, exist_ok=True)
+                    # One file per process, so concurrent writers never interleave lines
+                    with open(os.path.join(path, f"events-{os.getpid()}.jsonl"), "a", encoding="utf-8") as file:
+                        file.write("".join(json.dumps(event) + "\n" for event in batch))
+                except BaseException:
+                    self._requeue([event for day in sorted(by_partition) if day >= partition
+                                   for event in by_partition[day]])
+                    raise
+                self.written += len(batch)
+
+    def _requeue(self, events):
+        with self._lock:
+            pending = list(events) + list(self._buffer)
+            overflow = max(0, len(pending) - self.max_pending)
+            self.dropped += overflow
+            self._buffer = deque(pending[overflow:], maxlen=self.max_pending)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._wake.set()
+            self._thread.join(timeout=5)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing the interaction log to %s failed; %d events lost",
+                                 self.directory, len(self._buffer))
+
+    def partitions(self):
+        """Partition names (YYYY-MM-DD), oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if len(name) == 10 and os.path.isdir(os.path.join(self.directory, name)))
+
+    # Compaction
+
+    def compact(self, older_than_days=1):
+        """Compact partitions older than older_than_days into one sorted, compressed file each.
+
+        Returns the names of the partitions that were compacted.
+        """
+        self.flush()
+        cutoff = (datetime.now(timezone.utc).date() - timedelta(days=older_than_days)).isoformat()
+        compacted = []
+        for partition in self.partitions():
+            path = os.path.join(self.directory, partition)
+            hot_files = glob.glob(os.path.join(path, "events-*.jsonl"))
+            if partition >= cutoff or not hot_files:
+                continue
+            events = list(self._read_compacted(path)) + [event for file in hot_files for event in _read_jsonl(file)]
+            events.sort(key=lambda event: (event["customer"] or "", event["ts"]))
+            try:
+                import pyarrow  # noqa: F401
+                _write_parquet(path, events)
+            except ImportError:
+                _write_gzip(path, events)
+            for file in hot_files:
+                os.remove(file)
+            compacted.append(partition)
+        return compacted
+
+    # Queries
+
+    def _read_compacted(self, path, customer=None):
+        parquet_path = os.path.join(path, "events.parquet")
+        gzip_path = os.path.join(path, "events.jsonl.gz")
+        if os.path.exists(parquet_path):
+            import pyarrow.parquet as pq
+            filters = [("customer", "=", customer)] if customer is not None else None
+            for row in pq.read_table(parquet_path, filters=filters).to_pylist():
+                row["data"] = json.loads(row["data"]) if row["data"] else None
+                yield row
+        elif os.path.exists(gzip_path):
+            with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as file:
+                index = json.load(file)
+            if customer is None:
+                blocks = list(index.values())
+            else:
+                blocks = [index[customer]] if customer in index else []
+            with open(gzip_path, "rb") as file:
+                for offset, length in blocks:
+                    # Each customer is its own gzip member, so only their bytes are read
+                    file.seek(offset)
+                    for line in gzip.decompress(file.read(length)).splitlines():
+                        yield json.loads(line)
+
+    def query(self, customer=None, start=None, end=None, kinds=None):
+        """Events for a customer (or everyone) between start and end, oldest first.
+
+        start/end accept epoch seconds, dates, datetimes or ISO strings; a
+        date as end includes that whole day.
+        """
+        self.flush()
+        start, end = _to_timestamp(start), _to_timestamp(end, end_of_day=True)
+        first = partition_of(start) if start is not None else None
+        last = partition_of(end) if end is not None else None
+        events = []
+        for partition in self.partitions():
+            if (first and partition < first) or (last and partition > last):
+                continue
+            path = os.path.join(self.directory, partition)
+            candidates = list(self._read_compacted(path, customer))
+            for file in glob.glob(os.path.join(path, "events-*.jsonl")):
+                candidates.extend(_read_jsonl(file))
+            for event in candidates:
+                if customer is not None and event["customer"] != customer:
+                    continue
+                if (start is not None and event["ts"] < start) or (end is not None and event["ts"] >= end):
+                    continue
+                if kinds and event["kind"] not in kinds:
+                    continue
+                events.append(event)
+        events.sort(key=lambda event: event["ts"])
+        return events
+
+
+def _read_jsonl(file_path):
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _write_parquet(path, events):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([("ts", pa.float64()), ("customer", pa.string()), ("kind", pa.string()),
+                        ("text", pa.string()), ("score", pa.float64()), ("elapsed", pa.float64()),
+                        ("data", pa.string())])
+    rows = [dict(event, data=json.dumps(event["data"]) if event.get("data") else None) for event in events]
+    tmp_path = os.path.join(path, "events.parquet.tmp")
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), tmp_path, compression="zstd", row_group_size=65536)
+    os.replace(tmp_path, os.path.join(path, "events.parquet"))
+    _remove_gzip(path)
+
+
+def _write_gzip(path, events):
+    tmp_path = os.path.join(path, "events.jsonl.gz.tmp")
+    index = {}
+    with open(tmp_path, "wb") as file:
+        position = 0
+        while position < len(events):
+            customer = events[position]["customer"]
+            end = position
+            while end < len(events) and events[end]["customer"] == customer:
+                end += 1
+            member = gzip.compress("".join(json.dumps(event) + "\n" for event in events[position:end]).encode("utf-8"))
+            index[customer or ""] = (file.tell(), len(member))
+            file.write(member)
+            position = end
+    with open(os.path.join(path, "index.json.tmp"), "w", encoding="utf-8") as file:
+        json.dump(index, file)
+    os.replace(tmp_path, os.path.join(path, "events.jsonl.gz"))
+    os.replace(os.path.join(path, "index.json.tmp"), os.path.join(path, "index.json"))
+    if os.path.exists(os.path.join(path, "events.parquet")):
+        os.remove(os.path.join(path, "events.parquet"))
+
+
+def _remove_gzip(path):
+    for name in ("events.jsonl.gz", "index.json"):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_interaction_log():
+    """Return the process-wide InteractionLog, or None when INTERACTION_LOG=off."""
+    global _log
+    if os.getenv("INTERACTION_LOG", "on").lower() == "off":
+        return None
+    with _log_lock:
+        if _log is None:
+            _log = InteractionLog(os.getenv("INTERACTION_LOG_DIR", "interaction_logs"),
+                                  max_pending=int(os.getenv("INTERACTION_LOG_MAX_PENDING", "100000")))
+        return _log
+
+
+def log_event(kind, customer=None, text=None, score=None, elapsed=None, **data):
+    """Record one event in the shared log (no-op when logging is off)."""
+    log = get_interaction_log()
+    if log is not None:
+        log.record(kind, customer, text, score, elapsed, **data)
+
+
+def logged_stream(chunks, kind, customer=None, score=None, **data):
+    """Pass a stream of text chunks through, logging the joined text once it completes."""
+    start = time.perf_counter()
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    log_event(kind, customer, "".join(parts).strip(), score, time.perf_counter() - start, **data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interaction log tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact = subparsers.add_parser("compact", help="Compact old partitions into compressed columnar files")
+    compact.add_argument("--older-than", type=int, default=1, help="Days")
+    query = subparsers.add_parser("query", help="Print events as JSON lines")
+    query.add_argument("--customer")
+    query.add_argument("--start")
+    query.add_argument("--end")
+    query.add_argument("--kind", action="append")
+    args = parser.parse_args()
+
+    log = InteractionLog(os.getenv("INTERACTION_LOG_DIR", "interaction_logs"))
+    if args.command == "compact":
+        done = log.compact(args.older_than)
+        print(f"Compacted {len(done)} partition(s): {', '.join(done) or '-'}")
+    elif args.command == "query":
+        for event in log.query(args.customer, args.start, args.end, args.kind):
+            print(json.dumps(event))
@@ -0,0 +1,91 @@
+"""Heavy resources loaded on first use instead of at import time.
+
+Importing the assistant used to download the VADER lexicon, import NLTK and
+google.generativeai and build the sentiment analyzer before anything else
+could run. The getters below do that work the first time it is needed and
+cache the result for the rest of the process.
+
+The VADER lexicon is vendored in nltk_data/ next to this file (set NLTK_DATA_DIR
+to use another copy) and is never downloaded at run time. check_resources() at
+app and service startup fails with MissingResourceError if it is missing, so
+sentiment can't start failing in the middle of a call. To refresh the copy
+from NLTK:
+
+    python lazy_resources.py vendor
+"""
+import os
+import sys
+import threading
+
+NLTK_DATA_DIR = os.getenv(
+    "NLTK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data")
+)
+VADER_RESOURCE = 'sentiment/vader_lexicon.zip'
+
+
+class MissingResourceError(LookupError):
+    """A data file the assistant needs has not been installed."""
+
+
+_lock = threading.Lock()
+_sentiment_analyzer = None
+_genai = None
+
+
+def _find_vader_lexicon():
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    try:
+        nltk.data.find(VADER_RESOURCE)
+    except LookupError:
+        raise MissingResourceError(
+            f"VADER lexicon not found in {NLTK_DATA_DIR} or the NLTK data path. "
+            "Install it once with `python lazy_resources.py vendor` (or point NLTK_DATA_DIR at a copy)."
+        ) from None
+
+
+def check_resources():
+    """Raise MissingResourceError now if a data file is missing; call once at startup, not per request."""
+    if os.path.exists(os.path.join(NLTK_DATA_DIR, VADER_RESOURCE)):
+        return  # The vendored copy; no need to import NLTK yet
+    _find_vader_lexicon()
+
+
+def vendor_nltk_data(download_dir=NLTK_DATA_DIR):
+    """Download the VADER lexicon into the vendored NLTK data directory (the explicit setup step)."""
+    import nltk
+    os.makedirs(download_dir, exist_ok=True)
+    if not nltk.download('vader_lexicon', download_dir=download_dir, quiet=True):
+        raise MissingResourceError(f"Downloading the VADER lexicon into {download_dir} failed.")
+
+
+def get_sentiment_analyzer():
+    """Return the process-wide VADER SentimentIntensityAnalyzer, building it on first use."""
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        with _lock:
+            if _sentiment_analyzer is None:
+                _find_vader_lexicon()
+                from nltk.sentiment import SentimentIntensityAnalyzer
+                _sentiment_analyzer = SentimentIntensityAnalyzer()
+    return _sentiment_analyzer
+
+
+def get_genai():
+    """Return the google.generativeai module, importing and configuring it on first use."""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GENAI_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["vendor"]:
+        sys.exit("usage: python lazy_resources.py vendor")
+    vendor_nltk_data()
+    print(f"VADER lexicon vendored into {NLTK_DATA_DIR}.")
@@ -0,0 +1,136 @@
+"""Persistent LRU/TTL cache for Gemini responses.
+
+Responses are keyed on the model name plus the normalized prompt (whitespace
+collapsed, case folded), so prompts that only differ in spacing or case share
+one entry. The cache lives in a small SQLite file so it survives restarts and
+is shared by every Streamlit session on the machine.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace and fold case so trivially different prompts share a cache entry."""
+    return " ".join(prompt.split()).casefold()
+
+
+def cache_key(model_name, prompt):
+    """Return the cache key for a model/prompt pair."""
+    raw = f"{model_name}\0{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache with a time-to-live and entry/byte size limits."""
+
+    def __init__(self, file_path='gemini_cache.db', max_entries=10000, max_bytes=50 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.file_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, model_name, prompt):
+        """Return the cached response, or None on a miss or an expired entry."""
+        key = cache_key(model_name, prompt)
+        conn = self._connect()
+        row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count('misses')
+            return None
+        response, created_at = row
+        if self.ttl is not None and now - created_at > self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count('expirations')
+            self._count('misses')
+            return None
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._count('hits')
+        return response
+
+    def put(self, model_name, prompt, response):
+        """Store a response and evict least recently used entries beyond the size limits."""
+        key = cache_key(model_name, prompt)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, now):
+        if self.ttl is not None:
+            expired = conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+            if expired:
+                self._count('expirations', expired)
+
+        count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        # Walk the last_used index from the oldest entry only as far as the limits need
+        evict = 0
+        for (size,) in conn.execute("SELECT size FROM responses ORDER BY last_used"):
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            evict += 1
+            count -= 1
+            total_bytes -= size
+        conn.execute("DELETE FROM responses WHERE key IN "
+                     "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (evict,))
+        self._count('evictions', evict)
+
+    def clear(self):
+        """Remove every cached response."""
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self):
+        """Return hit/miss/eviction counters plus the current entry count and size."""
+        count, total_bytes = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": count,
+                "bytes": total_bytes,
+            }
@@ -1,198 +1,26 @@
 import streamlit as st
-import pandas as pd
-import json
-import speech_recognition as sr
 from pathlib import Path
 import random
-import nltk
-nltk.download('vader_lexicon')
-from nltk.sentiment import SentimentIntensityAnalyzer
-import google.generativeai as genai
-from dotenv import load_dotenv
+import asyncio
+from ai_functions import AI_Project_Functions, stream_metrics
+from pipeline import AssistPipeline
+from asr_backends import get_backend
+from streaming_stt import backend_recognizer, frames_from_microphone, stream_transcripts
+from call_session import CallSession
+from call_summary import CallSummarizer
+from service_client import AssistantClient
+from gemini_client import LLMError
+from telemetry import get_profiler, span, tracer
+from session_manager import get_session_manager
+from lazy_resources import MissingResourceError, check_resources
 import os
 
-
-# Ensure necessary NLTK data is available
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError:
-    nltk.download('vader_lexicon')
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Initialize Sentiment Analyzer
-sia = SentimentIntensityAnalyzer()
-
-# Set up Google Gemini API key
-genai.configure(api_key=os.getenv("GENAI_API_KEY"))
-
-class AI_Project_Functions:
-    @staticmethod
-    def get_crm_data(file_path='crm.json'):
-        """Load CRM data from a JSON file."""
-        try:
-            with open(file_path, 'r') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            # Create an empty JSON file if it doesn't exist
-            with open(file_path, 'w') as file:
-                json.dump({}, file)
-            return {}
-        except json.JSONDecodeError:
-            st.error("Error: Failed to decode JSON. The file might be corrupted.")
-            return {}
-        except Exception as e:
-            st.error(f"An unexpected error occurred: {e}")
-            return {}
-
-    @staticmethod
-    def get_all_users(crm_data):
-        """Get a list of all users in the CRM data."""
-        return list(crm_data.keys())
-
-    @staticmethod
-    def get_user_info(crm_data, name):
-        """Get user information from the CRM data."""
-        return crm_data.get(name, {})
-
-    @staticmethod
-    def add_entry_to_crm(name, part_purchase_list, interests_list, file_path='crm.json'):
-        """Add a new entry to the CRM data."""
-        try:
-            data = AI_Project_Functions.get_crm_data(file_path)
-            data[name] = {
-                "past_purchases": part_purchase_list,
-                "interests": interests_list,
-                "recommendations": []  # Initialize recommendations as empty
-            }
-            with open(file_path, 'w') as file:
-                json.dump(data, file, indent=4)
-            return f"Successfully added {name}'s information to the database."
-        except Exception as e:
-            return f"Error in adding {name}'s information: {e}"
-
-    @staticmethod
-    def update_interests(name, new_interests, file_path='crm.json'):
-        """Update a user's interests in the CRM data."""
-        try:
-            data = AI_Project_Functions.get_crm_data(file_path)
-            if name not in data:
-                return f"Error: {name} not found in the database."
-            
-            if isinstance(new_interests, str):
-                if "interests" not in data[name]:
-                    data[name]["interests"] = []
-                if new_interests not in data[name]["interests"]:
-                    data[name]["interests"].append(new_interests)
-            elif isinstance(new_interests, list):
-                data[name]["interests"] = new_interests
-            else:
-                return "Error: new_interests must be a string or a list."
-
-            with open(file_path, 'w') as file:
-                json.dump(data, file, indent=4)
-            return f"Successfully updated {name}'s interests."
-        except Exception as e:
-            return f"Error in updating {name}'s interests: {e}"
-        
-    @staticmethod
-    def analyze_sentiment(user_input):
-        """Analyze user sentiment using VADER and convert the compound score into a range of 1-10."""
-        sentiment_score = sia.polarity_scores(user_input)['compound']  # VADER's compound score
-
-        # Convert VADER score (-1 to +1) to 1-10 scale
-        emotional_state = int((sentiment_score + 1) * 4.5 + 1)  # Normalize to 1-10 range
-
-        return max(1, min(10, emotional_state))
-
-    @staticmethod
-    def query_gemini(prompt):
-        """Queries Google Gemini API for AI-generated responses."""
-        try:
-            model = genai.GenerativeModel("gemini-2.5-pro")
-            response = model.generate_content(prompt)
-            return response.text.strip()  # Extract response text
-        except Exception as e:
-            return f"⚠️ API Error: {str(e)}"
-
-    @staticmethod
-    def recommend_product(customer_name, interests, emotion_score):
-        """Recommend products based on user interests and emotional state using Gemini API."""
-        interest_list = ", ".join(interests)
-        prompt = f"Suggest 3 personalized products for someone interested in {interest_list}. The customer has an emotional satisfaction score of {emotion_score}/10."
-        recommendations = AI_Project_Functions.query_gemini(prompt)
-        return recommendations
-
-    @staticmethod
-    def generate_prompt(objection):
-        """Generate an AI-based response to customer objections."""
-        prompt = f"A customer has an objection: {objection}. How should a salesperson respond professionally?"
-        response = AI_Project_Functions.query_gemini(prompt)
-        return response
-
-    @staticmethod
-    def generate_summary(customer_name, speech_transcript, emotion_score):
-        """Generate a professional sales call summary."""
-        prompt = f"A customer named {customer_name} said: '{speech_transcript}'. The customer's emotional satisfaction score is {emotion_score}/10. Generate a professional sales call summary, highlighting concerns and providing a persuasive response."
-        summary = AI_Project_Functions.query_gemini(prompt)
-        return summary
-
-    @staticmethod
-    def queryToSentiment(name, query):
-        """Analyze the query and generate sentiment-based response."""
-        crm_data = AI_Project_Functions.get_crm_data()
-        user_Data = AI_Project_Functions.get_user_info(name=str(name), crm_data=crm_data)
-        
-        interests = user_Data["interests"]
-        past_purchases = user_Data["past_purchases"]
-        
-        # Analyze sentiment
-        state_of_mind = AI_Project_Functions.analyze_sentiment(query)
-        emotion = "happy" if state_of_mind > 5 else "neutral" if state_of_mind == 5 else "disappointed"
-        
-        # Generate recommendations
-        recommendations = AI_Project_Functions.recommend_product(name, interests, state_of_mind)
-        
-        # Prepare data to return
-        data_to_return = {
-            "state_of_mind": state_of_mind,
-            "emotion": emotion,
-            "suggestions": recommendations,
-        }
-        
-        return data_to_return
-
-    @staticmethod
-    def visual_state_of_mind(state_of_mind):
-        """Create a progress bar that visually represents the state_of_mind (0 to 10)."""
-        progress = state_of_mind / 10  # Normalize it to be between 0 and 1 (for the progress bar)
-        st.write(f"State of Mind: {state_of_mind}")
-        st.progress(progress)
-
-    @staticmethod
-    def process_query(query):
-        """Dummy function to simulate backend processing."""
-        query = query.lower()  # Convert query to lowercase for easier matching
-
-        # Define keyword-response pairs
-        responses = {
-            "demo": "Sure! Let me schedule a product demo for you. Please provide your availability.",
-            "pricing": "Here are our customized pricing plans: Basic ($50/month), Pro ($100/month), Enterprise ($200/month).",
-            "support": "Please contact our technical support team at support@example.com or call +1-800-123-4567.",
-            "interest": "Based on your interests, I recommend checking out our latest AI tools and solutions.",
-            "purchase": "Thank you for your purchase! Let me know if you need assistance with setup or usage.",
-            "hello": "Hello! How can I assist you today?",
-            "bye": "Goodbye! Have a great day!",
-        }
-
-        # Check for keywords in the query
-        for keyword, response in responses.items():
-            if keyword in query:
-                return response
-
-        # Default response if no keywords are found
-        return "I'm sorry, I didn't understand your query. How can I assist you further?"
+# With ASSISTANT_SERVICE_URL set the page is a thin client of the headless service (service.py);
+# otherwise everything runs in this process
+if os.getenv("ASSISTANT_SERVICE_URL"):
+    assistant = AssistantClient(os.environ["ASSISTANT_SERVICE_URL"])
+else:
+    assistant = AI_Project_Functions
 
 # Set up the page configuration
 st.set_page_config(page_title="AI Sales Call Assistant", layout="wide", page_icon="📞")
@@ -201,21 +29,192 @@ st.set_page_config(page_title="AI Sales Call Assistant", layout="wide", page_ico
 st.title("📞 AI Sales Call Assistant")
 st.markdown("---")
 
-def speech_to_text():
-    """Convert speech to text using the microphone."""
+# Without the VADER lexicon every sentiment stage would fail mid-call; stop here instead
+if not os.getenv("ASSISTANT_SERVICE_URL"):
+    try:
+        check_resources()
+    except MissingResourceError as e:
+        st.error(str(e))
+        st.stop()
+
+def speech_to_text(work):
+    """Convert speech to text using the microphone and the configured ASR backend (on the audio lane).
+
+    Returns (text, error): error is a message for the agent when nothing could be transcribed, and text is then "".
+    """
+    import speech_recognition as sr
     recognizer = sr.Recognizer()
     try:
         with sr.Microphone() as source:
             st.write("🎤 Recording... Speak now!")
-            audio = recognizer.listen(source)
-            text = recognizer.recognize_google(audio)
-            return text
+            with span("stt.capture"):
+                audio = recognizer.listen(source)
+        backend = get_backend()
+        with span("asr.recognize", backend=backend.name):
+            text = work.call("audio", backend.transcribe, audio)
+        return text, None
     except sr.UnknownValueError:
-        return "Sorry, I could not understand the audio."
+        return "", "Sorry, I could not understand the audio."
     except sr.RequestError:
-        return "Sorry, there was an issue with the speech recognition service."
+        return "", "Sorry, there was an issue with the speech recognition service."
     except Exception as e:
-        return f"Error accessing the microphone: {e}"
+        return "", f"Error accessing the microphone: {e}"
+
+def get_call_session(customer_name):
+    """Return this browser session's CallSession for the customer, starting one if needed."""
+    sessions = st.session_state.setdefault("call_sessions", {})
+    if customer_name not in sessions:
+        sessions[customer_name] = CallSession(customer_name)
+    return sessions[customer_name]
+
+def get_work_session(customer_name):
+    """Return this browser session's WorkSession, cancelling its pending work when the agent switches customer."""
+    work = st.session_state.get("work_session")
+    if work is None:
+        work = st.session_state["work_session"] = get_session_manager().open()
+    elif st.session_state.get("work_customer") != customer_name:
+        work.cancel()
+    st.session_state["work_customer"] = customer_name
+    return work
+
+def get_call_summarizer(customer_name):
+    """Return the running summary of this browser session's call with the customer."""
+    summarizers = st.session_state.setdefault("call_summarizers", {})
+    if customer_name not in summarizers:
+        summarizers[customer_name] = CallSummarizer(customer_name, functions=assistant)
+    return summarizers[customer_name]
+
+def show_call_timeline(box, call_session):
+    """Render the call's mood sparkline, running aggregates and alerts into a placeholder."""
+    with box.container():
+        if not call_session.count:
+            st.caption("No utterances scored yet for this call.")
+            return
+        st.code(call_session.sparkline(), language=None)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Mood (EMA)", f"{call_session.ema:.1f}")
+        col2.metric("Trend", f"{call_session.slope:+.2f}/min")
+        col3.metric("Min / Max", f"{call_session.min:.0f} / {call_session.max:.0f}")
+        col4.metric("Utterances", call_session.count)
+        for alert in call_session.alerts[-3:]:
+            st.warning(f"[{alert.at:.0f}s] {alert.message}")
+
+def record_sentiment(call_session, timeline_box, state_of_mind):
+    """Add one utterance score to the call timeline and refresh it."""
+    call_session.add(state_of_mind)
+    show_call_timeline(timeline_box, call_session)
+
+def live_speech_to_text(call_session, timeline_box, summarizer, work, max_seconds=60):
+    """Transcribe the microphone segment by segment, analyzing each finished segment right away."""
+    import speech_recognition as sr
+    st.write("🎤 Live transcription... Speak now!")
+    partial_box = st.empty()
+    final_segments = []
+    recognizer = backend_recognizer()
+    try:
+        frames = frames_from_microphone(max_seconds=max_seconds)
+        for segment in stream_transcripts(frames, recognize=lambda audio: work.call("audio", recognizer, audio)):
+            if not segment.is_final:
+                partial_box.caption(f"… {segment.text}")
+                continue
+            partial_box.empty()
+            final_segments.append(segment.text)
+            summarizer.add_segment(segment.text)
+            state_of_mind = work.call("sentiment", assistant.analyze_sentiment, segment.text)
+            record_sentiment(call_session, timeline_box, state_of_mind)
+            st.write(f"[{segment.start:.1f}s] {segment.text}")
+            st.caption(f"Intent: {assistant.process_query(segment.text)} · "
+                       f"State of Mind: {state_of_mind} ({assistant.emotion_from_score(state_of_mind)})")
+    except sr.RequestError:
+        st.error("Sorry, there was an issue with the speech recognition service.")
+    except Exception as e:
+        st.error(f"Error accessing the microphone: {e}")
+    return " ".join(final_segments)
+
+def show_pipeline_results(customer_name, query, work, include_objection=False, call_session=None, timeline_box=None):
+    """Run the analysis stages concurrently and render each one as soon as it finishes."""
+    intent_box = st.empty()
+    sentiment_box = st.empty()
+    suggestions_box = st.empty()
+    objection_box = st.empty() if include_objection else None
+    suggestions_box.info("Generating suggestions...")
+
+    async def render():
+        async for result in AssistPipeline(functions=assistant, session=work).stream(customer_name, query, include_objection):
+            if result.error:
+                st.error(f"{result.stage} failed: {result.error}")
+            elif result.stage == "intent":
+                intent_box.write(result.value)
+            elif result.stage == "sentiment":
+                with sentiment_box.container():
+                    st.write(f"State of Mind: (0 Being Extremely Unhappy/Sad to 10 Being Extremely Happy/Satisfied)")
+                    assistant.visual_state_of_mind(int(result.value["state_of_mind"]))
+                    st.write(f"Emotion Category: {result.value['emotion']}")
+                if call_session is not None:
+                    record_sentiment(call_session, timeline_box, result.value["state_of_mind"])
+            elif result.stage == "recommendations":
+                with suggestions_box.container():
+                    st.write("Suggestions:")
+                    st.write(f"{result.value}")
+            elif result.stage == "objection":
+                with objection_box.container():
+                    st.write("Objection Response:")
+                    st.write(f"{result.value}")
+
+    asyncio.run(render())
+
+def customer_picker(label, key, limit=50):
+    """Type-ahead customer selection: only the best matches for what has been typed are listed."""
+    query = st.text_input("Search customers", key=f"{key}_search", placeholder="Start typing a name...")
+    matches = assistant.search_customers(query, 0, limit)
+    if matches["total"] > limit:
+        st.caption(f"Showing {limit} of {matches['total']} matches, keep typing to narrow them down.")
+    return st.selectbox(label, matches["customers"], index=0, key=key)
+
+
+def customer_table(page_size=25):
+    """Paginated, filterable table of customers; only the current page is read and rendered."""
+    import pandas as pd  # Only needed on the Admin Panel
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        name_filter = st.text_input("Filter by name", key="customer_table_filter")
+    with col2:
+        page_number = st.number_input("Page", min_value=1, value=1, step=1, key="customer_table_page")
+    page = assistant.search_customers(name_filter, (page_number - 1) * page_size, page_size, with_records=True)
+    rows = [{
+        "Name": name,
+        "Interests": ", ".join(page["records"][name].get("interests", [])),
+        "Past Purchases": ", ".join(page["records"][name].get("past_purchases", [])),
+    } for name in page["customers"]]
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    pages = max(1, -(-page["total"] // page_size))
+    st.caption(f"Page {page_number} of {pages} · {page['total']} customers")
+
+
+def debug_panel():
+    """Sidebar panel with p50/p95/p99 latency per stage for this process (see telemetry.py)."""
+    with st.sidebar.expander("Debug: stage latency"):
+        summary = tracer.stage_summary()
+        if summary:
+            st.table([{
+                "Stage": name, "Count": stats["count"], "Errors": stats["errors"],
+                "p50 ms": round(stats["p50"] * 1000, 1), "p95 ms": round(stats["p95"] * 1000, 1),
+                "p99 ms": round(stats["p99"] * 1000, 1),
+            } for name, stats in summary.items()])
+        else:
+            st.caption("No stages have run in this process yet.")
+        if assistant is not AI_Project_Functions:
+            st.caption("Gemini, CRM and sentiment stages run in the service; see its /metrics endpoint.")
+
+        profiler = get_profiler()
+        if st.checkbox("Sampling profiler", value=profiler.running, key="sampling_profiler"):
+            profiler.start()
+            if profiler.samples:
+                st.write({span_name: count for span_name, count in list(profiler.by_span().items())[:10]})
+                st.download_button("Download collapsed stacks", profiler.collapsed(), file_name="profile.folded")
+        elif profiler.running:
+            profiler.stop()
+
 
 # Navigation sidebar
 st.sidebar.title("Navigation")
@@ -225,12 +224,10 @@ page = st.sidebar.radio("Go to", ["Sales Call Assistant", "Admin Panel"])
 if page == "Sales Call Assistant":
     st.header("Customer Interaction")
 
-    crm_data = AI_Project_Functions.get_crm_data()
-    customer_names = AI_Project_Functions.get_all_users(crm_data)
-    selected_customer = st.selectbox("Select Customer", customer_names, index=0)
+    selected_customer = customer_picker("Select Customer", key="selected_customer")
 
-    # Fetch customer details
-    selected_customer_data = AI_Project_Functions.get_user_info(crm_data, selected_customer)
+    # Fetch customer details (just this customer, not the whole CRM)
+    selected_customer_data = assistant.get_user_info(None, selected_customer) if selected_customer else {}
 
     # Display selected customer details
     if selected_customer_data:
@@ -242,43 +239,84 @@ if page == "Sales Call Assistant":
         for purchase in selected_customer_data.get('past_purchases', []):
             st.write(f"- {purchase}")
 
+        # Mood over the current call, updated after every scored utterance
+        st.subheader("Call Mood")
+        call_session = get_call_session(selected_customer)
+        summarizer = get_call_summarizer(selected_customer)
+        work = get_work_session(selected_customer)
+        timeline_box = st.empty()
+        show_call_timeline(timeline_box, call_session)
+        if st.button("Start New Call"):
+            work.cancel()
+            st.session_state["call_sessions"].pop(selected_customer, None)
+            st.session_state["call_summarizers"].pop(selected_customer, None)
+            call_session = get_call_session(selected_customer)
+            summarizer = get_call_summarizer(selected_customer)
+            show_call_timeline(timeline_box, call_session)
+
         # Real-time voice recording for user queries
         st.subheader("Voice Query")
+        include_objection = st.checkbox("Also suggest a response to the customer's objection")
+        live_mode = st.checkbox("Live transcription (analyze each sentence while the customer is talking)")
         if st.button("🎤 Start Recording"):
-            user_query = speech_to_text()
-            st.write("You said:", user_query)
+            error = None
+            if live_mode:
+                user_query = live_speech_to_text(call_session, timeline_box, summarizer, work)
+            else:
+                user_query, error = speech_to_text(work)
+                if user_query:
+                    # Only real transcripts go into the call summary, never the error messages
+                    summarizer.add_segment(user_query)
+            if error:
+                st.warning(error)
+            else:
+                st.write("You said:", user_query)
 
-            # Backend processing placeholder
+            # Intent, sentiment and suggestions are computed concurrently
             if user_query:
                 st.subheader("AI Response")
-                response = AI_Project_Functions.process_query(user_query)  # Call the dummy function
-                st.write(response)
-
-                # Generate sentiment-based response
-                sentiment_data = AI_Project_Functions.queryToSentiment(selected_customer, user_query)
-                st.write(f"State of Mind: (0 Being Extremely Unhappy/Sad to 10 Being Extremely Happy/Satisfied)")
-                state_of_mind_score = int(sentiment_data["state_of_mind"])
-                AI_Project_Functions.visual_state_of_mind(state_of_mind_score)
-                st.write(f"Emotion Category: {sentiment_data['emotion']}")
-                st.write("Suggestions:")
-                st.write(f"{sentiment_data['suggestions']}")
-            else:
+                # Live mode already added each segment to the call timeline
+                show_pipeline_results(selected_customer, user_query, work, include_objection,
+                                      call_session=None if live_mode else call_session, timeline_box=timeline_box)
+            elif not error:
                 st.warning("Please speak loudly.")
     
 
         # Manual text input as an alternative to voice
         st.subheader("Or Type Your Query")
         manual_query = st.text_area("Enter your query here", placeholder="Type your question or concern...")
+        include_summary = st.checkbox("Also generate a call summary")
         if st.button("Submit Query"):
             if manual_query:
                 st.subheader("AI Response")
-                sentiment_data = AI_Project_Functions.queryToSentiment(selected_customer, manual_query)
+                state_of_mind_score = work.call("sentiment", assistant.analyze_sentiment, manual_query)
+                record_sentiment(call_session, timeline_box, state_of_mind_score)
+                summarizer.add_segment(manual_query)
                 st.write(f"State of Mind: (0 Being Extremely Unhappy/Sad to 10 Being Extremely Happy/Satisfied)")
-                state_of_mind_score = int(sentiment_data["state_of_mind"])
-                AI_Project_Functions.visual_state_of_mind(state_of_mind_score)
-                st.write(f"Emotion Category: {sentiment_data['emotion']}")
-                st.write("Suggestions:")
-                st.write(f"{sentiment_data['suggestions']}")
+                assistant.visual_state_of_mind(state_of_mind_score)
+                st.write(f"Emotion Category: {assistant.emotion_from_score(state_of_mind_score)}")
+
+                # Stream Gemini output into the page as it is generated
+                with stream_metrics.capture() as streamed:
+                    try:
+                        st.write("Suggestions:")
+                        st.write_stream(assistant.recommend_product(
+                            selected_customer, selected_customer_data.get('interests', []), state_of_mind_score,
+                            stream=True
+                        ))
+                        if include_summary:
+                            # Covers the whole call so far; earlier parts were summarized while it went on
+                            st.write("Call Summary:")
+                            st.write_stream(summarizer.finish(state_of_mind_score, stream=True))
+                    except LLMError as e:
+                        st.warning(f"AI suggestions are unavailable right now: {e}")
+
+                # Only when this request actually streamed from Gemini (cache and index hits record nothing)
+                if streamed:
+                    ttft, total = streamed[-1]
+                    metrics = stream_metrics.summary()
+                    st.caption(f"Time to first token: {ttft:.2f}s · Total: {total:.2f}s "
+                               f"(p50 TTFT {metrics['p50_ttft']:.2f}s over {metrics['count']} streams)")
             else:
                 st.warning("Please enter a query before submitting.")
 
@@ -287,8 +325,6 @@ elif page == "Admin Panel":
     st.header("Admin Panel")
     st.markdown("Manage customer data here.")
 
-    crm_data = AI_Project_Functions.get_crm_data()
-
     # Add New Customer
     st.subheader("Add New Customer")
     with st.form(key="add_customer_form"):
@@ -304,7 +340,7 @@ elif page == "Admin Panel":
             if new_name and new_interests and new_past_purchases:
                 interests_list = [interest.strip() for interest in new_interests.split(",")]
                 past_purchases_list = [purchase.strip() for purchase in new_past_purchases.split(",")]
-                result = AI_Project_Functions.add_entry_to_crm(
+                result = assistant.add_entry_to_crm(
                     name=new_name,
                     part_purchase_list=past_purchases_list,
                     interests_list=interests_list
@@ -315,10 +351,10 @@ elif page == "Admin Panel":
 
     # Edit Existing Customer
     st.subheader("Edit Existing Customer")
-    edit_customer_name = st.selectbox("Select Customer to Edit", AI_Project_Functions.get_all_users(crm_data))
+    edit_customer_name = customer_picker("Select Customer to Edit", key="edit_customer")
     if edit_customer_name:
         st.write(f"### Editing Interests for {edit_customer_name}")
-        current_interests = AI_Project_Functions.get_user_info(crm_data, edit_customer_name).get('interests', [])
+        current_interests = assistant.get_user_info(None, edit_customer_name).get('interests', [])
         st.write(f"*Current Interests:* {', '.join(current_interests)}")
         with st.form(key="edit_customer_form"):
             add_interest = st.text_input("Add a New Interest (One at a Time)")
@@ -326,19 +362,22 @@ elif page == "Admin Panel":
             
             if st.form_submit_button("Update Interests"):
                 if add_interest:
-                    result = AI_Project_Functions.update_interests(edit_customer_name, add_interest)
+                    result = assistant.update_interests(edit_customer_name, add_interest)
                     st.success(result)
                 elif replace_interests:
                     interests_list = [interest.strip() for interest in replace_interests.split(",")]
-                    result = AI_Project_Functions.update_interests(edit_customer_name, interests_list)
+                    result = assistant.update_interests(edit_customer_name, interests_list)
                     st.success(result)
                 else:
                     st.error("Please enter either a new interest or a new set of interests.")
 
     # View All Customers
     st.subheader("All Customers")
-    st.write(pd.DataFrame(AI_Project_Functions.get_all_users(crm_data)))
+    customer_table()
 
 # Footer
 st.markdown("---")
-st.write("© 2025 AI Sales Call Assistant. All rights reserved.")
\ No newline at end of file
+st.write("© 2025 AI Sales Call Assistant. All rights reserved.")
+
+# Rendered last so it includes the stages of this run
+debug_panel()
@@ -0,0 +1,443 @@
+"""Library of customer objections with reusable responses.
+
+A few hundred objections ("too expensive", "need to think about it") make up
+most calls, so generate_prompt looks an objection up here before asking
+Gemini. Objections are normalized (casefolded, contractions expanded, filler
+words dropped, common synonyms merged) and embedded as hashed word, bigram
+and character-trigram features, so paraphrases and typos land close together.
+A negated objection only ever matches negated texts and vice versa, so "now
+is a good time" can't borrow the answer to "now is not a good time".
+
+Clusters are found through a random-hyperplane LSH index (bands of signature
+bits; any band in common makes a candidate) and the candidates are ranked by
+exact cosine similarity. A match at or above OBJECTION_THRESHOLD returns the
+cluster's vetted response in about a millisecond. Answers Gemini gives for
+objections the library doesn't know become new, unvetted clusters; they are
+reused only at the stricter OBJECTION_LEARNED_THRESHOLD until someone vets
+them with `python objection_library.py vet <id>`.
+
+The library starts from the vetted objections.json and keeps its state in the
+SQLite file OBJECTION_LIBRARY_PATH (objection_library.db), shared by every
+process on the machine, so a `vet` from the command line reaches running
+apps within a second. Set OBJECTION_LIBRARY=off to always ask Gemini.
+
+    python objection_library.py match "this is way too pricey for us"
+    python objection_library.py list --unvetted
+    python objection_library.py stats
+"""
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from intent_matcher import WORD_RE
+from vector_index import HashingTfidf, VectorIndex, tokenize
+
+DEFAULT_DIM = 512
+LSH_BANDS = 16
+LSH_ROWS = 6
+COUNTERS = ("lookups", "vetted_hits", "learned_hits", "misses", "learned")
+
+CONTRACTIONS = {"can't": "can not", "cannot": "can not", "won't": "will not", "don't": "do not",
+                "doesn't": "does not", "didn't": "did not", "isn't": "is not", "aren't": "are not",
+                "wasn't": "was not", "weren't": "were not", "haven't": "have not", "hasn't": "has not",
+                "wouldn't": "would not", "couldn't": "could not", "shouldn't": "should not", "it's": "it is",
+                "that's": "that is", "we're": "we are", "i'm": "i am", "i'll": "i will", "i'd": "i would",
+                "we'll": "we will", "we've": "we have", "i've": "i have", "you're": "you are"}
+# Only words that carry no meaning of their own: negations, modals ("can", "would") and judgements
+# ("good", "okay", "too") stay, since dropping them can turn an objection into its opposite
+FILLER = {"um", "uh", "well", "so", "like", "just", "really", "honestly", "actually", "basically", "the",
+          "a", "an", "to", "for", "of", "us", "me", "my", "our", "this", "that", "it", "is", "are", "i",
+          "we", "you", "your", "and", "but", "look", "hi", "hello", "am", "be", "with", "about", "some",
+          "let", "please", "first", "quite", "bit", "on", "in", "at"}
+NEGATIONS = {"not", "no", "never", "nothing", "none", "nobody", "neither", "nor", "without"}
+# Only true paraphrases; "price", "cost", "afford" and "budget" are topics, not a verdict on the price
+SYNONYMS = {"pricey": "expensive", "costly": "expensive", "overpriced": "expensive", "cheaper": "cheap",
+            "boss": "manager", "supervisor": "manager", "approval": "manager", "vendor": "competitor",
+            "provider": "competitor", "supplier": "competitor", "shipping": "delivery", "email": "send",
+            "brochure": "information", "info": "information", "details": "information",
+            "consider": "think", "decide": "think", "later": "time", "busy": "time", "timing": "time"}
+
+
+def normalize_objection(text):
+    """Canonical form of an objection: lowercase words, contractions expanded, filler dropped, synonyms merged."""
+    text = text.casefold().replace("’", "'")
+    for contraction, expanded in CONTRACTIONS.items():
+        text = text.replace(contraction, expanded)
+    words = [SYNONYMS.get(word, word) for word in WORD_RE.findall(text)]
+    kept = [word for word in words if word not in FILLER]
+    return " ".join(tokenize(" ".join(kept or words)))
+
+
+def is_negated(normalized):
+    """Whether a normalized objection contains a negation ("not a good time", "can not afford")."""
+    return any(word in NEGATIONS for word in normalized.split())
+
+
+def objection_features(normalized):
+    """Hashed features: words, word bigrams and character trigrams (for typos)."""
+    words = normalized.split()
+    features = list(words)
+    features += [f"{first}_{second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [f"~{padded[start:start + 3]}" for start in range(len(padded) - 2)]
+    return features
+
+
+class ObjectionVectorizer(HashingTfidf):
+    """HashingTfidf over objection_features instead of plain tokens."""
+
+    def counts(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in objection_features(normalize_objection(text)):
+                # Words count double so a shared word outweighs shared trigrams
+                matrix[row, self._bucket(feature)] += 1.0 if feature.startswith("~") else 2.0
+        return matrix
+
+
+class LSHIndex:
+    """Random-hyperplane LSH: vectors sharing any band of signature bits become candidates."""
+
+    def __init__(self, dim, bands=LSH_BANDS, rows=LSH_ROWS, seed=0):
+        self.bands = bands
+        self.rows = rows
+        self._planes = np.random.default_rng(seed).standard_normal((dim, bands * rows)).astype(np.float32)
+        self._weights = 1 << np.arange(rows, dtype=np.int64)
+        self._buckets = [{} for _ in range(bands)]
+
+    def _keys(self, vector):
+        bits = (vector @ self._planes > 0).reshape(self.bands, self.rows)
+        return (bits @ self._weights).tolist()
+
+    def add(self, key, vector):
+        for band, bucket_key in enumerate(self._keys(vector)):
+            self._buckets[band].setdefault(bucket_key, []).append(key)
+
+    def candidates(self, vector):
+        found = set()
+        for band, bucket_key in enumerate(self._keys(vector)):
+            found.update(self._buckets[band].get(bucket_key, ()))
+        return found
+
+
+@dataclass
+class ObjectionCluster:
+    """One kind of objection, with the response to give for it."""
+    id: int
+    objection: str
+    response: str
+    vetted: bool = False
+    examples: list = field(default_factory=list)
+    hits: int = 0
+    source: str = "seed"
+
+
+@dataclass
+class ObjectionMatch:
+    cluster: ObjectionCluster
+    similarity: float
+
+
+class ObjectionLibrary:
+    """Near-duplicate lookup of objections with learned and vetted responses.
+
+    Clusters live in a SQLite file shared by every process on the machine. Each
+    process keeps the vectors in memory and picks up clusters other processes
+    learned or vetted at most sync_interval seconds later; every write re-reads
+    the file inside its transaction, so nothing another process wrote is lost.
+    """
+
+    def __init__(self, file_path="objection_library.db", seed_path="objections.json", threshold=0.8,
+                 learned_threshold=0.9, dim=DEFAULT_DIM, max_examples=20, sync_interval=1.0):
+        self.file_path = file_path
+        self.threshold = threshold
+        self.learned_threshold = learned_threshold
+        self.max_examples = max_examples
+        self.sync_interval = sync_interval
+        self.vectorizer = ObjectionVectorizer(dim)
+        self.clusters = {}
+        self._vectors = VectorIndex(dim)  # One row per objection text; key (cluster id, example number)
+        self._lsh = LSHIndex(dim)
+        self._negated = {}  # Same keys as _vectors: whether that text is negated
+        self._indexed = {}  # Cluster id -> number of its texts in the index
+        self._version = 0   # Highest cluster version loaded from the file
+        self._synced_at = 0.0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Counted here and added to the file's totals on the next sync, not on every lookup
+        self._pending_counters = dict.fromkeys(COUNTERS, 0)
+        self._pending_hits = {}
+        self._lookups = 0
+        self._lookup_seconds = 0.0
+
+        conn = self._connect()
+        if seed_path and os.path.exists(seed_path):
+            with open(seed_path, "r", encoding="utf-8") as file:
+                seed_items = json.load(file)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT COUNT(*) FROM clusters").fetchone()[0] == 0:
+                    for version, item in enumerate(seed_items, 1):
+                        conn.execute("INSERT INTO clusters (objection, response, vetted, examples, source, version) "
+                                     "VALUES (?, ?, 1, ?, 'seed', ?)",
+                                     (item["objection"], item["response"],
+                                      json.dumps(list(item.get("examples", []))), version))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._sync(force=True)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.file_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS clusters ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, objection TEXT NOT NULL, response TEXT NOT NULL, "
+                "vetted INTEGER NOT NULL DEFAULT 0, examples TEXT NOT NULL DEFAULT '[]', "
+                "hits INTEGER NOT NULL DEFAULT 0, source TEXT NOT NULL, version INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS clusters_version ON clusters (version)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _index_text(self, cluster_id, number, text):
+        vector = self.vectorizer.transform([text])[0]
+        key = (cluster_id, number)
+        self._vectors.upsert(key, vector)
+        self._lsh.add(key, vector)
+        self._negated[key] = is_negated(normalize_objection(text))
+
+    def _load(self, cluster):
+        """Add or refresh a cluster read from the file, indexing only texts not indexed yet."""
+        known = self.clusters.get(cluster.id)
+        if known is not None:
+            cluster.hits = max(cluster.hits, known.hits)
+        self.clusters[cluster.id] = cluster
+        texts = [cluster.objection] + cluster.examples
+        for number in range(self._indexed.get(cluster.id, 0), len(texts)):
+            self._index_text(cluster.id, number, texts[number])
+        self._indexed[cluster.id] = len(texts)
+
+    def _flush(self, conn):
+        """Add this process's pending hit counts and counters to the file (inside a transaction)."""
+        for cluster_id, hits in self._pending_hits.items():
+            conn.execute("UPDATE clusters SET hits = hits + ? WHERE id = ?", (hits, cluster_id))
+        for name, value in self._pending_counters.items():
+            if value:
+                conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                             "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (name, value))
+        self._pending_hits.clear()
+        self._pending_counters = dict.fromkeys(COUNTERS, 0)
+
+    def _read_changes(self, conn):
+        rows = conn.execute("SELECT id, objection, response, vetted, examples, hits, source, version FROM clusters "
+                            "WHERE version > ? ORDER BY version", (self._version,)).fetchall()
+        for cluster_id, objection, response, vetted, examples, hits, source, version in rows:
+            self._load(ObjectionCluster(cluster_id, objection, response, bool(vetted), json.loads(examples),
+                                        hits, source))
+            self._version = max(self._version, version)
+        self._synced_at = time.monotonic()
+
+    def _sync(self, force=False):
+        """Pick up other processes' changes and write pending counts, at most every sync_interval seconds."""
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            conn = self._connect()
+            if self._pending_hits or any(self._pending_counters.values()):
+                self._transaction(lambda: None)
+            else:
+                self._read_changes(conn)
+
+    def _transaction(self, write):
+        """Run write() in an immediate transaction after loading every change made so far; returns its result."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._read_changes(conn)
+                self._flush(conn)
+                result = write()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._read_changes(conn)  # Our own write, with its new version
+            return result
+
+    def _write_cluster(self, cluster, insert=False):
+        # Called inside _transaction: give the row the next version so other processes reload it
+        conn = self._connect()
+        version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM clusters").fetchone()[0]
+        if insert:
+            return conn.execute("INSERT INTO clusters (objection, response, vetted, examples, source, version) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                (cluster.objection, cluster.response, int(cluster.vetted),
+                                 json.dumps(cluster.examples), cluster.source, version)).lastrowid
+        conn.execute("UPDATE clusters SET response = ?, vetted = ?, examples = ?, version = ? WHERE id = ?",
+                     (cluster.response, int(cluster.vetted), json.dumps(cluster.examples), version, cluster.id))
+        return cluster.id
+
+    def nearest(self, objection):
+        """Best-matching cluster for an objection, whatever its similarity (None if nothing is close)."""
+        self._sync()
+        return self._nearest(objection)
+
+    def _nearest(self, objection):
+        vector = self.vectorizer.transform([objection])[0]
+        negated = is_negated(normalize_objection(objection))
+        with self._lock:
+            # "Now is a good time" must never borrow the answer to "now is not a good time"
+            candidates = [key for key in self._lsh.candidates(vector) if self._negated[key] == negated]
+            if not candidates:
+                return None
+            rows = np.stack([self._vectors.vector(key) for key in candidates])
+            scores = rows @ vector
+            best = int(np.argmax(scores))
+            return ObjectionMatch(self.clusters[candidates[best][0]], float(scores[best]))
+
+    def lookup(self, objection):
+        """Return the ObjectionMatch whose response can be reused for this objection, or None."""
+        start = time.perf_counter()
+        match = self.nearest(objection)
+        with self._lock:
+            self._pending_counters["lookups"] += 1
+            usable = match is not None and match.similarity >= (
+                self.threshold if match.cluster.vetted else self.learned_threshold)
+            if usable:
+                match.cluster.hits += 1
+                self._pending_hits[match.cluster.id] = self._pending_hits.get(match.cluster.id, 0) + 1
+                self._pending_counters["vetted_hits" if match.cluster.vetted else "learned_hits"] += 1
+            else:
+                self._pending_counters["misses"] += 1
+            self._lookups += 1
+            self._lookup_seconds += time.perf_counter() - start
+        return match if usable else None
+
+    def learn(self, objection, response):
+        """Remember an LLM answer to an objection the library didn't know, as a new unvetted cluster."""
+        objection, response = objection.strip(), response.strip()
+        if not objection or not response:
+            return None
+
+        def write():
+            match = self._nearest(objection)
+            if match is not None and match.similarity >= self.learned_threshold:
+                # A near-duplicate (maybe from another process) got here first; keep this wording as an example
+                cluster = match.cluster
+                if len(cluster.examples) < self.max_examples and objection not in cluster.examples:
+                    self._write_cluster(replace(cluster, examples=cluster.examples + [objection]))
+                return cluster.id
+            self._pending_counters["learned"] += 1
+            self._flush(self._connect())
+            return self._write_cluster(ObjectionCluster(None, objection, response, source="llm"), insert=True)
+
+        return self.clusters[self._transaction(write)]
+
+    def vet(self, cluster_id, response=None):
+        """Mark a cluster as vetted, optionally replacing its response."""
+        def write():
+            cluster = self.clusters[cluster_id]
+            self._write_cluster(replace(cluster, vetted=True, response=response or cluster.response))
+
+        self._transaction(write)
+        return self.clusters[cluster_id]
+
+    def stats(self):
+        """Lookup counters of every process using the file, hit rate and this process's mean lookup time."""
+        self._sync(force=True)
+        with self._lock:
+            stats = dict.fromkeys(COUNTERS, 0)
+            stats.update(self._connect().execute("SELECT name, value FROM counters").fetchall())
+            lookups = stats["lookups"]
+            stats["hit_rate"] = (stats["vetted_hits"] + stats["learned_hits"]) / lookups if lookups else 0.0
+            stats["clusters"] = len(self.clusters)
+            stats["vetted_clusters"] = sum(cluster.vetted for cluster in self.clusters.values())
+            stats["mean_lookup_ms"] = self._lookup_seconds / self._lookups * 1000 if self._lookups else 0.0
+            return stats
+
+    def save_if_changed(self):
+        """Write pending hit counts and counters (registered to run at exit)."""
+        if self._pending_hits or any(self._pending_counters.values()):
+            self._transaction(lambda: None)
+
+
+def learning_stream(chunks, library, objection):
+    """Pass a streamed LLM answer through, then learn it once it has completed."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    library.learn(objection, "".join(parts))
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_objection_library():
+    """Return the process-wide ObjectionLibrary, or None when OBJECTION_LIBRARY=off."""
+    global _library
+    if os.getenv("OBJECTION_LIBRARY", "on").lower() == "off":
+        return None
+    with _library_lock:
+        if _library is None:
+            _library = ObjectionLibrary(
+                os.getenv("OBJECTION_LIBRARY_PATH", "objection_library.db"),
+                os.getenv("OBJECTION_SEED_PATH", "objections.json"),
+                threshold=float(os.getenv("OBJECTION_THRESHOLD", "0.8")),
+                learned_threshold=float(os.getenv("OBJECTION_LEARNED_THRESHOLD", "0.9")),
+            )
+            # Hit counts are written on the next sync after a lookup, so flush the last ones at exit
+            atexit.register(_library.save_if_changed)
+        return _library
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Objection-response library")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    match = subparsers.add_parser("match", help="Show the closest cluster for an objection")
+    match.add_argument("objection")
+    listing = subparsers.add_parser("list", help="List clusters, most used first")
+    listing.add_argument("--unvetted", action="store_true")
+    vet = subparsers.add_parser("vet", help="Approve a learned cluster, optionally with a new response")
+    vet.add_argument("id", type=int)
+    vet.add_argument("--response")
+    subparsers.add_parser("stats", help="Hit-rate statistics")
+    args = parser.parse_args()
+
+    library = get_objection_library()
+    if library is None:
+        parser.exit(1, "The objection library is disabled (OBJECTION_LIBRARY=off).\n")
+    if args.command == "match":
+        found = library.nearest(args.objection)
+        print(f"normalized: {normalize_objection(args.objection)!r}")
+        if found is None:
+            print("No similar objection in the library.")
+        else:
+            cluster = found.cluster
+            print(f"#{cluster.id} {'vetted' if cluster.vetted else 'unvetted'} similarity {found.similarity:.2f}: "
+                  f"{cluster.objection}\n{cluster.response}")
+    elif args.command == "list":
+        for cluster in sorted(library.clusters.values(), key=lambda cluster: -cluster.hits):
+            if not (args.unvetted and cluster.vetted):
+                print(f"#{cluster.id:<4} {cluster.hits:>6} hits  {'vetted  ' if cluster.vetted else 'unvetted'}  "
+                      f"{cluster.objection}")
+    elif args.command == "vet":
+        cluster = library.vet(args.id, args.response)
+        print(f"#{cluster.id} is now vetted: {cluster.response}")
+    elif args.command == "stats":
+        print(json.dumps(library.stats(), indent=2))
@@ -0,0 +1,128 @@
+"""Async fan-out of the per-query analysis stages.
+
+The voice path used to run process_query, then queryToSentiment (VADER, then
+a blocking Gemini call) one after another. AssistPipeline starts every
+independent stage at once on worker threads and yields each result as soon as
+it is ready, so intent and sentiment show up while Gemini is still thinking.
+
+Stages:
+    intent          - keyword intent response (process_query)
+    sentiment       - 1-10 score and emotion bucket (analyze_sentiment)
+    customer        - CRM record of the customer
+    recommendations - Gemini product suggestions (needs sentiment + customer)
+    objection       - Gemini objection response (generate_prompt), optional
+
+Given a WorkSession (session_manager.py), the stages run on its bounded
+lanes instead of the default executor: the quick CPU stages share the
+sentiment lane and the Gemini stages use the llm lane.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from ai_functions import AI_Project_Functions
+from interaction_log import log_event
+from telemetry import traced_call
+
+STAGES = ("intent", "sentiment", "customer", "recommendations", "objection")
+STAGE_LANES = {"intent": "sentiment", "sentiment": "sentiment", "customer": "sentiment",
+               "recommendations": "llm", "objection": "llm"}
+
+
+@dataclass
+class StageResult:
+    """Outcome of one pipeline stage."""
+    stage: str
+    value: Any
+    elapsed: float
+    error: Optional[str] = None
+
+
+class AssistPipeline:
+    """Runs the analysis stages for one query concurrently."""
+
+    def __init__(self, functions=AI_Project_Functions, session=None):
+        self.functions = functions
+        self.session = session
+
+    async def _timed(self, stage, fn, *args):
+        start = time.perf_counter()
+        try:
+            # The stage's span is the parent of the CRM, VADER and Gemini spans inside it
+            if self.session is not None:
+                value = await self.session.run(STAGE_LANES[stage], traced_call, f"stage.{stage}", fn, *args)
+            else:
+                value = await asyncio.to_thread(traced_call, f"stage.{stage}", fn, *args)
+            return StageResult(stage, value, time.perf_counter() - start)
+        except Exception as e:
+            return StageResult(stage, None, time.perf_counter() - start, error=str(e))
+
+    @staticmethod
+    def _sentiment(functions, query):
+        # Static so it can be pickled to a sentiment worker process
+        state_of_mind = functions.analyze_sentiment(query)
+        return {"state_of_mind": state_of_mind, "emotion": functions.emotion_from_score(state_of_mind)}
+
+    @staticmethod
+    def _log(name, result):
+        """Record the stage's timing, plus the intent and sentiment themselves.
+
+        Gemini answers (recommendations, objection responses) are logged by the functions that produce them.
+        """
+        log_event("timing", str(name), result.stage, elapsed=result.elapsed, error=result.error)
+        if result.error:
+            return
+        if result.stage == "intent":
+            log_event("intent", str(name), result.value)
+        elif result.stage == "sentiment":
+            log_event("sentiment", str(name), result.value["emotion"], result.value["state_of_mind"])
+
+    async def stream(self, name, query, include_objection=False):
+        """Async generator yielding a StageResult for each stage in completion order."""
+        queue = asyncio.Queue()
+
+        async def run(coro):
+            await queue.put(await coro)
+
+        async def recommendations(sentiment_task, customer_task):
+            start = time.perf_counter()
+            sentiment, customer = await asyncio.gather(sentiment_task, customer_task)
+            if sentiment.error or customer.error:
+                return StageResult("recommendations", None, time.perf_counter() - start,
+                                   error=sentiment.error or customer.error)
+            result = await self._timed(
+                "recommendations", self.functions.recommend_product,
+                name, customer.value.get("interests", []), sentiment.value["state_of_mind"],
+            )
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        sentiment_task = asyncio.ensure_future(self._timed("sentiment", self._sentiment, self.functions, query))
+        customer_task = asyncio.ensure_future(
+            self._timed("customer", self.functions.get_user_info, None, str(name))
+        )
+        stages = [
+            self._timed("intent", self.functions.process_query, query),
+            sentiment_task,
+            customer_task,
+            recommendations(sentiment_task, customer_task),
+        ]
+        if include_objection:
+            stages.append(self._timed("objection", self.functions.generate_prompt, query))
+
+        tasks = [asyncio.ensure_future(run(stage)) for stage in stages]
+        log_event("segment", str(name), query)
+        try:
+            for _ in tasks:
+                result = await queue.get()
+                self._log(name, result)
+                yield result
+        finally:
+            # Stop outstanding stages if the consumer walks away early
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, name, query, include_objection=False):
+        """Run every stage and return a {stage: StageResult} dict."""
+        return {result.stage: result async for result in self.stream(name, query, include_objection)}
@@ -0,0 +1,235 @@
+"""Precomputed recommendation index so common cases skip the LLM.
+
+recommend_product only depends on the customer's interests and their 1-10
+score, so the answers can be computed ahead of time. The build job collects
+every interest combination in the CRM, asks Gemini once per combination and
+sentiment bucket, and writes a compact binary index:
+
+    header   b"RECIDX1\\0", entry count (uint32)
+    entries  sorted (key hash uint64, offset uint64, length uint32) records
+    blob     UTF-8 "key\\0recommendation" strings
+
+At serve time the file is memory-mapped and looked up with a binary search
+over the fixed-size entries, so a lookup costs microseconds and the index is
+shared between processes through the page cache.
+
+    python recommendation_index.py build --crm crm.json --out recommendations.idx
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAGIC = b"RECIDX1\0"
+HEADER = struct.Struct("<8sI")
+ENTRY = struct.Struct("<QQI")
+
+# Sentiment buckets (same boundaries as emotion_from_score) and the score used when precomputing each one
+BUCKETS = {
+    "disappointed": 3,
+    "neutral": 5,
+    "happy": 8,
+}
+
+
+def sentiment_bucket(score):
+    """Map a 1-10 score onto a precomputed bucket."""
+    return "happy" if score > 5 else "neutral" if score == 5 else "disappointed"
+
+
+def index_key(interests, bucket):
+    """Canonical key: casefolded, de-duplicated, sorted interests plus the bucket."""
+    normalized = sorted({interest.strip().casefold() for interest in interests if interest.strip()})
+    return "|".join(normalized) + "#" + bucket
+
+
+def _hash(key):
+    return struct.unpack("<Q", hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest())[0]
+
+
+def write_index(entries, out_path):
+    """Write {key: recommendation} to out_path atomically."""
+    records = sorted((_hash(key), key, text) for key, text in entries.items())
+    header_size = HEADER.size + ENTRY.size * len(records)
+    table = bytearray()
+    blob = bytearray()
+    for key_hash, key, text in records:
+        payload = key.encode("utf-8") + b"\0" + text.encode("utf-8")
+        table += ENTRY.pack(key_hash, header_size + len(blob), len(payload))
+        blob += payload
+
+    directory = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(records)))
+            file.write(table)
+            file.write(blob)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RecommendationIndex:
+    """Read-only, memory-mapped recommendation index."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{file_path} is not a recommendation index")
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, position):
+        return ENTRY.unpack_from(self._mmap, HEADER.size + position * ENTRY.size)
+
+    def get(self, key):
+        """Return the recommendation stored under key, or None (also once the index is closed)."""
+        try:
+            return self._get(key)
+        except ValueError:
+            # get_index closed this index when it swapped in a rebuilt one; a miss falls back to Gemini
+            if self._mmap.closed:
+                return None
+            raise
+
+    def _get(self, key):
+        key_hash = _hash(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+        encoded_key = key.encode("utf-8") + b"\0"
+        # Walk every entry with this hash in case of a (very unlikely) collision
+        while low < self.count:
+            entry_hash, offset, length = self._entry(low)
+            if entry_hash != key_hash:
+                break
+            payload = self._mmap[offset:offset + length]
+            if payload.startswith(encoded_key):
+                return payload[len(encoded_key):].decode("utf-8")
+            low += 1
+        return None
+
+    def lookup(self, interests, score):
+        """Return the precomputed recommendation for these interests and score, or None."""
+        text = self.get(index_key(interests, sentiment_bucket(score)))
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    def items(self):
+        """Yield every (key, recommendation) pair."""
+        for position in range(self.count):
+            _, offset, length = self._entry(position)
+            key, _, text = self._mmap[offset:offset + length].partition(b"\0")
+            yield key.decode("utf-8"), text.decode("utf-8")
+
+    def close(self):
+        self._mmap.close()
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def get_index(file_path=None):
+    """Return the shared index for RECOMMENDATION_INDEX_PATH, reopening it when the file is rebuilt.
+
+    Returns None when no index has been built.
+    """
+    global _index, _index_mtime
+    file_path = file_path or os.getenv("RECOMMENDATION_INDEX_PATH", "recommendations.idx")
+    try:
+        mtime = os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _index_lock:
+        if _index is None or _index_mtime != mtime or _index.file_path != file_path:
+            previous = _index
+            _index = RecommendationIndex(file_path)
+            _index_mtime = mtime
+            if previous is not None:
+                previous.close()
+        return _index
+
+
+def build_index(crm_path="crm.json", out_path="recommendations.idx", refresh=False, workers=8):
+    """Precompute recommendations for every interest combination in the CRM and sentiment bucket.
+
+    Entries already in an existing index are reused unless refresh is True.
+    A combination Gemini fails on is left out (the next build retries it) and
+    the rest are still written. Returns (total entries, newly generated
+    entries, {key: error} of the failed combinations).
+    """
+    from ai_functions import AI_Project_Functions
+    from crm_store import get_store
+    from gemini_client import LLMError
+
+    combinations = {}
+    for record in get_store(crm_path).snapshot().values():
+        interests = record.get("interests", [])
+        for bucket in BUCKETS:
+            combinations.setdefault(index_key(interests, bucket), (list(interests), bucket))
+
+    entries = {}
+    if not refresh and os.path.exists(out_path):
+        existing = RecommendationIndex(out_path)
+        entries = {key: text for key, text in existing.items() if key in combinations}
+        existing.close()
+
+    missing = [key for key in combinations if key not in entries]
+
+    failures = {}
+
+    def generate(key):
+        interests, bucket = combinations[key]
+        try:
+            return key, AI_Project_Functions.recommend_product(None, interests, BUCKETS[bucket], refresh=True), None
+        except LLMError as e:
+            return key, None, e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for key, text, error in pool.map(generate, missing):
+            if error is None:
+                entries[key] = text
+            else:
+                failures[key] = str(error)
+
+    write_index(entries, out_path)
+    return len(entries), len(missing) - len(failures), failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precomputed recommendation index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build or update the index from the CRM")
+    build.add_argument("--crm", default=os.getenv("CRM_PATH", "crm.json"))
+    build.add_argument("--out", default=os.getenv("RECOMMENDATION_INDEX_PATH", "recommendations.idx"))
+    build.add_argument("--refresh", action="store_true", help="Regenerate every entry instead of reusing existing ones")
+    build.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        total, generated, failures = build_index(args.crm, args.out, refresh=args.refresh, workers=args.workers)
+        print(f"Wrote {total} recommendations to {args.out} ({generated} generated, {total - generated} reused).")
+        for key, error in failures.items():
+            print(f"Failed {key}: {error}")
+        if failures:
+            print(f"{len(failures)} combinations failed; run the build again to retry them.")
+            raise SystemExit(1)
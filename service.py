@@ -0,0 +1,512 @@
+"""Headless ASGI service exposing the assistant pipeline.
+
+The Streamlit page reruns the whole script for every interaction. This module
+serves the same AI_Project_Functions over HTTP and WebSockets from a plain
+ASGI app (no web framework needed), so one process can handle many concurrent
+calls and the UI can act as a thin client (see service_client.py).
+
+Run it with any ASGI server, for example:
+
+    uvicorn service:app --host 0.0.0.0 --port 8000 --workers 4
+
+REST endpoints (JSON in, JSON out):
+
+    GET  /health
+    GET  /metrics                          per-stage latency histograms (Prometheus text format)
+    GET  /traces                           recent spans and histograms (OpenTelemetry OTLP/JSON)
+    GET  /sessions                         open call sessions and per-lane queue/worker counts
+    GET  /customers?q=jo&offset=0&limit=100  customer names matching q (prefix, then fuzzy), paged;
+                                           &records=1 adds their records
+    GET  /crm                              full CRM snapshot
+    GET  /customers/{name}                 one customer's record
+    POST /customers                        {"name", "past_purchases", "interests"}
+    POST /customers/find                   {"interests": [...], "purchases": [...], "match": "all" | "any"}
+    PUT  /customers/{name}/interests       {"interests": "one" | ["a", "b"]}
+    POST /sentiment                        {"text"}
+    POST /intent                           {"text"}
+    POST /recommendations                  {"customer", "interests", "emotion_score", "stream"}
+    POST /objection-response               {"objection", "stream"}
+    POST /summary                          {"customer", "transcript", "emotion_score", "stream"}
+    POST /summary/chunk                    {"customer", "transcript"}
+    POST /summary/merge                    {"customer", "summaries"}
+    POST /summary/call                     {"customer", "summaries", "transcript", "emotion_score", "stream"}
+    POST /analyze                          {"customer", "query", "include_objection"}
+
+With "stream": true the Gemini endpoints answer with NDJSON lines of
+{"text": chunk} as the model produces them; the chunks are read on the llm
+lane and the stream is closed if the client disconnects. Malformed input
+(a non-object body, a non-integer offset or limit) is answered with 400.
+
+WebSocket /ws/calls/{customer}: send {"type": "transcript", "text": ...} for
+every transcript segment and receive one {"type": "stage", ...} message per
+pipeline stage as soon as it is ready, then {"type": "timeline", ...} and
+{"type": "done"}. Send {"type": "summary"} at hang-up to stream the call
+summary as {"type": "summary_chunk", "text": ...} messages; the transcript is
+summarized chunk by chunk during the call, so this is one short Gemini call.
+
+Each connection (and each /analyze request) is a WorkSession of
+session_manager.py, so its work runs on the node's bounded audio, sentiment
+and llm lanes with a fair share per call. Segments are analyzed concurrently,
+so every stage, timeline and done message carries the "segment" number of
+the transcript it answers (counting from 1). {"type": "cancel"} cancels every
+analysis still running, answered with one {"type": "cancelled"}; closing the
+connection does the same.
+
+ASSISTANT_STUB_LLM_LATENCY=<seconds> (or LLM_BACKEND=stub) replaces Gemini with
+the offline stub backend so the service can be load tested without a network
+(see benchmarks/load_service.py).
+"""
+import asyncio
+import json
+import os
+import re
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote
+
+from ai_functions import AI_Project_Functions
+from gemini_client import GeminiClient, LLMError, StubBackend, set_client
+from lazy_resources import MissingResourceError, check_resources
+from call_session import CallSession
+from call_summary import CallSummarizer
+from pipeline import AssistPipeline
+from session_manager import SessionBusy, get_session_manager
+from telemetry import otel_json, prometheus_text
+
+
+class HTTPError(Exception):
+    """Raised by handlers to answer with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PlainText(str):
+    """A handler result sent as-is instead of as JSON."""
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def to_jsonable(value):
+    """Convert read-only CRM snapshots (mapping proxies, tuples) into plain JSON types."""
+    if isinstance(value, Mapping):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def install_stub_llm(latency=0.5, chunks=8):
+    """Route Gemini calls to the offline stub backend with `latency` seconds per answer (for load tests)."""
+    set_client(GeminiClient(StubBackend(latency=latency, chunks=chunks),
+                            rate=1e6, burst=1e6, max_concurrency=1024))
+
+
+def configure_executor(loop=None):
+    """Give the event loop a thread pool big enough for many blocking Gemini calls at once.
+
+    asyncio's default pool has only a few threads per CPU, which would queue
+    every call behind the slowest LLM request. ASSISTANT_THREADS sets the size.
+    """
+    loop = loop or asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=int(os.getenv("ASSISTANT_THREADS", "128")),
+                                                 thread_name_prefix="assistant"))
+
+
+if os.getenv("ASSISTANT_STUB_LLM_LATENCY"):
+    install_stub_llm(float(os.getenv("ASSISTANT_STUB_LLM_LATENCY")))
+
+
+async def stream_answer(fn, *args):
+    """Start fn(*args, stream=True) on the llm lane and return an async iterator over its chunks.
+
+    Each request gets its own WorkSession, so streamed answers share the
+    bounded llm lane with everything else and read one chunk per task.
+    Closing the iterator (the client went away) closes the session, which
+    cancels what is still queued and closes the Gemini stream.
+    """
+    session = get_session_manager().open()
+    try:
+        chunks = await session.run("llm", fn, *args, stream=True)
+    except BaseException:
+        session.close()
+        raise
+
+    async def stream():
+        try:
+            async for chunk in session.iterate("llm", chunks):
+                yield chunk
+        finally:
+            session.close()
+    return stream()
+
+
+def _int_param(query, name, default):
+    value = query.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer")
+    if value < 0:
+        raise HTTPError(400, f"{name} must not be negative")
+    return value
+
+
+def stage_message(result):
+    return {
+        "type": "stage",
+        "stage": result.stage,
+        "value": to_jsonable(result.value),
+        "elapsed": result.elapsed,
+        "error": result.error,
+    }
+
+
+# HTTP handlers: (params, query, body) -> JSON-able value, or an async generator for streamed answers
+
+async def health(params, query, body):
+    return {"status": "ok"}
+
+
+async def metrics(params, query, body):
+    return PlainText(prometheus_text())
+
+
+async def traces(params, query, body):
+    return otel_json()
+
+
+async def sessions(params, query, body):
+    return get_session_manager().stats()
+
+
+async def list_customers(params, query, body):
+    offset = _int_param(query, "offset", 0)
+    limit = _int_param(query, "limit", 100)
+    with_records = query.get("records", "") in ("1", "true")
+    page = await asyncio.to_thread(AI_Project_Functions.search_customers, query.get("q", ""), offset, limit, with_records)
+    return to_jsonable(page)
+
+
+async def crm_snapshot(params, query, body):
+    return to_jsonable(await asyncio.to_thread(AI_Project_Functions.get_crm_data))
+
+
+async def get_customer(params, query, body):
+    record = await asyncio.to_thread(AI_Project_Functions.get_user_info, None, params["name"])
+    if not record:
+        raise HTTPError(404, f"{params['name']} not found in the database.")
+    return to_jsonable(record)
+
+
+async def add_customer(params, query, body):
+    if not body.get("name") or not isinstance(body["name"], str):
+        raise HTTPError(400, "name is required")
+    for field in ("past_purchases", "interests"):
+        if not isinstance(body.get(field, []), list):
+            raise HTTPError(400, f"{field} must be a list")
+    message = await asyncio.to_thread(
+        AI_Project_Functions.add_entry_to_crm,
+        body["name"], body.get("past_purchases", []), body.get("interests", []),
+    )
+    return {"message": message}
+
+
+async def find_customers(params, query, body):
+    names = await asyncio.to_thread(AI_Project_Functions.find_customers, body.get("interests") or [],
+                                    body.get("purchases") or [], body.get("match", "all"))
+    return {"customers": names}
+
+
+async def update_interests(params, query, body):
+    message = await asyncio.to_thread(AI_Project_Functions.update_interests, params["name"], body.get("interests"))
+    return {"message": message}
+
+
+async def sentiment(params, query, body):
+    state_of_mind = await asyncio.to_thread(AI_Project_Functions.analyze_sentiment, body.get("text", ""))
+    return {"state_of_mind": state_of_mind, "emotion": AI_Project_Functions.emotion_from_score(state_of_mind)}
+
+
+async def intent(params, query, body):
+    text = body.get("text", "")
+    response, matches = await asyncio.to_thread(
+        lambda: (AI_Project_Functions.process_query(text), AI_Project_Functions.match_intents(text)))
+    return {
+        "response": response,
+        "matches": [match.__dict__ for match in matches],
+    }
+
+
+# Body fields of the Gemini endpoints: a check for the JSON value and what it must be
+BODY_FIELDS = {
+    "customer": (lambda value: isinstance(value, str), "a string"),
+    "objection": (lambda value: isinstance(value, str), "a string"),
+    "transcript": (lambda value: isinstance(value, str), "a string"),
+    "interests": (lambda value: isinstance(value, list) and all(isinstance(item, str) for item in value),
+                  "a list of strings"),
+    "summaries": (lambda value: isinstance(value, list) and all(isinstance(item, str) for item in value),
+                  "a list of strings"),
+    "emotion_score": (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool), "a number"),
+}
+
+
+def _body_field(body, name):
+    if name not in body:
+        raise HTTPError(400, f"{name} is required")
+    valid, expected = BODY_FIELDS[name]
+    if not valid(body[name]):
+        raise HTTPError(400, f"{name} must be {expected}")
+    return body[name]
+
+
+def _gemini_endpoint(fn, *fields):
+    async def handler(params, query, body):
+        args = [_body_field(body, field) for field in fields]
+        if body.get("stream"):
+            return await stream_answer(fn, *args)
+        return {"text": await asyncio.to_thread(fn, *args)}
+    return handler
+
+
+async def analyze(params, query, body):
+    session = get_session_manager().open()
+    try:
+        pipeline = AssistPipeline(session=session)
+        results = await pipeline.run(body.get("customer", ""), body.get("query", ""),
+                                     bool(body.get("include_objection")))
+    finally:
+        session.close()
+    return {stage: stage_message(result) for stage, result in results.items()}
+
+
+ROUTES = [
+    ("GET", r"/health", health),
+    ("GET", r"/metrics", metrics),
+    ("GET", r"/traces", traces),
+    ("GET", r"/sessions", sessions),
+    ("GET", r"/customers", list_customers),
+    ("GET", r"/crm", crm_snapshot),
+    ("GET", r"/customers/(?P<name>[^/]+)", get_customer),
+    ("POST", r"/customers", add_customer),
+    ("POST", r"/customers/find", find_customers),
+    ("PUT", r"/customers/(?P<name>[^/]+)/interests", update_interests),
+    ("POST", r"/sentiment", sentiment),
+    ("POST", r"/intent", intent),
+    ("POST", r"/recommendations",
+     _gemini_endpoint(AI_Project_Functions.recommend_product, "customer", "interests", "emotion_score")),
+    ("POST", r"/objection-response", _gemini_endpoint(AI_Project_Functions.generate_prompt, "objection")),
+    ("POST", r"/summary",
+     _gemini_endpoint(AI_Project_Functions.generate_summary, "customer", "transcript", "emotion_score")),
+    ("POST", r"/summary/chunk", _gemini_endpoint(AI_Project_Functions.summarize_chunk, "customer", "transcript")),
+    ("POST", r"/summary/merge", _gemini_endpoint(AI_Project_Functions.merge_summaries, "customer", "summaries")),
+    ("POST", r"/summary/call",
+     _gemini_endpoint(AI_Project_Functions.summarize_call, "customer", "summaries", "transcript", "emotion_score")),
+    ("POST", r"/analyze", analyze),
+]
+ROUTES = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in ROUTES]
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    raw = b"".join(chunks)
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except json.JSONDecodeError:
+        raise HTTPError(400, "Request body must be JSON.")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Request body must be a JSON object.")
+    return body
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_ndjson(send, receive, result):
+    """Stream a Gemini answer as one NDJSON line per chunk, stopping if the client disconnects."""
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")]})
+
+    async def forward():
+        try:
+            async for chunk in result:
+                line = json.dumps({"text": chunk}) + "\n"
+                await send({"type": "http.response.body", "body": line.encode("utf-8"), "more_body": True})
+        except Exception as e:
+            # The status line is already sent, so report the failure in-band
+            line = json.dumps({"error": str(e)}) + "\n"
+            await send({"type": "http.response.body", "body": line.encode("utf-8"), "more_body": True})
+        finally:
+            await result.aclose()
+        await send({"type": "http.response.body", "body": b""})
+
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    streaming = asyncio.ensure_future(forward())
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait({streaming, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        streaming.cancel()  # Client gone: closing the stream cancels its work on the llm lane
+        await asyncio.gather(streaming, watcher, return_exceptions=True)
+    if streaming.done() and not streaming.cancelled() and streaming.exception() is not None:
+        raise streaming.exception()
+
+
+async def handle_http(scope, receive, send):
+    path = scope["path"]
+    method = scope["method"]
+    query = {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+    try:
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                params = {key: unquote(value) for key, value in match.groupdict().items()}
+                result = await handler(params, query, await _read_body(receive))
+                break
+        else:
+            raise HTTPError(404, f"No route for {method} {path}")
+    except HTTPError as e:
+        await _send_json(send, e.status, {"error": e.message})
+        return
+    except (LLMError, SessionBusy) as e:
+        await _send_json(send, 503, {"error": str(e)})
+        return
+    except Exception as e:
+        await _send_json(send, 500, {"error": str(e)})
+        return
+
+    if hasattr(result, "__aiter__"):
+        await _send_ndjson(send, receive, result)
+    elif isinstance(result, PlainText):
+        body = result.encode("utf-8")
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", result.content_type.encode()),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+    else:
+        await _send_json(send, 200, result)
+
+
+async def handle_websocket(scope, receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+    match = re.match(r"/ws/calls/(?P<name>[^/]+)$", scope["path"])
+    if not match:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+    customer = unquote(match.group("name"))
+    await send({"type": "websocket.accept"})
+
+    call_session = CallSession(customer)
+    work = get_session_manager().open()
+    pipeline = AssistPipeline(session=work)
+    summarizer = CallSummarizer(customer)
+    analyses = set()  # Tasks analyzing transcript segments
+    segments = 0
+
+    async def send_json(payload):
+        await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    async def analyze_segment(segment, text, include_objection):
+        async for result in pipeline.stream(customer, text, include_objection):
+            await send_json(dict(stage_message(result), segment=segment))
+            if result.stage == "sentiment" and not result.error:
+                call_session.add(result.value["state_of_mind"])
+                await send_json({"type": "timeline", "segment": segment, "summary": call_session.summary(),
+                                 "sparkline": call_session.sparkline()})
+        await send_json({"type": "done", "segment": segment})
+
+    async def cancel_analyses():
+        running = [task for task in analyses if not task.done()]
+        for task in running:
+            task.cancel()
+        work.cancel()  # Also releases stages already running on the lanes
+        await asyncio.gather(*running, return_exceptions=True)
+        await send_json({"type": "cancelled"})
+
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message["type"] != "websocket.receive":
+                continue
+            try:
+                request = json.loads(message.get("text") or message.get("bytes") or b"{}")
+            except json.JSONDecodeError:
+                await send_json({"type": "error", "error": "Messages must be JSON."})
+                continue
+
+            if request.get("type") == "transcript":
+                text = request.get("text", "")
+                summarizer.add_segment(text)
+                segments += 1
+                # Live transcription sends segments faster than Gemini answers; they run side by side,
+                # bounded by the session's lanes, and every segment still reaches the timeline
+                task = asyncio.ensure_future(analyze_segment(segments, text, bool(request.get("include_objection"))))
+                analyses.add(task)
+                task.add_done_callback(analyses.discard)
+            elif request.get("type") == "cancel":
+                await cancel_analyses()
+            elif request.get("type") == "summary":
+                await asyncio.gather(*analyses, return_exceptions=True)
+                emotion_score = round(call_session.ema) if call_session.ema is not None else 5
+                try:
+                    # Earlier chunks were summarized during the call; only the tail is new
+                    chunks = await work.run("llm", summarizer.finish, emotion_score, True)
+                    async for chunk in work.iterate("llm", chunks):
+                        await send_json({"type": "summary_chunk", "text": chunk})
+                except (LLMError, SessionBusy) as e:
+                    await send_json({"type": "error", "error": str(e)})
+                await send_json({"type": "done"})
+            else:
+                await send_json({"type": "error", "error": f"Unknown message type: {request.get('type')}"})
+    finally:
+        for task in list(analyses):
+            task.cancel()
+        work.close()
+
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope["type"] == "http":
+        await handle_http(scope, receive, send)
+    elif scope["type"] == "websocket":
+        await handle_websocket(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    # Fail the deployment now rather than every sentiment stage during calls
+                    await asyncio.to_thread(check_resources)
+                except (ImportError, MissingResourceError) as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                configure_executor()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("service:app", host=os.getenv("ASSISTANT_HOST", "127.0.0.1"),
+                port=int(os.getenv("ASSISTANT_PORT", "8000")))
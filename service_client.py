@@ -0,0 +1,114 @@
+"""Thin HTTP client for the headless assistant service (service.py).
+
+AssistantClient mirrors the AI_Project_Functions methods the Streamlit page
+uses, so main.py (and AssistPipeline) can switch between running everything
+in-process and calling a shared service just by picking which object to use.
+Set ASSISTANT_SERVICE_URL (e.g. http://localhost:8000) to enable it.
+"""
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from ai_functions import AI_Project_Functions
+from gemini_client import LLMError
+
+
+class AssistantClient:
+    """AI_Project_Functions-compatible client for the assistant service."""
+
+    # Pure helpers don't need a round-trip
+    get_all_users = staticmethod(AI_Project_Functions.get_all_users)
+    emotion_from_score = staticmethod(AI_Project_Functions.emotion_from_score)
+    visual_state_of_mind = staticmethod(AI_Project_Functions.visual_state_of_mind)
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            # 503 means Gemini is unavailable; surface it the same way as in-process calls
+            raise (LLMError if e.code == 503 else RuntimeError)(message) from None
+
+    def _json(self, method, path, body=None):
+        with self._request(method, path, body) as response:
+            return json.loads(response.read())
+
+    def _stream(self, path, body):
+        with self._request("POST", path, dict(body, stream=True)) as response:
+            for line in response:
+                if line.strip():
+                    message = json.loads(line)
+                    if "error" in message:
+                        raise LLMError(message["error"])
+                    yield message["text"]
+
+    def get_crm_data(self):
+        return self._json("GET", "/crm")
+
+    def search_customers(self, query="", offset=0, limit=20, with_records=False):
+        params = urllib.parse.urlencode({"q": query, "offset": offset, "limit": limit, "records": int(with_records)})
+        return self._json("GET", "/customers?" + params)
+
+    def find_customers(self, interests=(), purchases=(), match="all"):
+        body = {"interests": list(interests), "purchases": list(purchases), "match": match}
+        return self._json("POST", "/customers/find", body)["customers"]
+
+    def get_user_info(self, crm_data, name):
+        if crm_data is not None:
+            return crm_data.get(name, {})
+        try:
+            return self._json("GET", "/customers/" + urllib.parse.quote(name, safe=""))
+        except RuntimeError:
+            return {}
+
+    def add_entry_to_crm(self, name, part_purchase_list, interests_list):
+        body = {"name": name, "past_purchases": part_purchase_list, "interests": interests_list}
+        return self._json("POST", "/customers", body)["message"]
+
+    def update_interests(self, name, new_interests):
+        path = "/customers/" + urllib.parse.quote(name, safe="") + "/interests"
+        return self._json("PUT", path, {"interests": new_interests})["message"]
+
+    def analyze_sentiment(self, user_input):
+        return self._json("POST", "/sentiment", {"text": user_input})["state_of_mind"]
+
+    def process_query(self, query):
+        return self._json("POST", "/intent", {"text": query})["response"]
+
+    def _gemini(self, path, body, stream):
+        if stream:
+            return self._stream(path, body)
+        return self._json("POST", path, body)["text"]
+
+    def recommend_product(self, customer_name, interests, emotion_score, stream=False):
+        body = {"customer": customer_name, "interests": list(interests), "emotion_score": emotion_score}
+        return self._gemini("/recommendations", body, stream)
+
+    def generate_prompt(self, objection, stream=False):
+        return self._gemini("/objection-response", {"objection": objection}, stream)
+
+    def generate_summary(self, customer_name, speech_transcript, emotion_score, stream=False):
+        body = {"customer": customer_name, "transcript": speech_transcript, "emotion_score": emotion_score}
+        return self._gemini("/summary", body, stream)
+
+    def summarize_chunk(self, customer_name, transcript_chunk):
+        return self._gemini("/summary/chunk", {"customer": customer_name, "transcript": transcript_chunk}, False)
+
+    def merge_summaries(self, customer_name, summaries):
+        return self._gemini("/summary/merge", {"customer": customer_name, "summaries": list(summaries)}, False)
+
+    def summarize_call(self, customer_name, summaries, recent_transcript, emotion_score, stream=False):
+        body = {"customer": customer_name, "summaries": list(summaries), "transcript": recent_transcript,
+                "emotion_score": emotion_score}
+        return self._gemini("/summary/call", body, stream)
@@ -0,0 +1,315 @@
+"""Per-call work scheduling with bounded pools, backpressure and fairness.
+
+Every active call (a Streamlit browser session or a service WebSocket) opens
+a WorkSession and submits its blocking work to one of three lanes instead of
+running it on the script thread or an unbounded pool:
+
+    audio      speech recognition            SESSION_AUDIO_WORKERS (4 threads)
+    sentiment  VADER, intents, CRM reads     SESSION_SENTIMENT_WORKERS (4 threads), or
+                                             SESSION_SENTIMENT_PROCESSES worker processes
+    llm        Gemini calls                  SESSION_LLM_WORKERS (128 threads)
+
+Each lane keeps a queue per session and hands free workers to sessions in
+round-robin order, and no session may hold more than `per_session` workers of
+a lane at once (SESSION_<LANE>_PER_SESSION). So a call stuck behind slow
+Gemini answers only ever occupies its own share of the pool; the other agents
+on the node keep being served. A session's queue in a lane holds at most
+SESSION_QUEUE_LIMIT tasks; beyond that submit() raises SessionBusy (or waits,
+with block=True), which is the backpressure signal to drop or retry work.
+
+cancel() drops a session's queued work and releases anyone waiting on its
+running tasks (their results are discarded), e.g. when the agent moves on to
+another customer. close() also forgets the session.
+
+    session = get_session_manager().open("agent-7")
+    future = session.submit("llm", AI_Project_Functions.generate_prompt, "too expensive")
+    result = await session.run("sentiment", AI_Project_Functions.analyze_sentiment, text)
+    session.cancel()
+"""
+import asyncio
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from telemetry import tracer
+
+
+class SessionBusy(RuntimeError):
+    """A session's queue for a lane is full."""
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args", "kwargs", "context", "enqueued")
+
+    def __init__(self, future, fn, args, kwargs, context):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.context = context
+        self.enqueued = time.perf_counter()
+
+
+def _run_in_context(context, fn, args, kwargs):
+    # Keeps the caller's tracing span as the parent of spans inside fn
+    return context.run(fn, *args, **kwargs)
+
+
+class Lane:
+    """A bounded pool shared by all sessions, dispatched round-robin over per-session queues."""
+
+    def __init__(self, name, workers, per_session, max_queue, processes=False):
+        self.name = name
+        self.workers = workers
+        self.per_session = max(1, min(per_session, workers))
+        self.max_queue = max_queue
+        self.processes = processes
+        if processes:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"session-{name}")
+        self._queues = {}      # session id -> deque of _Task
+        self._ready = deque()  # session ids with queued tasks, in turn order
+        self._running = {}     # session id -> {future: executor future} of started tasks
+        self._active = 0
+        self._condition = threading.Condition()
+        self.counters = {"submitted": 0, "completed": 0, "rejected": 0, "cancelled": 0}
+
+    def submit(self, session_id, fn, args=(), kwargs=None, block=False, timeout=None):
+        """Queue fn(*args, **kwargs) for session_id and return a Future for its result."""
+        future = Future()
+        # Process workers can't share the caller's context (or pickle it)
+        context = None if self.processes else contextvars.copy_context()
+        task = _Task(future, fn, args, kwargs or {}, context)
+        with self._condition:
+            if len(self._queues.get(session_id, ())) >= self.max_queue:
+                if not block or not self._condition.wait_for(
+                        lambda: len(self._queues.get(session_id, ())) < self.max_queue, timeout):
+                    self.counters["rejected"] += 1
+                    raise SessionBusy(f"{self.name} queue of session {session_id} is full ({self.max_queue} tasks)")
+            queue = self._queues.setdefault(session_id, deque())
+            queue.append(task)
+            if len(queue) == 1:
+                self._ready.append(session_id)
+            self.counters["submitted"] += 1
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        # Called with the condition held: start tasks while workers are free, one session turn at a time
+        while self._active < self.workers and self._ready:
+            for _ in range(len(self._ready)):
+                session_id = self._ready.popleft()
+                queue = self._queues.get(session_id)
+                if not queue:
+                    continue
+                if len(self._running.get(session_id, ())) >= self.per_session:
+                    self._ready.append(session_id)  # At its share; let the others go first
+                    continue
+                task = queue.popleft()
+                if queue:
+                    self._ready.append(session_id)
+                else:
+                    del self._queues[session_id]
+                self._condition.notify_all()  # Room in this session's queue
+                self._start(session_id, task)
+                break
+            else:
+                return  # Every waiting session is at its per-session limit
+
+    def _start(self, session_id, task):
+        if not task.future.set_running_or_notify_cancel():
+            return  # Cancelled while queued
+        tracer.observe(f"session.{self.name}.wait", time.perf_counter() - task.enqueued)
+        try:
+            if task.context is not None:
+                inner = self.executor.submit(_run_in_context, task.context, task.fn, task.args, task.kwargs)
+            else:
+                inner = self.executor.submit(task.fn, *task.args, **task.kwargs)
+        except RuntimeError as e:
+            task.future.set_exception(e)  # The pool is shut down
+            return
+        self._active += 1
+        self._running.setdefault(session_id, {})[task.future] = inner
+        inner.add_done_callback(lambda done: self._finished(session_id, task.future, done))
+
+    def _finished(self, session_id, future, inner):
+        with self._condition:
+            self._active -= 1
+            running = self._running.get(session_id, {})
+            running.pop(future, None)
+            if not running:
+                self._running.pop(session_id, None)
+            self.counters["completed"] += 1
+            self._dispatch()
+        if future.done():
+            return  # Cancelled while running; the result is discarded
+        try:
+            error = inner.exception()
+        except CancelledError as e:
+            error = e
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(inner.result())
+        except Exception:
+            pass  # Cancelled concurrently
+
+    def cancel(self, session_id):
+        """Drop the session's queued tasks and fail its running ones with CancelledError; returns the count."""
+        with self._condition:
+            queued = self._queues.pop(session_id, deque())
+            if queued:
+                self._ready.remove(session_id)
+            running = list(self._running.get(session_id, {}))
+            self._condition.notify_all()
+        for task in queued:
+            task.future.cancel()
+        for future in running:
+            try:
+                future.set_exception(CancelledError())
+            except Exception:
+                pass  # Finished meanwhile
+        self.counters["cancelled"] += len(queued) + len(running)
+        return len(queued) + len(running)
+
+    def stats(self):
+        with self._condition:
+            return dict(self.counters, workers=self.workers, active=self._active,
+                        queued=sum(len(queue) for queue in self._queues.values()),
+                        sessions=len(set(self._queues) | set(self._running)))
+
+    def session_stats(self, session_id):
+        with self._condition:
+            return {"queued": len(self._queues.get(session_id, ())), "running": len(self._running.get(session_id, ()))}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkSession:
+    """One call's handle on the shared lanes."""
+
+    def __init__(self, manager, session_id):
+        self.manager = manager
+        self.session_id = session_id
+        self.closed = False
+
+    def submit(self, lane, fn, *args, block=False, timeout=None, **kwargs):
+        """Schedule fn on a lane ("audio", "sentiment" or "llm"); returns a concurrent.futures.Future.
+
+        Raises SessionBusy when this session's queue for the lane is full
+        (unless block=True, which waits up to timeout seconds for room).
+        """
+        if self.closed:
+            raise RuntimeError(f"Session {self.session_id} is closed")
+        return self.manager.lanes[lane].submit(self.session_id, fn, args, kwargs, block, timeout)
+
+    async def run(self, lane, fn, *args, **kwargs):
+        """Await fn on a lane from asyncio code (cancelling the await cancels the task if still queued)."""
+        return await asyncio.wrap_future(self.submit(lane, fn, *args, **kwargs))
+
+    async def iterate(self, lane, iterable):
+        """Consume a blocking iterator (e.g. a streamed Gemini answer) on a lane, one item per task.
+
+        Each item takes its turn on the lane like any other task, so a long
+        stream holds no worker between chunks; the iterator is closed if the
+        consumer stops early.
+        """
+        iterator = iter(iterable)
+        end = object()
+        try:
+            while True:
+                item = await self.run(lane, next, iterator, end)
+                if item is end:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except ValueError:
+                    pass  # Still inside next() on a worker; it is dropped when that returns
+
+    def call(self, lane, fn, *args, **kwargs):
+        """Run fn on a lane and wait for its result (for synchronous code such as the Streamlit script)."""
+        return self.submit(lane, fn, *args, block=True, **kwargs).result()
+
+    def cancel(self):
+        """Cancel everything this session has queued or running; the session stays usable."""
+        return sum(lane.cancel(self.session_id) for lane in self.manager.lanes.values())
+
+    def close(self):
+        self.cancel()
+        self.closed = True
+        self.manager._forget(self.session_id)
+
+    def stats(self):
+        return {name: lane.session_stats(self.session_id) for name, lane in self.manager.lanes.items()}
+
+
+class SessionManager:
+    """The node's lanes and its open WorkSessions."""
+
+    def __init__(self, audio_workers=4, sentiment_workers=4, llm_workers=128, sentiment_processes=0,
+                 per_session=None, max_queue=16):
+        per_session = dict({"audio": 1, "sentiment": 2, "llm": 4}, **(per_session or {}))
+        self.lanes = {
+            "audio": Lane("audio", audio_workers, per_session["audio"], max_queue),
+            "sentiment": Lane("sentiment", sentiment_processes or sentiment_workers, per_session["sentiment"],
+                              max_queue, processes=bool(sentiment_processes)),
+            "llm": Lane("llm", llm_workers, per_session["llm"], max_queue),
+        }
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def open(self, session_id=None):
+        """Return the WorkSession for session_id, creating it (with a fresh id if None)."""
+        with self._lock:
+            if session_id is None:
+                session_id = f"session-{next(self._ids)}"
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = WorkSession(self, session_id)
+            return session
+
+    def _forget(self, session_id):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            open_sessions = len(self.sessions)
+        return {"sessions": open_sessions, "lanes": {name: lane.stats() for name, lane in self.lanes.items()}}
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            lane.shutdown()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    """Return the process-wide SessionManager, sized from the SESSION_* environment variables."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionManager(
+                audio_workers=int(os.getenv("SESSION_AUDIO_WORKERS", "4")),
+                sentiment_workers=int(os.getenv("SESSION_SENTIMENT_WORKERS", "4")),
+                llm_workers=int(os.getenv("SESSION_LLM_WORKERS", "128")),
+                sentiment_processes=int(os.getenv("SESSION_SENTIMENT_PROCESSES", "0")),
+                per_session={lane: int(os.getenv(f"SESSION_{lane.upper()}_PER_SESSION", default))
+                             for lane, default in (("audio", "1"), ("sentiment", "2"), ("llm", "4"))},
+                max_queue=int(os.getenv("SESSION_QUEUE_LIMIT", "16")),
+            )
+        return _manager
@@ -0,0 +1,257 @@
+"""Incremental speech-to-text with partial and final transcript segments.
+
+Audio is read in fixed-size frames, an energy-based voice-activity detector
+splits it into utterances, and each utterance is transcribed while it is still
+being spoken (partial segments) and once more when the speaker pauses (final
+segment). Sentiment and intent can then run on every final segment instead of
+waiting for the whole recording.
+
+Frames can come from the microphone, a WAV file or any raw 16-bit PCM stream,
+so the mode can be exercised without a microphone:
+
+    for segment in stream_transcripts(frames_from_wav("call.wav")):
+        print(segment.is_final, segment.text)
+"""
+import math
+import queue
+import threading
+import wave
+from array import array
+from dataclasses import dataclass
+
+from asr_backends import get_backend
+from telemetry import span
+
+
+@dataclass
+class AudioFrame:
+    """A fixed-size chunk of mono 16-bit PCM audio."""
+    data: bytes
+    sample_rate: int
+    sample_width: int
+    timestamp: float  # seconds from the start of the stream
+
+
+@dataclass
+class TranscriptSegment:
+    """A partial or final transcript for one utterance."""
+    text: str
+    is_final: bool
+    start: float
+    end: float
+
+
+def frames_from_pcm(stream, sample_rate=16000, sample_width=2, frame_ms=30):
+    """Yield AudioFrames from a binary stream of raw mono PCM (e.g. a socket or pipe)."""
+    frame_bytes = int(sample_rate * frame_ms / 1000) * sample_width
+    timestamp = 0.0
+    while True:
+        data = stream.read(frame_bytes)
+        if not data:
+            return
+        yield AudioFrame(data, sample_rate, sample_width, timestamp)
+        timestamp += len(data) / (sample_rate * sample_width)
+
+
+def frames_from_wav(file_path, frame_ms=30):
+    """Yield AudioFrames from a mono WAV file."""
+    with wave.open(file_path, 'rb') as wav:
+        if wav.getnchannels() != 1:
+            raise ValueError("Streaming transcription expects a mono WAV file.")
+        sample_rate = wav.getframerate()
+        sample_width = wav.getsampwidth()
+        frame_samples = int(sample_rate * frame_ms / 1000)
+        timestamp = 0.0
+        while True:
+            data = wav.readframes(frame_samples)
+            if not data:
+                return
+            yield AudioFrame(data, sample_rate, sample_width, timestamp)
+            timestamp += len(data) / (sample_rate * sample_width)
+
+
+def frames_from_microphone(frame_ms=30, max_seconds=60, stop_event=None):
+    """Yield AudioFrames from the default microphone until max_seconds or stop_event is set."""
+    import speech_recognition as sr
+    with sr.Microphone() as source:
+        frame_samples = int(source.SAMPLE_RATE * frame_ms / 1000)
+        timestamp = 0.0
+        while timestamp < max_seconds and not (stop_event and stop_event.is_set()):
+            data = source.stream.read(frame_samples)
+            yield AudioFrame(data, source.SAMPLE_RATE, source.SAMPLE_WIDTH, timestamp)
+            timestamp += frame_ms / 1000
+
+
+def frame_energy(frame):
+    """Root-mean-square amplitude of a 16-bit PCM frame."""
+    if frame.sample_width != 2 or not frame.data:
+        return 0.0
+    samples = array('h', frame.data[:len(frame.data) - len(frame.data) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class EnergyVAD:
+    """Energy-based voice-activity detector with an adaptive noise floor."""
+
+    def __init__(self, threshold_ratio=3.0, min_energy=300.0, adapt_rate=0.05):
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.adapt_rate = adapt_rate
+        self.noise_floor = None
+
+    def is_speech(self, frame):
+        energy = frame_energy(frame)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        speech = energy > max(self.min_energy, self.noise_floor * self.threshold_ratio)
+        if not speech:
+            # Only learn the noise floor from non-speech frames
+            self.noise_floor += (energy - self.noise_floor) * self.adapt_rate
+        return speech
+
+
+def backend_recognizer(name=None):
+    """Default recognize function: the configured ASR backend, with silence mapped to ""."""
+    import speech_recognition as sr
+    backend = get_backend(name)
+
+    def recognize(audio):
+        try:
+            with span("asr.recognize", backend=backend.name):
+                return backend.transcribe(audio)
+        except sr.UnknownValueError:
+            return ""
+    return recognize
+
+
+def stream_transcripts(frames, recognize=None, vad=None, partial_interval=1.0,
+                       end_silence=0.6, min_speech=0.2, pre_roll=0.2, max_pending=4):
+    """Yield TranscriptSegments from a stream of AudioFrames.
+
+    While someone is speaking, a partial segment for the audio so far is
+    emitted every partial_interval seconds of speech. After end_silence
+    seconds of silence the utterance is transcribed one last time and a
+    final segment is emitted. Utterances shorter than min_speech are dropped.
+
+    Recognition runs on a worker thread fed by a queue of at most max_pending
+    jobs, so frames keep being read while the backend is busy. A partial is
+    skipped while the previous one is still being recognized (each one covers
+    the whole utterance, so they would only pile up); final segments are never
+    skipped, and reading only waits once max_pending jobs are queued.
+    """
+    import speech_recognition as sr
+    recognize = recognize or backend_recognizer()
+    vad = vad or EnergyVAD()
+    pre_roll_frames = []
+    utterance = []
+    speech_seconds = silence_seconds = since_partial = 0.0
+
+    jobs = queue.Queue(maxsize=max_pending)  # (frames, is_final) or None at the end
+    results = queue.Queue()                  # TranscriptSegment, an exception, or None after the last job
+    partial_pending = threading.Event()
+    stop = threading.Event()
+
+    def audio_of(chunks):
+        first = chunks[0]
+        return sr.AudioData(b"".join(chunk.data for chunk in chunks), first.sample_rate, first.sample_width)
+
+    def duration(frame):
+        return len(frame.data) / (frame.sample_rate * frame.sample_width)
+
+    def worker():
+        last_partial = None
+        while not stop.is_set():
+            job = jobs.get()
+            if job is None:
+                results.put(None)
+                return
+            chunks, is_final = job
+            try:
+                text = recognize(audio_of(chunks))
+            except Exception as e:
+                results.put(e)
+                text = ""
+            finally:
+                if not is_final:
+                    partial_pending.clear()
+            last = chunks[-1]
+            if text and (is_final or text != last_partial):
+                results.put(TranscriptSegment(text, is_final, chunks[0].timestamp, last.timestamp + duration(last)))
+            last_partial = None if is_final else text or last_partial
+
+    def ready(block=False):
+        # Segments recognized so far, in order; re-raises a recognition error
+        while True:
+            try:
+                item = results.get(block)
+            except queue.Empty:
+                return
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    threading.Thread(target=worker, name="stt-recognize", daemon=True).start()
+    try:
+        for frame in frames:
+            seconds = duration(frame)
+            if vad.is_speech(frame):
+                if not utterance:
+                    utterance.extend(pre_roll_frames)
+                utterance.append(frame)
+                speech_seconds += seconds
+                since_partial += seconds
+                silence_seconds = 0.0
+                if since_partial >= partial_interval and not partial_pending.is_set():
+                    since_partial = 0.0
+                    # Set before queueing: the worker clears it when done, possibly before put_nowait returns
+                    partial_pending.set()
+                    try:
+                        jobs.put_nowait((list(utterance), False))
+                    except queue.Full:
+                        partial_pending.clear()  # Recognition is behind; this partial isn't worth waiting for
+            elif utterance:
+                utterance.append(frame)
+                silence_seconds += seconds
+                if silence_seconds >= end_silence:
+                    if speech_seconds >= min_speech:
+                        jobs.put((utterance, True))
+                    utterance = []
+                    pre_roll_frames = []
+                    speech_seconds = silence_seconds = since_partial = 0.0
+            else:
+                # Keep a little audio from before speech starts so the first word isn't clipped
+                pre_roll_frames.append(frame)
+                while pre_roll_frames and sum(map(duration, pre_roll_frames)) > pre_roll:
+                    pre_roll_frames.pop(0)
+            yield from ready()
+
+        if utterance and speech_seconds >= min_speech:
+            jobs.put((utterance, True))
+        jobs.put(None)
+        yield from ready(block=True)
+    finally:
+        # The consumer stopped early (or a frame source failed): let the worker exit after its current job
+        stop.set()
+        try:
+            jobs.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+def transcribe_to_queue(frames, output_queue=None, **kwargs):
+    """Run stream_transcripts on a background thread, putting segments (then None) on a queue."""
+    output_queue = output_queue if output_queue is not None else queue.Queue()
+
+    def worker():
+        try:
+            for segment in stream_transcripts(frames, **kwargs):
+                output_queue.put(segment)
+        finally:
+            output_queue.put(None)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return output_queue
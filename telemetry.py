@@ -0,0 +1,389 @@
+"""Tracing spans and per-stage latency histograms for the hot path.
+
+Every stage that can make an interaction slow runs inside a span:
+
+    stt.capture      microphone capture (speech_recognition listen)
+    asr.recognize    speech recognition (Google / Vosk / Sphinx)
+    crm.load         get_crm_data
+    sentiment.vader  analyze_sentiment
+    gemini.generate  query_gemini, Gemini calls only
+    gemini.stream    query_gemini_stream, plus gemini.ttft for the first chunk
+    gemini.cache_hit answers served from the Gemini response cache (histogram only)
+    stage.<name>     each AssistPipeline stage, parent of the spans above
+
+Finished spans feed a histogram per name (cumulative buckets for Prometheus,
+plus a window of recent samples for exact p50/p95/p99) and a ring buffer of
+recent spans. Export them with prometheus_text() and otel_json() (the
+OTLP/JSON layout, so any OpenTelemetry collector can ingest them), or from the
+service at GET /metrics and GET /traces.
+
+The optional SamplingProfiler snapshots every thread's stack at a fixed
+interval and attributes each sample to the innermost active span of that
+thread; collapsed() gives flamegraph.pl / speedscope input.
+
+Environment:
+    TELEMETRY=off              disable spans (span() becomes a no-op)
+    TELEMETRY_TRACE_SAMPLE=0.1 keep only a fraction of spans for export
+                               (histograms always see every span)
+    TELEMETRY_PROFILE=0.01     start the sampling profiler with this interval (seconds)
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SERVICE_NAME = "ai-sales-call-assistant"
+METRIC_NAME = "assistant_stage_duration_seconds"
+
+
+def enabled():
+    return os.getenv("TELEMETRY", "on").lower() != "off"
+
+
+class Histogram:
+    """Latency histogram: cumulative buckets for export plus recent samples for percentiles."""
+
+    def __init__(self, buckets=BUCKETS, window=2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        index = 0
+        while index < len(self.buckets) and seconds > self.buckets[index]:
+            index += 1
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            self.errors += bool(error)
+            self._recent.append(seconds)
+
+    def percentiles(self, quantiles=(0.50, 0.95, 0.99)):
+        """Exact quantiles over the recent window, or None when empty."""
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return None
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+    def snapshot(self):
+        with self._lock:
+            return {"counts": list(self.counts), "count": self.count, "sum": self.sum, "errors": self.errors}
+
+
+class Span:
+    """One timed operation. Use span() rather than creating these directly."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects finished spans into per-name histograms and a ring buffer for export."""
+
+    def __init__(self, max_spans=2048, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self.histograms = {}
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> stack of active span names, for the profiler
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds, error=False):
+        """Record a duration measured elsewhere."""
+        self.histogram(name).observe(seconds, error)
+
+    def start(self, name, activate=True, **attributes):
+        """Start a span, as a child of the current one.
+
+        With activate=False it doesn't become the current span; use that in
+        generators, which would otherwise leak it into the caller's context.
+        """
+        span = Span(name, _current_span.get(), attributes)
+        token = None
+        if activate:
+            token = _current_span.set(span)
+            self._active.setdefault(threading.get_ident(), []).append(name)
+        return span, token
+
+    def end(self, span, token=None, error=None, cancelled=False):
+        span.end_ns = time.time_ns()
+        if cancelled:
+            span.attributes["cancelled"] = True
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        if token is not None:
+            _current_span.reset(token)
+            stack = self._active.get(threading.get_ident())
+            if stack and stack[-1] == span.name:
+                stack.pop()
+        self.observe(span.name, span.duration, error is not None)
+        if self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+            self.spans.append(span)
+
+    def active_span(self, thread_id):
+        stack = self._active.get(thread_id)
+        return stack[-1] if stack else None
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.spans.clear()
+
+    def stage_summary(self):
+        """{name: {"count", "errors", "p50", "p95", "p99", "mean"}} in seconds, sorted by name."""
+        summary = {}
+        for name, histogram in sorted(list(self.histograms.items())):
+            snapshot = histogram.snapshot()
+            percentiles = histogram.percentiles()
+            if percentiles is None:
+                continue
+            summary[name] = {"count": snapshot["count"], "errors": snapshot["errors"],
+                             "p50": percentiles[0.50], "p95": percentiles[0.95], "p99": percentiles[0.99],
+                             "mean": snapshot["sum"] / snapshot["count"]}
+        return summary
+
+    # Exporters
+
+    def prometheus_text(self):
+        """Histograms in the Prometheus text exposition format."""
+        lines = [f"# HELP {METRIC_NAME} Latency of each assistant stage.", f"# TYPE {METRIC_NAME} histogram"]
+        errors = []
+        for name, histogram in sorted(list(self.histograms.items())):
+            snapshot = histogram.snapshot()
+            label = _escape_label(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), snapshot["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {snapshot["sum"]!r}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {snapshot["count"]}')
+            errors.append(f'assistant_stage_errors_total{{stage="{label}"}} {snapshot["errors"]}')
+        lines += ["# HELP assistant_stage_errors_total Stage runs that raised.",
+                  "# TYPE assistant_stage_errors_total counter"] + errors
+        return "\n".join(lines) + "\n"
+
+    def otel_json(self):
+        """Recent spans and the histograms in the OTLP/JSON layout (resourceSpans + resourceMetrics)."""
+        resource = {"attributes": [_attribute("service.name", SERVICE_NAME),
+                                   _attribute("process.pid", os.getpid())]}
+        scope = {"name": "telemetry"}
+        spans = []
+        for span in list(self.spans):
+            item = {
+                "traceId": f"{span.trace_id:032x}",
+                "spanId": f"{span.span_id:016x}",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id is not None:
+                item["parentSpanId"] = f"{span.parent_id:016x}"
+            spans.append(item)
+        now = str(time.time_ns())
+        points = []
+        for name, histogram in sorted(list(self.histograms.items())):
+            snapshot = histogram.snapshot()
+            points.append({
+                "attributes": [_attribute("stage", name)],
+                "startTimeUnixNano": str(_started_ns),
+                "timeUnixNano": now,
+                "count": str(snapshot["count"]),
+                "sum": snapshot["sum"],
+                "bucketCounts": [str(count) for count in snapshot["counts"]],
+                "explicitBounds": list(histogram.buckets),
+            })
+        metric = {"name": METRIC_NAME, "unit": "s",
+                  "histogram": {"dataPoints": points, "aggregationTemporality": 2}}
+        return {
+            "resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": scope, "spans": spans}]}],
+            "resourceMetrics": [{"resource": resource, "scopeMetrics": [{"scope": scope, "metrics": [metric]}]}],
+        }
+
+
+_started_ns = time.time_ns()
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval on a daemon thread."""
+
+    def __init__(self, tracer, interval=0.01, max_depth=40):
+        self.tracer = tracer
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                span = self.tracer.active_span(thread_id)
+                # Root frame first; the active span leads so samples group by stage
+                self.stacks[";".join(([f"[{span}]"] if span else []) + names[::-1])] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        """Samples as collapsed stacks ("frame;frame;frame count" lines), hottest first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def by_span(self):
+        """Sample counts per active span ("-" for samples outside any span)."""
+        totals = Counter()
+        for stack, count in self.stacks.items():
+            totals[stack[1:stack.index("]")] if stack.startswith("[") else "-"] += count
+        return dict(totals.most_common())
+
+
+tracer = Tracer(sample_rate=float(os.getenv("TELEMETRY_TRACE_SAMPLE", "1.0")))
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the enclosed block as a span (a child of the current span, if any).
+
+    Yields the Span, or None when TELEMETRY=off. Exceptions are recorded on
+    the span and re-raised.
+    """
+    if not enabled():
+        yield None
+        return
+    current, token = tracer.start(name, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        tracer.end(current, token, error=e)
+        raise
+    tracer.end(current, token)
+
+
+def traced_call(name, fn, *args, **kwargs):
+    """Call fn inside a span; handy for asyncio.to_thread and executors."""
+    with span(name):
+        return fn(*args, **kwargs)
+
+
+def traced_stream(name, chunks, first_chunk_name=None, **attributes):
+    """Pass a chunk generator through, timing it as one span (and its first chunk separately)."""
+    if not enabled():
+        yield from chunks
+        return
+    current, _ = tracer.start(name, activate=False, **attributes)
+    first = True
+    try:
+        for chunk in chunks:
+            if first and first_chunk_name:
+                tracer.observe(first_chunk_name, current.duration)
+            first = False
+            yield chunk
+    except GeneratorExit:
+        tracer.end(current, cancelled=True)
+        raise
+    except BaseException as e:
+        tracer.end(current, error=e)
+        raise
+    tracer.end(current)
+
+
+def prometheus_text():
+    return tracer.prometheus_text()
+
+
+def otel_json():
+    return tracer.otel_json()
+
+
+def get_profiler(interval=None):
+    """Return the shared SamplingProfiler (not started)."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = SamplingProfiler(tracer, interval or float(os.getenv("TELEMETRY_PROFILE", "0.01") or 0.01))
+        return _profiler
+
+
+if os.getenv("TELEMETRY_PROFILE") and enabled():
+    get_profiler().start()
@@ -0,0 +1,494 @@
+"""Local vector similarity index over customers and the product catalog.
+
+Customers (interests + past purchases) and catalog products (name, category,
+tags) are embedded with a hashed TF-IDF vectorizer: tokens are hashed into a
+fixed number of dimensions, so new customers never change the vocabulary and
+a record can be (re)indexed on its own. IDF weights come from the catalog.
+
+Search is a batched matrix product in NumPy, scanned in row blocks with a
+running top-k, so ranking a few queries against the whole catalog (or every
+customer) takes milliseconds. recommend_product uses the shortlist to send
+Gemini a handful of candidate products instead of leaving all matching to
+the prompt.
+
+The index is saved to vector_index.npz (VECTOR_INDEX_PATH) and rebuilt when
+catalog.json (CATALOG_PATH) changes. add_entry_to_crm and update_interests
+re-index just the customer they touched and append its vector to a journal
+next to the index (vector_index.npz.journal), so a write costs one record
+rather than rewriting every customer. Every process replays records other
+processes appended, and once the journal holds VECTOR_JOURNAL_COMPACT records
+it is folded into the .npz on a background thread.
+
+    python vector_index.py build
+    python vector_index.py search "Fitness, Music"
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not serialized across processes
+    fcntl = None
+
+from intent_matcher import WORD_RE
+
+DEFAULT_DIM = 1024
+BLOCK_ROWS = 65536
+GENERATION_BYTES = 16
+NAME_LENGTH = struct.Struct("<I")
+
+
+def tokenize(text):
+    """Casefolded words with a plural 's' stripped ("Movies" and "movie" match)."""
+    tokens = []
+    for word in WORD_RE.findall(text.casefold()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def product_text(product):
+    return " ".join([product["name"], product.get("category", "")] + list(product.get("tags", [])))
+
+
+def customer_text(record):
+    return " ".join(list(record.get("interests", [])) + list(record.get("past_purchases", [])))
+
+
+class HashingTfidf:
+    """TF-IDF over hashed token buckets, so the vocabulary never needs rebuilding."""
+
+    def __init__(self, dim=DEFAULT_DIM, idf=None):
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+        self._buckets = {}
+
+    def _bucket(self, token):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            # blake2b rather than hash() so buckets are stable across processes
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest, "little") % self.dim
+            self._buckets[token] = bucket
+        return bucket
+
+    def counts(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                matrix[row, self._bucket(token)] += 1
+        return matrix
+
+    def fit(self, texts):
+        """Learn IDF weights from texts (the catalog)."""
+        document_frequency = (self.counts(texts) > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts):
+        """L2-normalized, sublinear TF-IDF vectors, one row per text."""
+        matrix = np.log1p(self.counts(texts)) * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class VectorIndex:
+    """Keyed rows of unit vectors with batched cosine top-k search."""
+
+    def __init__(self, dim, keys=(), vectors=None):
+        self.dim = dim
+        self.keys = list(keys)
+        self._positions = {key: position for position, key in enumerate(self.keys)}
+        self._matrix = vectors if vectors is not None else np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    @property
+    def vectors(self):
+        return self._matrix[:len(self.keys)]
+
+    def vector(self, key):
+        return self._matrix[self._positions[key]]
+
+    def upsert(self, key, vector):
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self.keys)
+            if position == len(self._matrix):
+                # Grow geometrically so one-at-a-time inserts stay amortized O(1)
+                grown = np.zeros((max(16, 2 * len(self._matrix)), self.dim), dtype=np.float32)
+                grown[:position] = self._matrix[:position]
+                self._matrix = grown
+            self.keys.append(key)
+            self._positions[key] = position
+        self._matrix[position] = vector
+
+    def remove(self, key):
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        last = len(self.keys) - 1
+        if position != last:
+            # Move the last row into the gap
+            moved = self.keys[last]
+            self.keys[position] = moved
+            self._matrix[position] = self._matrix[last]
+            self._positions[moved] = position
+        self.keys.pop()
+
+    def search(self, queries, k=10):
+        """Return the k best (key, score) pairs for each row of queries."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        vectors = self.vectors
+        k = min(k, len(vectors))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            scores = queries @ vectors[start:start + BLOCK_ROWS].T
+            block_k = min(k, scores.shape[1])
+            top = np.argpartition(-scores, block_k - 1, axis=1)[:, :block_k]
+            # Merge this block's top-k into the running top-k
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(self.keys[row], float(score)) for row, score in zip(rows, scores)]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+
+def _file_signature(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class SimilarityIndex:
+    """Catalog and customer vectors sharing one vectorizer."""
+
+    def __init__(self, catalog, vectorizer, products, customers, catalog_signature="", journal_generation=b""):
+        self.catalog = catalog
+        self.vectorizer = vectorizer
+        self.products = products
+        self.customers = customers
+        self.catalog_signature = catalog_signature
+        self.journal_generation = journal_generation  # Journal the saved customers were compacted into
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, catalog_path, crm_records, dim=DEFAULT_DIM):
+        with open(catalog_path, "r", encoding="utf-8") as file:
+            catalog = json.load(file)
+        texts = [product_text(product) for product in catalog]
+        vectorizer = HashingTfidf(dim).fit(texts)
+        products = VectorIndex(dim, range(len(catalog)), vectorizer.transform(texts))
+        names = list(crm_records)
+        customers = VectorIndex(dim, names, vectorizer.transform([customer_text(crm_records[name]) for name in names]))
+        return cls(catalog, vectorizer, products, customers, _file_signature(catalog_path))
+
+    def update_customer(self, name, record):
+        """Re-embed one customer; returns the new vector."""
+        vector = self.vectorizer.transform([customer_text(record)])[0]
+        with self._lock:
+            self.customers.upsert(name, vector)
+        return vector
+
+    def apply_journal(self, records):
+        with self._lock:
+            for name, vector in records:
+                self.customers.upsert(name, vector)
+
+    def remove_customer(self, name):
+        with self._lock:
+            self.customers.remove(name)
+
+    def shortlist_many(self, queries, k=5):
+        """Rank the catalog for several (interests, past_purchases) queries in one batch.
+
+        Products the customer already bought are left out.
+        """
+        texts = [" ".join(list(interests) + list(purchases)) for interests, purchases in queries]
+        results = self.products.search(self.vectorizer.transform(texts), k + max(len(p) for _, p in queries))
+        shortlists = []
+        for (_, purchases), hits in zip(queries, results):
+            owned = {purchase.strip().casefold() for purchase in purchases}
+            products = [dict(self.catalog[position], score=round(score, 4)) for position, score in hits
+                        if score > 0 and self.catalog[position]["name"].casefold() not in owned]
+            shortlists.append(products[:k])
+        return shortlists
+
+    def shortlist(self, interests, past_purchases=(), k=5):
+        """Best-matching catalog products for one customer profile."""
+        return self.shortlist_many([(interests, past_purchases)], k)[0]
+
+    def similar_customers(self, name, k=5):
+        """Customers whose interests and purchases look most like name's."""
+        with self._lock:
+            if name not in self.customers:
+                return []
+            hits = self.customers.search(self.customers.vector(name), k + 1)[0]
+        return [(other, score) for other, score in hits if other != name][:k]
+
+    def save(self, file_path):
+        """Write the index atomically as a .npz file."""
+        with self._lock:
+            arrays = {
+                "idf": self.vectorizer.idf,
+                "product_vectors": self.products.vectors,
+                "customer_keys": np.array(self.customers.keys, dtype=str),
+                "customer_vectors": self.customers.vectors,
+                "catalog": np.array(json.dumps(self.catalog)),
+                "catalog_signature": np.array(self.catalog_signature),
+                "journal_generation": np.frombuffer(self.journal_generation, dtype=np.uint8),
+            }
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as data:
+            idf = data["idf"]
+            vectorizer = HashingTfidf(len(idf), idf)
+            catalog = json.loads(str(data["catalog"]))
+            products = VectorIndex(len(idf), range(len(catalog)), data["product_vectors"])
+            customers = VectorIndex(len(idf), data["customer_keys"].tolist(), data["customer_vectors"].copy())
+            generation = data["journal_generation"].tobytes() if "journal_generation" in data else b""
+            return cls(catalog, vectorizer, products, customers, str(data["catalog_signature"]), generation)
+
+
+class CustomerJournal:
+    """Append-only log of customer vectors written since the index file was last saved.
+
+    The file starts with a random generation id that changes whenever the
+    journal is folded into the index file; the index file records the
+    generation it was folded into, so a process whose journal position belongs
+    to an older generation knows to reload the index file first. Appends and
+    compaction hold an exclusive lock on the journal file.
+    """
+
+    def __init__(self, file_path, dim):
+        self.file_path = file_path
+        self.record_size = dim * 4
+        self.generation = b""
+        self.offset = 0
+        self.records = 0  # Records in the journal, as of the last read
+
+    @contextlib.contextmanager
+    def locked(self):
+        with open(self.file_path, "a+b") as file:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield file
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def append(self, name, vector):
+        encoded = name.encode("utf-8")
+        with self.locked() as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                file.write(os.urandom(GENERATION_BYTES))
+            # One write per record, so a concurrent reader never sees half of it as complete
+            file.write(NAME_LENGTH.pack(len(encoded)) + encoded + np.asarray(vector, dtype=np.float32).tobytes())
+
+    def read_new(self):
+        """Return (generation, records appended since the last call); the position resets on a new generation."""
+        try:
+            with open(self.file_path, "rb") as file:
+                generation = file.read(GENERATION_BYTES)
+                if len(generation) < GENERATION_BYTES:
+                    return self.generation, []
+                if generation != self.generation:
+                    self.generation, self.offset, self.records = generation, GENERATION_BYTES, 0
+                file.seek(self.offset)
+                data = file.read()
+        except FileNotFoundError:
+            return self.generation, []
+        records = []
+        position = 0
+        while position + NAME_LENGTH.size <= len(data):
+            (length,) = NAME_LENGTH.unpack_from(data, position)
+            end = position + NAME_LENGTH.size + length + self.record_size
+            if end > len(data):
+                break  # Still being written
+            name = data[position + NAME_LENGTH.size:position + NAME_LENGTH.size + length].decode("utf-8")
+            records.append((name, np.frombuffer(data, np.float32, self.record_size // 4, end - self.record_size)))
+            position = end
+        self.offset += position
+        self.records += len(records)
+        return self.generation, records
+
+    def reset(self, file, generation):
+        """Start a new, empty generation (called with the lock held, after the index file was saved)."""
+        file.truncate(0)
+        file.write(generation)
+        file.flush()
+        self.generation, self.offset, self.records = generation, GENERATION_BYTES, 0
+
+
+_similarity_index = None
+_similarity_lock = threading.Lock()
+
+
+_journal = None
+_journal_lock = threading.Lock()  # This process's journal position
+_compacting = threading.Lock()
+
+
+def index_path():
+    return os.getenv("VECTOR_INDEX_PATH", "vector_index.npz")
+
+
+def get_journal(dim):
+    global _journal
+    if _journal is None or _journal.file_path != index_path() + ".journal":
+        _journal = CustomerJournal(index_path() + ".journal", dim)
+    return _journal
+
+
+def _sync(index):
+    """Replay customers other processes journaled; reload the index file if they compacted it meanwhile."""
+    if not _journal_lock.acquire(blocking=False):
+        return  # Being compacted right now; the next call catches up
+    try:
+        _replay(index)
+    finally:
+        _journal_lock.release()
+
+
+def _replay(index):
+    journal = get_journal(index.vectorizer.dim)
+    generation, records = journal.read_new()
+    if generation and generation != index.journal_generation and os.path.exists(index_path()):
+        saved = SimilarityIndex.load(index_path())
+        if saved.journal_generation == generation and saved.catalog_signature == index.catalog_signature:
+            index.customers = saved.customers
+        index.journal_generation = generation
+    index.apply_journal(records)
+
+
+def compact(index):
+    """Fold the journal into a fresh index file and start a new journal generation."""
+    journal = get_journal(index.vectorizer.dim)
+    with _journal_lock, journal.locked() as file:
+        _replay(index)
+        generation = os.urandom(GENERATION_BYTES)
+        index.journal_generation = generation
+        index.save(index_path())
+        journal.reset(file, generation)
+
+
+def _compact_in_background(index):
+    try:
+        compact(index)
+    finally:
+        _compacting.release()
+
+
+def get_similarity_index(crm_path=None):
+    """Return the shared SimilarityIndex, loading or building it on first use.
+
+    Returns None when there is no catalog file.
+    """
+    global _similarity_index
+    catalog_path = os.getenv("CATALOG_PATH", "catalog.json")
+    with _similarity_lock:
+        if _similarity_index is None:
+            if not os.path.exists(catalog_path):
+                return None
+            signature = _file_signature(catalog_path)
+            if os.path.exists(index_path()):
+                index = SimilarityIndex.load(index_path())
+                if index.catalog_signature == signature:
+                    _similarity_index = index
+            if _similarity_index is None:
+                _similarity_index = rebuild(crm_path, catalog_path)
+        _sync(_similarity_index)
+        return _similarity_index
+
+
+def rebuild(crm_path=None, catalog_path=None):
+    """Build the index from the catalog and every CRM customer and save it."""
+    from crm_store import get_store
+    catalog_path = catalog_path or os.getenv("CATALOG_PATH", "catalog.json")
+    crm_path = crm_path or os.getenv("CRM_PATH", "crm.json")
+    index = SimilarityIndex.build(catalog_path, get_store(crm_path).snapshot(),
+                                  int(os.getenv("VECTOR_DIM", DEFAULT_DIM)))
+    journal = get_journal(index.vectorizer.dim)
+    with _journal_lock, journal.locked() as file:
+        # Everything journaled so far is already in the CRM the index was built from
+        index.journal_generation = os.urandom(GENERATION_BYTES)
+        index.save(index_path())
+        journal.reset(file, index.journal_generation)
+    return index
+
+
+def index_customer(name, record):
+    """Re-index one customer after a CRM write and journal its new vector.
+
+    Once the journal holds VECTOR_JOURNAL_COMPACT records it is folded into the
+    index file on a background thread.
+    """
+    index = get_similarity_index()
+    if index is None:
+        return
+    journal = get_journal(index.vectorizer.dim)
+    journal.append(name, index.update_customer(name, record))
+    if journal.records >= int(os.getenv("VECTOR_JOURNAL_COMPACT", "10000")) and _compacting.acquire(blocking=False):
+        threading.Thread(target=_compact_in_background, args=(index,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Customer and catalog vector index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the index from the catalog and the CRM")
+    search = subparsers.add_parser("search", help="Shortlist catalog products for comma-separated interests")
+    search.add_argument("interests")
+    search.add_argument("-k", type=int, default=5)
+    similar = subparsers.add_parser("similar", help="Customers most like the given one")
+    similar.add_argument("name")
+    similar.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        built = rebuild()
+        print(f"Indexed {len(built.products)} products and {len(built.customers)} customers into {index_path()}.")
+    elif args.command == "search":
+        for product in get_similarity_index().shortlist(args.interests.split(","), k=args.k):
+            print(f"{product['score']:.3f}  {product['name']} ({product['category']})")
+    elif args.command == "similar":
+        for name, score in get_similarity_index().similar_customers(args.name, args.k):
+            print(f"{score:.3f}  {name}")